@@ -0,0 +1,375 @@
+"""
+Local fixture site for benchmarks: product pages with the DOM the A&B, 77diamonds and
+Diamond Heaven scrapers read, served with configurable latency, jitter and failure rate.
+
+    python -m benchmarks.fixture_server --port 8765 --latency 0.3 --jitter 0.2 --failure-rate 0.02
+
+    with FixtureServer(latency=0.2, jitter=0.1) as server:
+        url = server.url("anb", 7)             # http://127.0.0.1:<port>/anb/product/7
+
+Routes (templates in benchmarks/fixtures/):
+    /anb/product/<n>?<custom_field>=<namer>...   PDP: li[custom_field][namer] variant grid with
+                                                  variant links, #metalPrice, "You have selected"
+                                                  panel, ring & diamond details, #checkout-cart
+    /anb/cart?product=<n>&...                     bag: #checkout-cart[data-ga-cart-data], totals table
+    /77diamonds/product/<n>                       ring builder: metal/stone/shape filters, carat
+                                                  selects, vue-slider colour/clarity/cut filters,
+                                                  diamond table, div.item-details once added
+    /diamond-heaven/product/<n>                   configurator: .pdstone_shape, carat pips,
+                                                  clarity/cut radios, .summary-block, #price-block
+
+Prices are a deterministic function of the product number and the selected options (the
+pages' JS uses the same formulas), so change-detection fingerprints are stable between
+runs. Each response is delayed by latency ± jitter seconds; `failure_rate` of them are a
+500, `block_rate` an "Access denied" 403.
+"""
+import os
+import json
+import math
+import time
+import random
+import argparse
+import threading
+from html import escape
+from string import Template
+from functools import lru_cache
+from urllib.parse import urlsplit, parse_qs, urlencode
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SITES = ("anb", "77diamonds", "diamond-heaven")
+DEFAULT_PORT = 8765
+
+BLOCK_PAGE = "<html><head><title>Access denied</title></head><body>Request blocked.</body></html>"
+
+
+@lru_cache(maxsize=None)
+def template(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return Template(f.read())
+
+
+def money(value, decimals=2):
+    return f"£{value:,.{decimals}f}"
+
+
+def half_up(value, digits=2):
+    """Round like JS Math.round(x * 10^digits) / 10^digits."""
+    scale = 10 ** digits
+    return math.floor(value * scale + 0.5) / scale
+
+
+# ---------------------- A&B ----------------------
+# custom_field -> [(namer, price delta)]; the first option is selected by default
+ANB_OPTIONS = {
+    "metal_purity": [("18K White Gold", 0), ("18K Yellow Gold", 0), ("18K Rose Gold", 20), ("Platinum", 240)],
+    "stone_type": [("Diamond", 0), ("Lab Grown Diamond", -420)],
+    "stone_shape": [("Round", 0), ("Oval", 60), ("Princess", -40), ("Emerald", 30)],
+    "stone_carat": [("0.50", 0), ("0.75", 520), ("1.00", 1240), ("1.50", 2650)],
+    "stone_clarity": [("SI1", 0), ("VS1", 210), ("VVS1", 480)],
+    "stone_color": [("I-J", 0), ("G-H", 190), ("E-F", 420)],
+    "stone_cut": [("Very Good", 0), ("Excellent", 150)],
+}
+
+
+def anb_title(product):
+    return f"Fixture Solitaire Engagement Ring {product}"
+
+
+def anb_base_price(product):
+    return 850 + product * 37 % 650
+
+
+def anb_selection(query):
+    sel = {}
+    for field, options in ANB_OPTIONS.items():
+        wanted = query.get(field, [""])[0]
+        sel[field] = wanted if any(n == wanted for n, _ in options) else options[0][0]
+    return sel
+
+
+def anb_price(product, sel):
+    total = anb_base_price(product)
+    for field, options in ANB_OPTIONS.items():
+        total += dict(options)[sel[field]]
+    return float(total)
+
+
+def anb_cart_payload(product, sel, ring_size=""):
+    price = anb_price(product, sel)
+    return {
+        "currency": "GBP", "value": price, "coupon": "",
+        "items": [{
+            "item_id": f"ANB-{product}", "item_name": anb_title(product), "item_brand": "Fixture",
+            "item_category": "Engagement Rings", "item_variant": " / ".join(sel.values()),
+            "price": price, "quantity": 1, "cart_id": f"C{product:05d}",
+            "metal_purity": sel["metal_purity"], "ring_size": ring_size,
+            "stone_type": sel["stone_type"], "stone_shape": sel["stone_shape"],
+            "stone_carat": sel["stone_carat"], "stone_clarity": sel["stone_clarity"],
+            "stone_color": sel["stone_color"], "stone_cut": sel["stone_cut"],
+            "stone_certificate": "IGI", "band_width": "2.0mm",
+        }],
+    }
+
+
+def render_anb_product(product, query):
+    sel = anb_selection(query)
+    price = anb_price(product, sel)
+    grid = []
+    for field, options in ANB_OPTIONS.items():
+        items = []
+        for namer, _ in options:
+            href = f"/anb/product/{product}?" + urlencode({**sel, field: namer})
+            active = ' class="active"' if namer == sel[field] else ""
+            items.append(f'<li custom_field="{field}" namer="{escape(namer)}"{active}>'
+                         f'<a href="{escape(href)}">{escape(namer)}</a></li>')
+        grid.append(f'<h3>{field.replace("_", " ").title()}</h3><ul class="options">{"".join(items)}</ul>')
+    lines = "".join(f"<p>{f.replace('_', ' ', 1)}: <span>{escape(v)}</span></p>" for f, v in sel.items())
+    details = "".join(f"<p><span>{k}:</span> {escape(v)}</p>" for k, v in (
+        ("Metal", sel["metal_purity"]), ("Band width", "2.0mm"), ("Setting", "4 claw"),
+        ("Stone", f'{sel["stone_carat"]}ct {sel["stone_shape"]} {sel["stone_type"]}'),
+        ("Clarity", sel["stone_clarity"]), ("Colour", sel["stone_color"]), ("Cut", sel["stone_cut"]),
+    ))
+    return template("anb_product.html").substitute(
+        title=escape(anb_title(product)), product=product,
+        price=money(price), strike_price=money(round(price * 1.25)), discount=20,
+        grid="\n".join(grid), selection_lines=lines, details=details,
+        cart_json=escape(json.dumps(anb_cart_payload(product, sel)), quote=True),
+        options_json=json.dumps({f: [[n, d] for n, d in o] for f, o in ANB_OPTIONS.items()}),
+        base_price=anb_base_price(product),
+    )
+
+
+def render_anb_cart(query):
+    product = int(query.get("product", ["0"])[0] or 0)
+    sel = anb_selection(query)
+    price = anb_price(product, sel)
+    payload = anb_cart_payload(product, sel, ring_size=query.get("ring_size", [""])[0])
+    return template("anb_cart.html").substitute(
+        title=escape(anb_title(product)),
+        option_lines="".join(f"<li>{f.replace('_', ' ', 1)}: {escape(v)}</li>" for f, v in sel.items()),
+        price=money(price), subtotal=money(price / 1.2), vat=money(price - price / 1.2), coupon=money(0),
+        cart_json=escape(json.dumps(payload), quote=True),
+    )
+
+
+# ---------------------- 77diamonds ----------------------
+SEVENTY_SEVEN_SHAPES = ["round", "oval", "princess", "emerald", "cushion", "pear"]
+SEVENTY_SEVEN_CARATS = ["0.30", "0.40", "0.50", "0.60", "0.70", "0.75", "0.80", "0.90", "1.00",
+                        "1.20", "1.50", "1.75", "2.00", "2.50", "3.00"]
+
+
+def render_77diamonds_product(product, query):
+    setting_price = 650 + product * 53 % 900
+    return template("77diamonds_product.html").substitute(
+        title=f"Fixture Solitaire Setting {product}", product=product,
+        description=f"A four-claw solitaire setting (fixture product {product}).",
+        setting_price=money(setting_price, 0), setting_price_value=setting_price,
+        shape_filters="".join(f'<div data-cy="{s}">{s.title()}</div>' for s in SEVENTY_SEVEN_SHAPES),
+        shape_labels="".join(f'<span class="shape-selector__shape">{s.title()}</span>' for s in SEVENTY_SEVEN_SHAPES),
+        carat_options="".join(f'<option value="{c}">{c}</option>' for c in SEVENTY_SEVEN_CARATS),
+    )
+
+
+# ---------------------- Diamond Heaven ----------------------
+DH_PRICING = {
+    "shape": {"Round": 1.0, "Princess": 0.92, "Oval": 0.97, "Emerald": 0.9, "Cushion": 0.94},
+    "carat": {"0.30": 0.45, "0.50": 1.0, "0.70": 1.55, "1.00": 2.6, "1.50": 4.4, "2.00": 6.8},
+    "clarity": {"SI1": 1.0, "VS2": 1.12, "VS1": 1.2, "VVS2": 1.33, "VVS1": 1.45},
+    "cut": {"Very Good": 1.0, "Excellent": 1.08, "Ideal": 1.15},
+}
+
+
+def dh_base_price(product):
+    return 700 + product * 41 % 800
+
+
+def dh_prices(product, sel):
+    """Same formula (and rounding) as the page's JS prices()."""
+    p = dh_base_price(product)
+    for key in ("carat", "clarity", "cut", "shape"):
+        p *= DH_PRICING[key].get(sel[key], 1)
+    net = half_up(p)
+    gross = math.floor(net * 120 + 0.5) / 100
+    street = math.floor(gross * 1.6 + 0.5)
+    return {"net": net, "gross": gross, "street": street, "save": street - gross, "monthly": gross / 36}
+
+
+def render_diamond_heaven_product(product, query):
+    sel = {key: next(iter(values)) for key, values in DH_PRICING.items()}
+    p = dh_prices(product, sel)
+
+    def radios(name, values):
+        return "".join(
+            f'<li><input type="radio" name="{name}" id="{name}-{i}" value="{v}"{" checked" if i == 0 else ""}>'
+            f'<label for="{name}-{i}">{v}</label></li>'
+            for i, v in enumerate(values))
+
+    active = ' class="active"'
+    carats = list(DH_PRICING["carat"])
+    pips = "".join(
+        f'<span class="ui-slider-pip{" ui-slider-pip-selected" if i == 0 else ""}" style="left: {i * 100 // (len(carats) - 1)}%">'
+        f'<span class="ui-slider-label">{c}</span></span>'
+        for i, c in enumerate(carats))
+    return template("diamond_heaven_product.html").substitute(
+        title=f"Fixture Lab Grown Solitaire {product}",
+        shape_items="".join(f'<li data-hint="{s}"{active if i == 0 else ""}>{s}</li>'
+                            for i, s in enumerate(DH_PRICING["shape"])),
+        carat_pips=pips,
+        clarity_radios=radios("clarity", list(DH_PRICING["clarity"])),
+        cut_radios=radios("cut", list(DH_PRICING["cut"])),
+        summary="".join(f"<p><span>{k.title()}:</span> {v}</p>" for k, v in sel.items())
+                + "<p><span>Metal:</span> 18ct White Gold</p>",
+        price_block=(f'<p class="special_price">{money(p["net"])}</p>'
+                     f'<p class="inc-vat">{money(p["gross"])} inc VAT</p>'
+                     f'<p>High Street Price: {money(p["street"])}</p>'
+                     f'<p class="you-save">You save: {money(p["save"])}</p>'
+                     f'<p class="v12_montly_pay_cart">{money(p["monthly"])} per month</p>'),
+        pricing_json=json.dumps({"base": dh_base_price(product), **DH_PRICING}),
+    )
+
+
+# ---------------------- server ----------------------
+def route(path, query):
+    """HTML for a fixture path, or None for 404."""
+    parts = [p for p in path.split("/") if p]
+    if len(parts) == 2 and parts == ["anb", "cart"]:
+        return render_anb_cart(query)
+    if len(parts) != 3 or parts[1] != "product" or not parts[2].isdigit():
+        return None
+    site, product = parts[0], int(parts[2])
+    if site == "anb":
+        return render_anb_product(product, query)
+    if site == "77diamonds":
+        return render_77diamonds_product(product, query)
+    if site == "diamond-heaven":
+        return render_diamond_heaven_product(product, query)
+    return None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled HTTP clients reuse connections
+
+    def do_GET(self):
+        fixture = self.server.fixture
+        split = urlsplit(self.path)
+        if split.path == "/favicon.ico":
+            return self._send(404, "")
+        status, body = fixture.respond(split.path, parse_qs(split.query))
+        self._send(status, body)
+
+    def _send(self, status, body):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    """Fixture site on a background thread; port=0 picks a free port."""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, failure_rate=0.0,
+                 block_rate=0.0, seed=None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.block_rate = block_rate
+        self.requests = self.failed = self.blocked = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    def respond(self, path, query):
+        """(status, body) for one request, after the simulated latency."""
+        with self._lock:
+            self.requests += 1
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            roll = self._rng.random()
+        time.sleep(delay)
+        if roll < self.failure_rate:
+            with self._lock:
+                self.failed += 1
+            return 500, "<html><head><title>Server error</title></head><body>Internal error</body></html>"
+        if roll < self.failure_rate + self.block_rate:
+            with self._lock:
+                self.blocked += 1
+            return 403, BLOCK_PAGE
+        body = route(path, query)
+        if body is None:
+            return 404, "<html><head><title>Not found</title></head><body>Not found</body></html>"
+        return 200, body
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def url(self, site, product, **params):
+        if site not in SITES:
+            raise ValueError(f"Unknown fixture site {site!r} (expected one of {SITES})")
+        query = f"?{urlencode(params)}" if params else ""
+        return f"{self.base_url}/{site}/product/{product}{query}"
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "failed": self.failed, "blocked": self.blocked}
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fixture = self
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fixture-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve fixture product pages for the scraper benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="± seconds of uniform noise on the latency")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of requests answered with a 500")
+    parser.add_argument("--block-rate", type=float, default=0.0, help="share answered with an 'Access denied' 403")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    server = FixtureServer(args.host, args.port, args.latency, args.jitter, args.failure_rate,
+                           args.block_rate, args.seed).start()
+    print(f"🧪 Fixture site on {server.base_url} (latency {args.latency}s ± {args.jitter}s, "
+          f"failures {args.failure_rate:.0%}, blocks {args.block_rate:.0%})")
+    for site in SITES:
+        print(f"   {server.url(site, 1)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(f"🛑 Fixture site stopped: {server.stats()}")
+
+
+if __name__ == "__main__":
+    main()
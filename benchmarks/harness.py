@@ -0,0 +1,467 @@
+"""
+End-to-end throughput benchmarks against the local fixture site (benchmarks.fixture_server).
+
+    python -m benchmarks.harness --configs anb_http,anb_browser --rows 60 --workers 1,4 \
+        --latency 0.3 --jitter 0.1 --failure-rate 0.02 --json bench.json
+
+Every (configuration, worker count) pair runs in a fresh process against one fixture
+server, so module-level singletons, domain limiters and memory start clean. Scrapers are
+driven through their own entry points with outputs redirected to a temp directory and DB
+batches discarded:
+
+    anb_http           scrapers.anb_scraper.try_http_fast_path (requests + static parse)
+    anb_browser        anb threaded_worker, FETCH_MODE="browser" (pooled Chrome)
+    anb_http_first     anb threaded_worker, FETCH_MODE="http_first"
+    diamond_heaven     diamond_heaven.run_task, one browser per worker
+    77diamonds         77diamonds_scraper.process_row (fresh Firefox per row, standby pool)
+    77diamonds_async   AsyncSeventySevenScraper, `workers` browsers x --tabs tabs
+
+Reported per run: rows/min (successful rows over wall time), p50/p95 per-row latency,
+peak RSS of the process tree (Python plus every browser it started) and RSS per worker
+above the idle baseline. Navigation pacing is lifted by default so the numbers reflect
+the scrapers' own cost; --paced keeps each site's NAV_LIMITS. Browser configurations need
+the same browsers/drivers as the scrapers; the memory columns need psutil.
+"""
+import os
+import sys
+import json
+import math
+import time
+import queue
+import shutil
+import argparse
+import importlib
+import tempfile
+import threading
+import traceback
+import multiprocessing
+import concurrent.futures
+from contextlib import redirect_stdout
+
+from benchmarks.fixture_server import (
+    FixtureServer, ANB_OPTIONS, DH_PRICING, SEVENTY_SEVEN_SHAPES, SEVENTY_SEVEN_CARATS,
+)
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+MB = 1024 * 1024
+UNPACED_LIMITS = {"rate": 1000.0, "burst": 1000, "max_rate": 1000.0, "target_latency": 120.0}
+
+
+def percentile(values, q):
+    """Nearest-rank percentile (0 for no values)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def discard(rows):
+    """BatchedWriter flush that drops the batch: benchmarks measure scraping, not Postgres."""
+
+
+class MemorySampler:
+    """Peak RSS of this process and all of its children (browsers, drivers), sampled in the background."""
+
+    def __init__(self, interval=0.25):
+        self.interval = interval
+        self.baseline_mb = self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        if psutil is None:
+            return 0.0
+        me = psutil.Process()
+        rss = 0
+        for p in [me] + me.children(recursive=True):
+            try:
+                rss += p.memory_info().rss
+            except psutil.Error:
+                continue
+        return rss / MB
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, self.sample())
+
+    def start(self):
+        self.baseline_mb = self.peak_mb = self.sample()
+        self._thread = threading.Thread(target=self._run, name="memory-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.peak_mb = max(self.peak_mb, self.sample())
+
+
+# ---------------------- input rows ----------------------
+def anb_fields(i):
+    metals = [n for n, _ in ANB_OPTIONS["metal_purity"]]
+    carats = [n for n, _ in ANB_OPTIONS["stone_carat"]]
+    clarities = [n for n, _ in ANB_OPTIONS["stone_clarity"]]
+    return {"metal": metals[i % len(metals)], "stone_type": "Diamond",
+            "stone_carat": carats[i // 2 % len(carats)], "clarity": clarities[i // 3 % len(clarities)]}
+
+
+def dh_fields(i):
+    pick = lambda key, n: list(DH_PRICING[key])[n % len(DH_PRICING[key])]
+    return {"shape": pick("shape", i), "carat": pick("carat", i // 2), "clarity": pick("clarity", i // 3),
+            "cut": pick("cut", i)}
+
+
+def seventy_seven_fields(i):
+    metals = ["18KT WG", "18KT YG", "18KT RG", "Platinum"]
+    colors, clarities, cuts = ["G", "F", "E", "H"], ["VS1", "VS2", "SI1", "VVS2"], ["EXCELLENT", "VERY GOOD"]
+    return {"metal": metals[i % len(metals)], "stone_type": "Natural Diamond",
+            "stone_shape": SEVENTY_SEVEN_SHAPES[i % len(SEVENTY_SEVEN_SHAPES)].title(),
+            "stone_carat": SEVENTY_SEVEN_CARATS[2 + i % 8], "color": colors[i % len(colors)],
+            "clarity": clarities[i // 2 % len(clarities)], "cut": cuts[i % len(cuts)],
+            "category": "Engagement Rings", "sub_category": "Solitaire", "collection_no": f"F{i // 3}"}
+
+
+def make_tasks(site, fields, base_url, rows, variants):
+    """`rows` input rows, `variants` per product URL, like a real input file."""
+    from utils.task_reader import Task
+    return [Task(idx=i, product_url=f"{base_url}/{site}/product/{i // variants + 1}", fields=fields(i))
+            for i in range(rows)]
+
+
+# ---------------------- configurations ----------------------
+class Bench:
+    """One configuration: setup() redirects the scraper's outputs, run_row() scrapes one task."""
+    site = ""
+    fields = None
+
+    def __init__(self, workers, workdir, options):
+        self.workers = workers
+        self.workdir = workdir
+        self.options = options
+
+    def concurrency(self):
+        return self.workers
+
+    def configure_pacing(self, module):
+        from utils import rate_limiter
+        if self.options["paced"]:
+            rate_limiter.configure(**getattr(module, "NAV_LIMITS", {}))
+        else:
+            n = self.concurrency()
+            rate_limiter.configure(**UNPACED_LIMITS, concurrency=n, max_concurrency=n)
+
+    def setup(self):
+        pass
+
+    def run_row(self, task):
+        raise NotImplementedError
+
+    def teardown(self):
+        pass
+
+    def run(self, tasks):
+        """[(status, seconds)] per task."""
+        def timed(task):
+            start = time.monotonic()
+            try:
+                status = self.run_row(task)
+            except Exception as e:
+                print(f"❌ Row {task.idx + 1} crashed: {e}")
+                status = "error"
+            return status, time.monotonic() - start
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="T") as executor:
+            return list(executor.map(timed, tasks))
+
+
+class AnbBench(Bench):
+    site = "anb"
+    fields = staticmethod(anb_fields)
+    fetch_mode = "http_first"
+
+    def setup(self):
+        from scrapers import anb_scraper as anb
+        self.anb = anb
+        anb.OUTPUT_CSV = os.path.join(self.workdir, "anb_results.csv")
+        anb.SCREENSHOTS_DIR = os.path.join(self.workdir, "screenshots")
+        anb.SCREENSHOT_POLICY = "never"
+        anb.SELECTOR_STATS_PATH = os.path.join(self.workdir, "selector_stats.json")
+        anb.FINGERPRINT_PATH = os.path.join(self.workdir, "fingerprints.sqlite3")
+        anb.CHANGE_DETECTION = False
+        anb.FETCH_MODE = self.fetch_mode
+        anb.HEADLESS = self.options["headless"]
+        anb.UNLIMITED_RETRY = False
+        anb.MAX_ATTEMPTS_PER_URL = 3
+        self.configure_pacing(anb)
+        self.pool = anb.build_scraper_pool(self.workers)  # browsers start on first use
+
+    def run_row(self, task):
+        row_out = self.anb.threaded_worker((task.idx, task), self.pool)
+        return "ok" if row_out.get("status") == "success" else row_out.get("status") or "error"
+
+    def teardown(self):
+        self.pool.close()
+        self.anb.close_standby()
+        self.anb.close_screenshots()
+        self.anb.close_selector_registry()
+        self.anb.close_result_sink()
+
+
+class AnbHttpBench(AnbBench):
+    def run_row(self, task):
+        return "ok" if self.anb.try_http_fast_path(task.idx, task) else "needs_browser"
+
+
+class AnbBrowserBench(AnbBench):
+    fetch_mode = "browser"
+
+
+class DiamondHeavenBench(Bench):
+    site = "diamond-heaven"
+    fields = staticmethod(dh_fields)
+
+    def setup(self):
+        from scrapers import diamond_heaven as dh
+        from utils.db_writer import BatchedWriter
+        from utils.resume_ledger import ResumeLedger
+        self.dh = dh
+        dh.OUTPUT_DIR = self.workdir
+        dh.LOG_FILE = os.path.join(self.workdir, "scraper_log.txt")
+        dh.FAIL_CSV = os.path.join(self.workdir, "failed_rows.csv")
+        dh.CHANGE_DETECTION = False
+        dh.HEADLESS = self.options["headless"]
+        dh._db_writer = BatchedWriter(discard, site=dh.SOURCE_WEBSITE)
+        self.configure_pacing(dh)
+        self.ledger = ResumeLedger(os.path.join(self.workdir, "ledger.sqlite3"))
+        self.local = threading.local()
+        self.drivers = []
+        self._lock = threading.Lock()
+
+    def run_row(self, task):
+        if getattr(self.local, "driver", None) is None:
+            self.local.driver, self.local.page = self.dh.start_driver(), {}
+            with self._lock:
+                self.drivers.append(self.local.driver)
+        status = self.dh.run_task(self.local.driver, task, self.ledger, self.local.page)
+        return "ok" if status == "success" else status
+
+    def teardown(self):
+        for driver in self.drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        self.dh.close_db_writer()
+        self.ledger.close()
+
+
+class SeventySevenBench(Bench):
+    site = "77diamonds"
+    fields = staticmethod(seventy_seven_fields)
+
+    def setup(self):
+        from utils.db_writer import BatchedWriter
+        self.m = importlib.import_module("scrapers.77diamonds_scraper")
+        self.m.HEADLESS = self.options["headless"]
+        self.m.STANDBY_BROWSERS = self.workers
+        self.m._db_writer = BatchedWriter(discard, site=self.m.SITE)
+        self.configure_pacing(self.m)
+
+    def run_row(self, task):
+        return "ok" if self.m.process_row(task, task.idx) else "error"
+
+    def teardown(self):
+        self.m.close_standby()
+        self.m.close_db_writer()
+
+
+class SeventySevenAsyncBench(Bench):
+    site = "77diamonds"
+    fields = staticmethod(seventy_seven_fields)
+
+    def concurrency(self):
+        return self.workers * self.options["tabs"]
+
+    def setup(self):
+        self.m = importlib.import_module("scrapers.77diamonds")
+        self.configure_pacing(self.m)
+
+    def run(self, tasks):
+        from utils.logger import setup_logger
+
+        results = []
+
+        class Timed(self.m.AsyncSeventySevenScraper):
+            async def scrape(self, tab, url):
+                start = time.monotonic()
+                try:
+                    data = await super().scrape(tab, url)
+                except Exception:
+                    results.append(("error", time.monotonic() - start))
+                    raise
+                results.append(("ok" if data["price"] else "no_price", time.monotonic() - start))
+                return data
+
+        scraper = Timed(setup_logger("bench"), browsers=self.workers, tabs_per_browser=self.options["tabs"],
+                        headless=self.options["headless"])
+        scraper.run_sync([t.product_url for t in tasks])
+        return results
+
+    def teardown(self):
+        from scrapers.base_scraper import shutdown_parse_executor
+        shutdown_parse_executor()
+
+
+CONFIGS = {
+    "anb_http": AnbHttpBench,
+    "anb_browser": AnbBrowserBench,
+    "anb_http_first": AnbBench,
+    "diamond_heaven": DiamondHeavenBench,
+    "77diamonds": SeventySevenBench,
+    "77diamonds_async": SeventySevenAsyncBench,
+}
+
+
+# ---------------------- one run (child process) ----------------------
+def run_config(name, workers, base_url, options):
+    """Result dict for one configuration; runs in the calling process."""
+    bench_cls = CONFIGS[name]
+    workdir = tempfile.mkdtemp(prefix=f"bench_{name}_")
+    tasks = make_tasks(bench_cls.site, bench_cls.fields, base_url, options["rows"], options["variants"])
+    memory = MemorySampler()
+    memory.start()
+    bench = bench_cls(workers, workdir, options)
+    try:
+        bench.setup()
+        try:
+            started = time.monotonic()
+            results = bench.run(tasks)
+            wall = time.monotonic() - started
+        finally:
+            bench.teardown()
+    finally:
+        memory.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    latencies = [s for _, s in results]
+    outcomes = {}
+    for status, _ in results:
+        outcomes[status] = outcomes.get(status, 0) + 1
+    ok = outcomes.get("ok", 0)
+    return {
+        "config": name, "workers": workers, "rows": len(tasks), "ok": ok, "outcomes": outcomes,
+        "wall_s": round(wall, 2),
+        "rows_per_min": round(ok / wall * 60, 1) if wall else 0.0,
+        "p50_s": round(percentile(latencies, 0.5), 3), "p95_s": round(percentile(latencies, 0.95), 3),
+        "peak_rss_mb": round(memory.peak_mb, 1) if psutil else None,
+        "mb_per_worker": round((memory.peak_mb - memory.baseline_mb) / workers, 1) if psutil else None,
+    }
+
+
+def _child(name, workers, base_url, options, results):
+    try:
+        if options["verbose"]:
+            result = run_config(name, workers, base_url, options)
+        else:
+            with open(os.devnull, "w", encoding="utf-8") as devnull, redirect_stdout(devnull):
+                result = run_config(name, workers, base_url, options)
+    except Exception as e:
+        result = {"config": name, "workers": workers, "error": f"{type(e).__name__}: {e}",
+                  "traceback": traceback.format_exc()}
+    results.put(result)
+
+
+def wait_result(proc, results):
+    while True:
+        try:
+            return results.get(timeout=1)
+        except queue.Empty:
+            if not proc.is_alive():
+                return {"config": proc.name, "workers": 0, "error": f"benchmark process exited with {proc.exitcode}"}
+
+
+# ---------------------- report ----------------------
+def format_row(r):
+    if "error" in r:
+        return f"{r['config']:<18} {r['workers']:>3}  failed: {r['error']}"
+    mem = lambda v: f"{v:>9.0f}" if v is not None else f"{'n/a':>9}"
+    other = ", ".join(f"{k} {v}" for k, v in r["outcomes"].items() if k != "ok")
+    return (f"{r['config']:<18} {r['workers']:>3} {r['ok']:>4}/{r['rows']:<4} {r['rows_per_min']:>9.1f} "
+            f"{r['p50_s']:>7.2f} {r['p95_s']:>7.2f} {mem(r['peak_rss_mb'])} {mem(r['mb_per_worker'])} "
+            f"{r['server']['requests']:>6} {r['server']['failed'] + r['server']['blocked']:>5}"
+            f"{'  (' + other + ')' if other else ''}")
+
+
+HEADER = (f"{'config':<18} {'wrk':>3} {'ok/rows':>9} {'rows/min':>9} {'p50 s':>7} {'p95 s':>7} "
+          f"{'peak MB':>9} {'MB/wrk':>9} {'reqs':>6} {'fail':>5}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scraper throughput benchmarks on the local fixture site.")
+    parser.add_argument("--configs", default="anb_http", help=f"comma-separated, from: {', '.join(CONFIGS)}")
+    parser.add_argument("--workers", default="1,4", help="comma-separated worker counts")
+    parser.add_argument("--rows", type=int, default=40)
+    parser.add_argument("--variants", type=int, default=3, help="input rows per product URL")
+    parser.add_argument("--tabs", type=int, default=4, help="tabs per browser (77diamonds_async)")
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--block-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--paced", action="store_true", help="keep each site's NAV_LIMITS")
+    parser.add_argument("--headed", action="store_true", help="show the browsers")
+    parser.add_argument("--verbose", action="store_true", help="keep the scrapers' own output")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    configs = [c.strip() for c in args.configs.split(",") if c.strip()]
+    unknown = [c for c in configs if c not in CONFIGS]
+    if unknown:
+        parser.error(f"unknown configs {unknown}; choose from {list(CONFIGS)}")
+    worker_counts = [int(w) for w in args.workers.split(",") if w.strip()]
+    options = {"rows": args.rows, "variants": args.variants, "tabs": args.tabs, "paced": args.paced,
+               "headless": not args.headed, "verbose": args.verbose}
+    if psutil is None:
+        print("⚠️ psutil not installed: memory columns disabled")
+
+    ctx = multiprocessing.get_context("spawn")
+    report = []
+    with FixtureServer(latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate,
+                       block_rate=args.block_rate, seed=args.seed) as server:
+        print(f"🧪 Fixture site {server.base_url}: latency {args.latency}s ± {args.jitter}s, "
+              f"failures {args.failure_rate:.0%}, blocks {args.block_rate:.0%}, "
+              f"{'paced' if args.paced else 'unpaced'}")
+        print(HEADER)
+        for name in configs:
+            for workers in worker_counts:
+                before = server.stats()
+                results = ctx.Queue()
+                proc = ctx.Process(target=_child, args=(name, workers, server.base_url, options, results),
+                                   name=f"bench-{name}-{workers}")
+                proc.start()
+                try:
+                    result = wait_result(proc, results)
+                except KeyboardInterrupt:
+                    proc.terminate()
+                    raise
+                finally:
+                    proc.join()
+                after = server.stats()
+                result["server"] = {k: after[k] - before[k] for k in after}
+                report.append(result)
+                print(format_row(result))
+                if "traceback" in result and args.verbose:
+                    print(result["traceback"], file=sys.stderr)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": report}, f, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Micro-benchmarks for the HTML extraction helpers, per parsing backend (utils.html_parsing).
+
+    python -m benchmarks.parsers                                # every extractor x installed backend
+    python -m benchmarks.parsers --extractors anb_pdp --repeat 50 --json parsers.json
+    python -m benchmarks.parsers --baseline parsers.json        # deltas against an earlier run
+    python -m benchmarks.parsers --capture                      # re-render the fixture-site fragments
+
+Inputs are the captured fragments in benchmarks/fixtures/fragments/: pages rendered by the
+fixture site (--capture rewrites them) plus anb_panel_live.html, a description panel with
+the markup quirks of the live site (&nbsp;, comments, inline scripts, nested tags).
+
+Reported per (extractor, backend): p50/p95 time per call, peak Python-heap use of one call
+(tracemalloc), the Python blocks one call leaves behind for the cyclic GC to reclaim (with
+the output itself; bs4 trees are reference cycles, lxml/lexbor trees are freed at once), and
+whether the output equals the html.parser reference. selectolax allocates lexbor's
+document arena (about 1 MiB) through Python's allocator, so it shows in the peak; lxml
+builds libxml2 trees with the C allocator, which tracemalloc does not see.
+A backend whose output differs is a bug in utils.html_parsing, and the run exits non-zero.
+"""
+import gc
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+import tracemalloc
+from urllib.parse import parse_qs
+
+from scrapers import anb_http
+from utils import html_parsing
+from utils.change_detection import squash
+from benchmarks import fixture_server
+from benchmarks.harness import percentile
+
+FRAGMENTS_DIR = os.path.join(fixture_server.FIXTURES_DIR, "fragments")
+REFERENCE_BACKEND = html_parsing.HTML_PARSER
+
+
+def parse_77diamonds_snapshot(html, backend):
+    scraper = importlib.import_module("scrapers.77diamonds").SeventySevenScraper
+    return scraper.parse_snapshot({"url": "", "title": "", "html": html}, backend)
+
+
+def dh_price_block_text(html, backend):
+    """What diamond_heaven.price_fingerprint digests (that module needs a browser stack to import)."""
+    block = html_parsing.parse(html, backend).select_one("#price-block")
+    return squash(block.text(" ")) if block else ""
+
+
+# name -> (fragment file, extractor(html, backend))
+EXTRACTORS = {
+    "anb_pdp": ("anb_pdp.html", anb_http.parse_pdp),
+    "anb_cart": ("anb_cart.html", anb_http.parse_pdp),
+    "anb_description": ("anb_panel.html", anb_http.description_from_panel_html),
+    "anb_description_live": ("anb_panel_live.html", anb_http.description_from_panel_html),
+    "dh_price_block": ("diamond_heaven_product.html", dh_price_block_text),
+    "77diamonds_snapshot": ("77diamonds_product.html", parse_77diamonds_snapshot),
+}
+
+
+def capture():
+    """Render the fixture-site pages the extractors read and write them as fragments."""
+    query = parse_qs("stone_shape=Oval&stone_carat=1.00&stone_clarity=VS1")
+    pdp = fixture_server.render_anb_product(7, query)
+    pages = {
+        "anb_pdp.html": pdp,
+        "anb_cart.html": fixture_server.render_anb_cart({**query, "product": ["7"]}),
+        "diamond_heaven_product.html": fixture_server.render_diamond_heaven_product(7, {}),
+        "77diamonds_product.html": fixture_server.render_77diamonds_product(7, {}),
+    }
+    # The browser flow parses the panel's innerHTML, not the whole page
+    doc = html_parsing.parse(pdp, REFERENCE_BACKEND)
+    panel = next(p for p in doc.select(".panel") if "You have selected" in p.text(" "))
+    outer = panel.html
+    pages["anb_panel.html"] = outer[outer.index(">") + 1:outer.rindex("<")]
+
+    os.makedirs(FRAGMENTS_DIR, exist_ok=True)
+    for name, html in pages.items():
+        with open(os.path.join(FRAGMENTS_DIR, name), "w", encoding="utf-8", newline="\n") as f:
+            f.write(html)
+        print(f"📝 {name} ({len(html):,} bytes)")
+
+
+def load(name):
+    with open(os.path.join(FRAGMENTS_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def time_calls(fn, html, backend, repeat, number):
+    """Seconds per call for `repeat` samples of `number` calls each."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn(html, backend)
+        samples.append((time.perf_counter() - start) / number)
+    return samples
+
+
+def trace_call(fn, html, backend):
+    """(peak KiB, blocks left for the cyclic GC) of one call on the Python heap."""
+    gc.collect()
+    gc.disable()
+    tracemalloc.start()
+    try:
+        blocks = sys.getallocatedblocks()
+        output = fn(html, backend)
+        blocks = sys.getallocatedblocks() - blocks
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        gc.enable()
+    del output
+    return peak / 1024, blocks
+
+
+def bench(name, backend, repeat, number):
+    fragment, fn = EXTRACTORS[name]
+    html = load(fragment)
+    output = fn(html, backend)
+    for _ in range(3):  # warm caches (compiled selectors, imports)
+        fn(html, backend)
+    samples = time_calls(fn, html, backend, repeat, number)
+    peak_kib, blocks = trace_call(fn, html, backend)
+    return {
+        "extractor": name, "backend": backend, "bytes": len(html),
+        "p50_us": percentile(samples, 0.5) * 1e6, "p95_us": percentile(samples, 0.95) * 1e6,
+        "peak_kib": peak_kib, "blocks": blocks,
+    }, output
+
+
+def format_row(r, base=None):
+    delta = ""
+    if base:
+        delta = (f"  Δ p50 {(r['p50_us'] / base['p50_us'] - 1) * 100:+.0f}%"
+                 f", Δ peak {(r['peak_kib'] / base['peak_kib'] - 1) * 100 if base['peak_kib'] else 0:+.0f}%")
+    same = "yes" if r["same"] else "NO"
+    return (f"{r['extractor']:<22} {r['backend']:<12} {r['bytes']:>8,} {r['p50_us']:>10.1f} {r['p95_us']:>10.1f} "
+            f"{r['peak_kib']:>9.1f} {r['blocks']:>7} {same:>5}{delta}")
+
+
+HEADER = (f"{'extractor':<22} {'backend':<12} {'bytes':>8} {'p50 µs':>10} {'p95 µs':>10} "
+          f"{'peak KiB':>9} {'blocks':>7} {'same':>5}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTML extraction micro-benchmarks per parsing backend.")
+    parser.add_argument("--extractors", default=",".join(EXTRACTORS), help=f"comma-separated, from: {', '.join(EXTRACTORS)}")
+    parser.add_argument("--backends", default=",".join(html_parsing.AVAILABLE_BACKENDS),
+                        help=f"comma-separated, installed: {', '.join(html_parsing.AVAILABLE_BACKENDS)}")
+    parser.add_argument("--repeat", type=int, default=20, help="timing samples per extractor/backend")
+    parser.add_argument("--number", type=int, default=20, help="calls per timing sample")
+    parser.add_argument("--baseline", help="earlier --json output to compare against")
+    parser.add_argument("--capture", action="store_true", help="re-render the fixture fragments and exit")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    if args.capture:
+        capture()
+        return
+    names = [n.strip() for n in args.extractors.split(",") if n.strip()]
+    unknown = [n for n in names if n not in EXTRACTORS]
+    if unknown:
+        parser.error(f"unknown extractors {unknown}; choose from {list(EXTRACTORS)}")
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    missing = [b for b in backends if b not in html_parsing.AVAILABLE_BACKENDS]
+    if missing:
+        parser.error(f"backends not installed: {missing}")
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = {(r["extractor"], r["backend"]): r for r in json.load(f)["results"]}
+
+    print(f"🧪 Parsing backends: {', '.join(backends)} (reference {REFERENCE_BACKEND}), "
+          f"{args.repeat} x {args.number} calls")
+    print(HEADER)
+    report, mismatches = [], 0
+    for name in names:
+        reference = EXTRACTORS[name][1](load(EXTRACTORS[name][0]), REFERENCE_BACKEND)
+        for backend in backends:
+            result, output = bench(name, backend, args.repeat, args.number)
+            result["same"] = output == reference
+            mismatches += not result["same"]
+            report.append(result)
+            print(format_row(result, baseline.get((name, backend))))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": report}, f, indent=2)
+        print(f"💾 Results written to {args.json}")
+    if mismatches:
+        print(f"❌ {mismatches} extractor/backend pair(s) differ from {REFERENCE_BACKEND}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Memory/CPU watchdog for long-lived browsers.
+
+    watchdog = BrowserWatchdog(max_rss_mb=1500, max_cpu_percent=90)
+    reason = watchdog.check(driver, "T0")      # None, or why the browser should be recycled
+
+check() samples the driver's whole process tree (chromedriver/geckodriver, the browser and
+every renderer/GPU/utility child) and returns a reason when the tree's RSS is over
+`max_rss_mb`, or its CPU stayed over `max_cpu_percent` (of one core) for `cpu_strikes`
+checks in a row — a single busy page load does not count. Call it between tasks, e.g. from
+a DriverPool health_check, and recycle the browser when it returns a reason.
+
+metrics() / summary() expose the latest and peak numbers per browser plus host memory.
+Needs psutil; without it every check passes and a warning is printed once.
+"""
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+MB = 1024 * 1024
+
+
+def root_pids(driver):
+    """Driver service process and, when known (undetected-chromedriver), the browser process."""
+    pids = []
+    service = getattr(driver, "service", None)
+    process = getattr(service, "process", None)
+    if process is not None and getattr(process, "pid", None):
+        pids.append(process.pid)
+    browser_pid = getattr(driver, "browser_pid", None)
+    if browser_pid and browser_pid not in pids:
+        pids.append(browser_pid)
+    return pids
+
+
+def process_tree(pids):
+    procs = {}
+    for pid in pids:
+        try:
+            root = psutil.Process(pid)
+            for p in [root] + root.children(recursive=True):
+                procs[p.pid] = p
+        except psutil.Error:
+            continue
+    return list(procs.values())
+
+
+class BrowserWatchdog:
+    def __init__(self, max_rss_mb=1500, max_cpu_percent=None, cpu_strikes=3):
+        self.max_rss_mb = max_rss_mb
+        self.max_cpu_percent = max_cpu_percent
+        self.cpu_strikes = cpu_strikes
+        self.recycled = 0
+        self._lock = threading.Lock()
+        self._stats = {}  # root pid -> {"name", "rss_mb", "peak_rss_mb", "cpu_percent", "processes", ...}
+        self._cpu = {}    # root pid -> (cpu seconds, monotonic time)
+        self._strikes = {}
+        self._warned = False
+
+    def sample(self, driver):
+        """(root pid, rss MB, CPU % since the previous sample or None, process count), or None."""
+        if psutil is None:
+            if not self._warned:
+                print("⚠️ psutil not installed: browser watchdog disabled")
+                self._warned = True
+            return None
+        pids = root_pids(driver)
+        if not pids:
+            return None
+        rss = cpu_seconds = 0.0
+        procs = process_tree(pids)
+        for p in procs:
+            try:
+                rss += p.memory_info().rss
+                t = p.cpu_times()
+                cpu_seconds += t.user + t.system
+            except psutil.Error:
+                continue
+        now = time.monotonic()
+        with self._lock:
+            previous = self._cpu.get(pids[0])
+            self._cpu[pids[0]] = (cpu_seconds, now)
+        cpu_percent = None
+        if previous and now > previous[1]:
+            cpu_percent = max(0.0, (cpu_seconds - previous[0]) / (now - previous[1]) * 100)
+        return pids[0], rss / MB, cpu_percent, len(procs)
+
+    def check(self, driver, name=""):
+        """Sample `driver`; returns a recycle reason, or None if it is within limits."""
+        sampled = self.sample(driver)
+        if sampled is None:
+            return None
+        pid, rss_mb, cpu_percent, processes = sampled
+        with self._lock:
+            stats = self._stats.setdefault(pid, {"name": name, "peak_rss_mb": 0.0, "checks": 0})
+            stats.update(name=name or stats["name"], rss_mb=round(rss_mb, 1), processes=processes,
+                         cpu_percent=None if cpu_percent is None else round(cpu_percent, 1))
+            stats["peak_rss_mb"] = round(max(stats["peak_rss_mb"], rss_mb), 1)
+            stats["checks"] += 1
+
+            reason = None
+            if self.max_rss_mb and rss_mb > self.max_rss_mb:
+                reason = f"RSS {rss_mb:.0f} MB > {self.max_rss_mb} MB"
+            if self.max_cpu_percent and cpu_percent is not None:
+                if cpu_percent > self.max_cpu_percent:
+                    self._strikes[pid] = self._strikes.get(pid, 0) + 1
+                else:
+                    self._strikes[pid] = 0
+                if self._strikes[pid] >= self.cpu_strikes and reason is None:
+                    reason = f"CPU {cpu_percent:.0f}% > {self.max_cpu_percent}% for {self._strikes[pid]} checks"
+            if reason:
+                self.recycled += 1
+        if reason:
+            print(f"🐏 Watchdog [{name}]: {reason} ({processes} processes) — recycling browser")
+        return reason
+
+    def forget(self, driver):
+        """Drop the live numbers of a browser that was closed (its peak stays in the totals)."""
+        pids = root_pids(driver)
+        if not pids:
+            return
+        with self._lock:
+            stats = self._stats.get(pids[0])
+            if stats:
+                stats["closed"] = True
+            self._cpu.pop(pids[0], None)
+            self._strikes.pop(pids[0], None)
+
+    def metrics(self):
+        """{"browsers": {pid: stats}, "live_rss_mb", "peak_rss_mb", "host_available_mb"}."""
+        with self._lock:
+            browsers = {pid: dict(s) for pid, s in self._stats.items()}
+        live = [s for s in browsers.values() if not s.get("closed")]
+        out = {
+            "browsers": browsers,
+            "live_browsers": len(live),
+            "live_rss_mb": round(sum(s["rss_mb"] for s in live), 1),
+            "peak_rss_mb": max((s["peak_rss_mb"] for s in browsers.values()), default=0.0),
+            "recycled": self.recycled,
+        }
+        if psutil is not None:
+            out["host_available_mb"] = round(psutil.virtual_memory().available / MB, 1)
+        return out
+
+    def summary(self):
+        m = self.metrics()
+        line = (f"watchdog: {m['live_browsers']} live browsers using {m['live_rss_mb']:.0f} MB, "
+                f"peak per browser {m['peak_rss_mb']:.0f} MB, {m['recycled']} recycled")
+        if "host_available_mb" in m:
+            line += f", host free {m['host_available_mb']:.0f} MB"
+        return line
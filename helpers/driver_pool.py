@@ -0,0 +1,106 @@
+import queue
+import threading
+from contextlib import contextmanager
+
+
+class DriverPool:
+    """
+    Keeps long-lived browser sessions and hands them to workers one task at a time.
+
+    - factory():          builds a new session (a driver, or an object wrapping one)
+    - health_check(s):    returns False if the session must be replaced before its next task
+    - closer(s):          tears a session down
+    - max_tasks:          recycle a session after this many tasks (0/None = never)
+
+    A session released with failed=True is always recycled.
+    """
+
+    def __init__(self, factory, size, max_tasks=25, health_check=None, closer=None):
+        self.factory = factory
+        self.size = size
+        self.max_tasks = max_tasks
+        self.health_check = health_check
+        self.closer = closer
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._uses = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self.created = 0
+        self.recycled = 0
+
+    def _discard(self, session):
+        with self._lock:
+            self._uses.pop(id(session), None)
+            self.recycled += 1
+        try:
+            if self.closer:
+                self.closer(session)
+        except Exception as e:
+            print(f"⚠️ Pool: error closing session: {e}")
+
+    def _healthy(self, session):
+        if not self.health_check:
+            return True
+        try:
+            return bool(self.health_check(session))
+        except Exception:
+            return False
+
+    def acquire(self):
+        if self._closed:
+            raise RuntimeError("DriverPool is closed")
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    session = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                if self._healthy(session):
+                    return session
+                print("🩺 Pool: idle session failed health check, recycling…")
+                self._discard(session)
+
+            session = self.factory()
+            with self._lock:
+                self._uses[id(session)] = 0
+                self.created += 1
+            return session
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, session, failed=False):
+        try:
+            with self._lock:
+                uses = self._uses.get(id(session), 0) + 1
+                self._uses[id(session)] = uses
+            if self._closed or failed or (self.max_tasks and uses >= self.max_tasks):
+                self._discard(session)
+            else:
+                self._idle.put(session)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def session(self):
+        """`with pool.session() as s:` — releases as failed if the block raises."""
+        s = self.acquire()
+        failed = False
+        try:
+            yield s
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.release(s, failed=failed)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(session)
@@ -0,0 +1,93 @@
+import json
+
+# Collects every field of a declarative spec in ONE execute_script call.
+#
+# spec = {
+#     "root":   field spec for the container (optional, defaults to document),
+#     "scroll": True to scrollIntoView the root first,
+#     "fields": {output_key: field spec, ...},
+# }
+#
+# field spec keys:
+#     css / xpath  selector or list of fallbacks, tried in order (none = the scope itself)
+#     scope        field spec resolved first; the selector is then searched inside it
+#     attr         return getAttribute(attr) instead of text
+#     prop         "text" (default, visible text like WebElement.text), "innerText",
+#                  "innerHTML", "textContent", ...
+#     all          True to return a list with the value of every match
+#     fields       nested specs -> list of records, one per match
+#
+# Missing elements come back as None.
+_EXTRACT_JS = r"""
+var spec = arguments[0];
+
+function shown(el) {
+    return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+}
+function list(v) { return v == null ? [] : [].concat(v); }
+
+function findOne(ctx, f) {
+    var css = list(f.css), xp = list(f.xpath);
+    if (!css.length && !xp.length) return ctx;
+    for (var i = 0; i < css.length; i++) {
+        var el = ctx.querySelector(css[i]);
+        if (el) return el;
+    }
+    for (var j = 0; j < xp.length; j++) {
+        var r = document.evaluate(xp[j], ctx, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null);
+        if (r.singleNodeValue) return r.singleNodeValue;
+    }
+    return null;
+}
+function findAll(ctx, f) {
+    var css = list(f.css), xp = list(f.xpath), out = [];
+    for (var i = 0; i < css.length && !out.length; i++) {
+        out = Array.prototype.slice.call(ctx.querySelectorAll(css[i]));
+    }
+    for (var j = 0; j < xp.length && !out.length; j++) {
+        var r = document.evaluate(xp[j], ctx, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        for (var k = 0; k < r.snapshotLength; k++) out.push(r.snapshotItem(k));
+    }
+    return out;
+}
+function value(el, f) {
+    if (!el) return null;
+    if (f.attr) return el.getAttribute(f.attr);
+    var prop = f.prop || "text";
+    if (prop === "text") return shown(el) ? el.innerText.trim() : "";
+    var v = el[prop];
+    return v == null ? null : String(v).trim();
+}
+function run(ctx, fields) {
+    var out = {};
+    Object.keys(fields).forEach(function (key) {
+        var f = fields[key];
+        var scope = f.scope ? findOne(ctx, f.scope) : ctx;
+        if (!scope) { out[key] = f.fields || f.all ? [] : null; return; }
+        if (f.fields) {
+            out[key] = findAll(scope, f).map(function (n) { return run(n, f.fields); });
+        } else if (f.all) {
+            out[key] = findAll(scope, f).map(function (n) { return value(n, f); });
+        } else {
+            out[key] = value(findOne(scope, f), f);
+        }
+    });
+    return out;
+}
+
+var root = spec.root ? findOne(document, spec.root) : document;
+if (!root) return null;
+if (spec.scroll && root.scrollIntoView) root.scrollIntoView(true);
+return JSON.stringify(run(root, spec.fields || {}));
+"""
+
+
+def extract(driver, spec):
+    """Run `spec` in the page and return a dict, or None if the root is missing."""
+    raw = driver.execute_script(_EXTRACT_JS, spec)
+    return json.loads(raw) if raw else None
+
+
+def text_or_empty(value):
+    """None -> "" so results keep the old find_element-with-fallback shape."""
+    return "" if value is None else value
@@ -0,0 +1,122 @@
+"""
+Set a two-handle vue-slider (vue-slider-component) to an index range.
+
+    method = set_range(driver, section, lo=2, hi=2, steps=8)   # "component" / "events" / "drag" / None
+
+One async script call tries, in order:
+    component  the slider's own API (setIndex on the Vue 2 `__vue__` instance or the Vue 3 proxy)
+    events     mousedown on each handle, mousemove/mouseup on the document at the target x,
+               computed from the rail's current bounding box
+and reads the applied range back from the handle positions. Only when both miss does it
+fall back to an ActionChains drag, aimed at absolute rail offsets rather than relative moves.
+
+`steps` is the number of intervals on the rail (number of levels - 1).
+"""
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.action_chains import ActionChains
+
+COMPONENT, EVENTS, DRAG = "component", "events", "drag"
+
+_RANGE_JS = r"""
+function sliderOf(root) {
+    return root.matches('.vue-slider') ? root : root.querySelector('.vue-slider');
+}
+function readIndexes(slider, steps) {
+    var rail = slider.querySelector('.vue-slider-rail');
+    var r = rail && rail.getBoundingClientRect();
+    if (!r || !r.width) return null;
+    var out = Array.prototype.map.call(slider.querySelectorAll('.vue-slider-dot'), function (d) {
+        var b = d.getBoundingClientRect();
+        return Math.round((b.left + b.width / 2 - r.left) / r.width * steps);
+    });
+    return out.sort(function (a, b) { return a - b; });
+}
+"""
+
+_SET_RANGE_JS = _RANGE_JS + r"""
+var root = arguments[0], lo = arguments[1], hi = arguments[2], steps = arguments[3];
+var done = arguments[arguments.length - 1];
+var slider = sliderOf(root);
+if (!slider) { done({ok: false, error: 'no .vue-slider'}); return; }
+
+function applied() {
+    var got = readIndexes(slider, steps);
+    return !!got && got.length === 2 && got[0] === lo && got[1] === hi;
+}
+function finish(method) {
+    done({ok: applied(), method: method, indexes: readIndexes(slider, steps)});
+}
+function later(fn) { setTimeout(fn, 80); }  // let Vue re-render before reading back
+
+function component() {
+    if (slider.__vue__ && typeof slider.__vue__.setIndex === 'function') return slider.__vue__;
+    var inst = slider.__vueParentComponent;
+    for (var depth = 0; inst && depth < 3; depth++, inst = inst.parent) {
+        if (inst.proxy && typeof inst.proxy.setIndex === 'function') return inst.proxy;
+    }
+    return null;
+}
+function drag(dot, index) {
+    var r = slider.querySelector('.vue-slider-rail').getBoundingClientRect();
+    var b = dot.getBoundingClientRect();
+    var y = b.top + b.height / 2, x1 = r.left + r.width * index / steps;
+    function ev(type, x) {
+        return new MouseEvent(type, {bubbles: true, cancelable: true, view: window,
+                                     clientX: x, clientY: y, button: 0, buttons: 1});
+    }
+    dot.dispatchEvent(ev('mousedown', b.left + b.width / 2));
+    document.dispatchEvent(ev('mousemove', x1));
+    document.dispatchEvent(ev('mouseup', x1));
+}
+function byEvents() {
+    var dots = slider.querySelectorAll('.vue-slider-dot');
+    if (dots.length !== 2) { done({ok: false, error: dots.length + ' handles', indexes: readIndexes(slider, steps)}); return; }
+    drag(dots[0], lo);
+    later(function () {
+        drag(slider.querySelectorAll('.vue-slider-dot')[1], hi);
+        later(function () { finish('events'); });
+    });
+}
+
+var comp = component();
+if (!comp) { byEvents(); return; }
+try { comp.setIndex([lo, hi]); } catch (e) { byEvents(); return; }
+later(function () { if (applied()) finish('component'); else byEvents(); });
+"""
+
+_READ_RANGE_JS = _RANGE_JS + r"""
+var slider = sliderOf(arguments[0]);
+return slider ? readIndexes(slider, arguments[1]) : null;
+"""
+
+
+def read_range(driver, root, steps):
+    """[lo, hi] handle indexes as currently rendered, or None."""
+    return driver.execute_script(_READ_RANGE_JS, root, steps)
+
+
+def _drag(driver, root, lo, hi, steps):
+    rail = root.find_element(By.CSS_SELECTOR, ".vue-slider-rail")
+    dots = root.find_elements(By.CSS_SELECTOR, ".vue-slider-dot")
+    if len(dots) != 2:
+        return False
+    width = rail.size["width"]
+    for dot, index in zip(dots, (lo, hi)):
+        # move_to_element_with_offset is relative to the rail's centre
+        dx = round(width * index / steps - width / 2)
+        ActionChains(driver).click_and_hold(dot).move_to_element_with_offset(rail, dx, 0).release().perform()
+    return read_range(driver, root, steps) == [lo, hi]
+
+
+def set_range(driver, root, lo, hi, steps):
+    """
+    Set the slider inside `root` (a WebElement) to the [lo, hi] index range.
+    Returns the method that produced a verified range, or None if nothing did.
+    """
+    if not 0 <= lo <= hi <= steps:
+        raise ValueError(f"Invalid slider range [{lo}, {hi}] for {steps} steps")
+    result = driver.execute_async_script(_SET_RANGE_JS, root, lo, hi, steps) or {}
+    if result.get("ok"):
+        return result["method"]
+    print(f"⚠️ Slider not set by script ({result.get('error') or result.get('indexes')}), dragging")
+    return DRAG if _drag(driver, root, lo, hi, steps) else None
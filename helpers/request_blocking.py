@@ -0,0 +1,325 @@
+"""
+Per-site network blocking for the driver factories.
+
+A profile lists resource categories to block (images, fonts, media, analytics, chat,
+widgets) plus extra URL patterns, and an allow list of URL globs the site needs to
+render prices: a URL matching an allow glob is never blocked, so allowing
+"*v12finance.com/*" keeps the V12 finance widget's images and fonts loading on a page
+whose other images and fonts are blocked.
+
+- Chrome / undetected-chromedriver: CDP Network.setBlockedURLs (apply_chrome after start).
+  setBlockedURLs cannot make exceptions, so profiles with an allow list go through a
+  FetchBlocker instead: it pauses the requests matching a block pattern (CDP Fetch domain)
+  and fails or continues each one. chrome_logging beforehand, only when pages are
+  reported, lets blocked requests be counted from the performance log.
+- Firefox: preferences (firefox_preferences) — images, fonts and autoplay media are
+  switched off and analytics/chat/widgets go through strict tracking protection.
+  Firefox cannot count what it blocked, only what it loaded.
+
+page_report(driver) reports per page what was loaded and blocked, with an estimate of the
+bytes saved (blocked requests are never fetched, so their size is estimated per category).
+"""
+import json
+import math
+import threading
+from fnmatch import fnmatchcase
+from urllib.request import urlopen
+
+CATEGORIES = {
+    "images": ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.avif*", "*.svg*", "*.ico*"],
+    "fonts": ["*.woff*", "*.ttf*", "*.otf*", "*.eot*",
+              "*fonts.googleapis.com*", "*fonts.gstatic.com*", "*use.typekit.net*"],
+    "media": ["*.mp4*", "*.webm*", "*.mov*", "*.m3u8*", "*youtube.com/embed*", "*player.vimeo.com*"],
+    "analytics": ["*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+                  "*connect.facebook.net*", "*hotjar.com*", "*clarity.ms*", "*cdn.segment.com*",
+                  "*bat.bing.com*", "*analytics.tiktok.com*", "*ct.pinterest.com*", "*criteo.*",
+                  "*taboola.com*", "*klaviyo.com*"],
+    "chat": ["*intercom.io*", "*intercomcdn.com*", "*zendesk.com*", "*zopim.com*",
+             "*livechatinc.com*", "*tawk.to*", "*drift.com*", "*tidio.co*"],
+    "widgets": ["*trustpilot.com*", "*feefo.com*", "*yotpo.com*", "*reviews.io*", "*smartsupp*"],
+}
+
+# Rough average transfer size per blocked request, only used for the savings estimate
+AVG_BYTES = {"images": 60_000, "fonts": 35_000, "media": 400_000,
+             "analytics": 40_000, "chat": 120_000, "widgets": 50_000, "other": 30_000}
+
+PROFILES = {
+    "none": {"block": [], "extra": [], "allow": []},
+    "default": {"block": ["images", "fonts", "media", "analytics", "chat", "widgets"], "extra": [], "allow": []},
+    # Prices and the cart payload are in the HTML; screenshots stay readable without images
+    "anb": {"block": ["images", "fonts", "media", "analytics", "chat", "widgets"], "extra": [], "allow": []},
+    # The diamond list and the vue-slider filters are plain DOM
+    "77diamonds": {"block": ["images", "fonts", "media", "analytics", "chat", "widgets"], "extra": [], "allow": []},
+    # The monthly finance figure (.v12_montly_pay_cart) is rendered by the V12 widget
+    "diamond_heaven": {"block": ["images", "fonts", "media", "analytics", "chat", "widgets"], "extra": [],
+                       "allow": ["*v12finance.com/*", "*v12retailfinance.com/*"]},
+}
+
+
+def _profile(profile):
+    if isinstance(profile, dict):
+        return profile
+    return PROFILES.get(profile or "default", PROFILES["default"])
+
+
+def blocked_patterns(profile):
+    """CDP URL patterns for a profile: its blocked categories plus its extra patterns."""
+    p = _profile(profile)
+    patterns = [pat for cat in p.get("block", []) for pat in CATEGORIES.get(cat, [])]
+    return patterns + list(p.get("extra", []))
+
+
+def allowed_urls(profile):
+    return list(_profile(profile).get("allow", []))
+
+
+def is_blocked(url, profile):
+    """What the browser does with `url` under a profile: allow globs win over block patterns."""
+    if any(fnmatchcase(url, a) for a in allowed_urls(profile)):
+        return False
+    return any(fnmatchcase(url, pat) for pat in blocked_patterns(profile))
+
+
+def network_patterns(profile):
+    """Patterns for Network.setBlockedURLs; empty when the profile needs a FetchBlocker."""
+    return [] if allowed_urls(profile) else blocked_patterns(profile)
+
+
+def category_of(url):
+    for cat, patterns in CATEGORIES.items():
+        if any(fnmatchcase(url, pat) for pat in patterns):
+            return cat
+    return "other"
+
+
+# ---------------------- Chrome ----------------------
+def chrome_logging(options):
+    """
+    Enable the performance log so page_report can count blocked requests. Chromedriver
+    buffers it until read, so only use it when every page is reported (reset_report /
+    page_report drain it).
+    """
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return options
+
+
+def cdp_endpoint(driver):
+    """(major version, browser-level websocket URL) of a Chromium driver started by Selenium."""
+    address = driver.capabilities["goog:chromeOptions"]["debuggerAddress"]
+    with urlopen(f"http://{address}/json/version", timeout=10) as r:
+        info = json.load(r)
+    return info["Browser"].split("/")[-1].split(".")[0], info["webSocketDebuggerUrl"]
+
+
+def apply_chrome(driver, profile):
+    patterns = blocked_patterns(profile)
+    if not patterns:
+        return []
+    try:
+        if allowed_urls(profile):
+            FetchBlocker(profile).start_thread(*cdp_endpoint(driver))
+        else:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    except Exception as e:
+        print(f"⚠️ Request blocking not applied: {e}")
+        return []
+    return patterns
+
+
+class FetchBlocker:
+    """
+    Request blocking with an allow list, over one browser-level CDP connection.
+
+    Every page target (existing and new, so the async scrapers' extra tabs too) gets its
+    own session with Fetch enabled for the profile's block patterns; each paused request
+    is failed as BlockedByClient unless it matches an allow glob. start_thread() serves
+    one browser from a daemon thread and stops when the browser goes away.
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.patterns = blocked_patterns(profile)
+
+    def start_thread(self, version, ws_url):
+        thread = threading.Thread(target=self._run_thread, args=(version, ws_url),
+                                  name="fetch-blocker", daemon=True)
+        thread.start()
+        return thread
+
+    def _run_thread(self, version, ws_url):
+        import trio
+        from selenium.webdriver.common.bidi import cdp
+
+        async def main():
+            devtools = cdp.import_devtools(version)
+            async with cdp.open_cdp(ws_url) as conn:
+                await self._serve(conn, devtools)
+
+        try:
+            trio.run(main)
+        except BaseException:
+            pass  # the browser quit; nothing left to block
+
+    async def _serve(self, conn, devtools):
+        import trio
+        target = devtools.target
+        pages = {}
+        events = conn.listen(target.TargetCreated, target.TargetDestroyed, buffer_size=math.inf)
+        async with trio.open_nursery() as nursery:
+            # Discovery reports the targets that already exist as TargetCreated too
+            await conn.execute(target.set_discover_targets(True))
+            async for event in events:
+                if isinstance(event, target.TargetDestroyed):
+                    scope = pages.pop(event.target_id, None)
+                    if scope:
+                        scope.cancel()
+                elif event.target_info.type_ == "page" and event.target_info.target_id not in pages:
+                    pages[event.target_info.target_id] = scope = trio.CancelScope()
+                    nursery.start_soon(self._serve_page, conn, devtools, event.target_info.target_id, scope)
+
+    async def _serve_page(self, conn, devtools, target_id, scope):
+        from selenium.webdriver.common.bidi import cdp
+        fetch = devtools.fetch
+        with scope:
+            session = None
+            try:
+                session = await conn.connect_session(target_id)
+                # Unbounded: a paused request dropped from a full channel would hang its page
+                paused = session.listen(fetch.RequestPaused, buffer_size=math.inf)
+                await session.execute(fetch.enable(
+                    patterns=[fetch.RequestPattern(url_pattern=p) for p in self.patterns]))
+                async for event in paused:
+                    if is_blocked(event.request.url, self.profile):
+                        await session.execute(fetch.fail_request(
+                            event.request_id, devtools.network.ErrorReason.BLOCKED_BY_CLIENT))
+                    else:
+                        await session.execute(fetch.continue_request(event.request_id))
+            except (cdp.BrowserError, cdp.CdpConnectionClosed):
+                pass  # the tab closed under us
+            finally:
+                if session is not None:
+                    conn.sessions.pop(session.session_id, None)
+
+
+# ---------------------- Firefox ----------------------
+def firefox_preferences(profile):
+    blocks = set(_profile(profile).get("block", []))
+    prefs = {}
+    if "images" in blocks:
+        prefs["permissions.default.image"] = 2
+    if "fonts" in blocks:
+        prefs["gfx.downloadable_fonts.enabled"] = False
+    if "media" in blocks:
+        prefs["media.autoplay.default"] = 5
+        prefs["media.autoplay.blocking_policy"] = 2
+    if blocks & {"analytics", "chat", "widgets"}:
+        prefs["browser.contentblocking.category"] = "strict"
+        prefs["privacy.trackingprotection.enabled"] = True
+        prefs["privacy.trackingprotection.socialtracking.enabled"] = True
+    return prefs
+
+
+def apply_firefox(options, profile):
+    for key, value in firefox_preferences(profile).items():
+        options.set_preference(key, value)
+    return options
+
+
+# ---------------------- Reporting ----------------------
+_LOADED_JS = """
+var n = 0, bytes = 0;
+performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'))
+  .forEach(function (e) { n += 1; bytes += e.transferSize || 0; });
+return [n, bytes];
+"""
+
+
+def _blocked_from_log(driver):
+    """Blocked URLs since the last call (the performance log is drained on read)."""
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return None
+    urls, blocked = {}, []
+    for entry in entries:
+        try:
+            msg = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError, TypeError):
+            continue
+        method, params = msg.get("method"), msg.get("params", {})
+        if method == "Network.requestWillBeSent":
+            urls[params.get("requestId")] = params.get("request", {}).get("url", "")
+        elif method == "Network.loadingFailed" and (
+                params.get("blockedReason") == "inspector"  # setBlockedURLs
+                or params.get("errorText") == "net::ERR_BLOCKED_BY_CLIENT"):  # FetchBlocker
+            blocked.append(urls.get(params.get("requestId"), ""))
+    return blocked
+
+
+def page_report(driver):
+    """
+    Loaded/blocked counts for the current page. requests_blocked and est_bytes_saved are
+    None when the browser cannot report them (Firefox, or Chrome without chrome_logging).
+    Cross-origin resources without Timing-Allow-Origin report 0 bytes loaded.
+    """
+    try:
+        loaded, loaded_bytes = driver.execute_script(_LOADED_JS)
+    except Exception:
+        loaded, loaded_bytes = 0, 0
+    report = {"requests_loaded": int(loaded or 0), "bytes_loaded": int(loaded_bytes or 0),
+              "requests_blocked": None, "est_bytes_saved": None, "blocked_by_category": {}}
+    blocked = _blocked_from_log(driver)
+    if blocked is not None:
+        by_cat = {}
+        for url in blocked:
+            cat = category_of(url)
+            by_cat[cat] = by_cat.get(cat, 0) + 1
+        report["requests_blocked"] = len(blocked)
+        report["est_bytes_saved"] = sum(AVG_BYTES.get(c, AVG_BYTES["other"]) * n for c, n in by_cat.items())
+        report["blocked_by_category"] = by_cat
+    _totals.add(report)
+    return report
+
+
+def _mb(n):
+    return f"{n / 1_000_000:.1f} MB"
+
+
+def format_report(report):
+    line = f"loaded {report['requests_loaded']} requests / {_mb(report['bytes_loaded'])}"
+    if report["requests_blocked"] is not None:
+        line = (f"blocked {report['requests_blocked']} requests (≈{_mb(report['est_bytes_saved'])} saved), "
+                + line)
+    return line
+
+
+class _Totals:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pages = self.loaded = self.bytes_loaded = self.blocked = self.est_saved = 0
+
+    def add(self, report):
+        with self._lock:
+            self.pages += 1
+            self.loaded += report["requests_loaded"]
+            self.bytes_loaded += report["bytes_loaded"]
+            self.blocked += report["requests_blocked"] or 0
+            self.est_saved += report["est_bytes_saved"] or 0
+
+    def summary(self):
+        with self._lock:
+            return (f"{self.pages} pages: blocked {self.blocked} requests (≈{_mb(self.est_saved)} saved), "
+                    f"loaded {self.loaded} requests / {_mb(self.bytes_loaded)}")
+
+
+_totals = _Totals()
+
+
+def totals_summary():
+    return _totals.summary()
+
+
+def reset_report(driver):
+    """Drop buffered performance-log entries so the next page_report covers one page only."""
+    _blocked_from_log(driver)
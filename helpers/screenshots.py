@@ -0,0 +1,133 @@
+"""
+Screenshot pipeline: the worker thread only grabs the PNG bytes from the browser (and
+hashes them to spot a repeat of the stream's previous frame); downscaling/WebP encoding
+and the disk write happen on a background thread.
+
+Policies:
+    ALWAYS      every requested screenshot
+    ON_FAILURE  only screenshots taken for a failure (failure=True)
+    SAMPLED     failures plus a random `sample_rate` share of the rest
+    NEVER       nothing
+
+Downscaling and WebP need Pillow (in requirements.txt); without it frames are written as
+the browser's full-size PNG, with one warning per process.
+"""
+import io
+import os
+import queue
+import random
+import hashlib
+import threading
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+ALWAYS, ON_FAILURE, SAMPLED, NEVER = "always", "on_failure", "sampled", "never"
+POLICIES = (ALWAYS, ON_FAILURE, SAMPLED, NEVER)
+
+_STOP = object()
+_warned_no_pillow = False
+
+
+class ScreenshotPipeline:
+    def __init__(self, directory, policy=ON_FAILURE, sample_rate=0.1, fmt="png", max_width=None,
+                 quality=70, dedupe=True, max_queue=64, name="screenshots"):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown screenshot policy: {policy}")
+        self.directory = directory
+        self.policy = policy
+        self.sample_rate = sample_rate
+        self.max_width = max_width
+        self.quality = quality
+        self.dedupe = dedupe
+        if Image is None and (fmt != "png" or max_width):
+            global _warned_no_pillow
+            if not _warned_no_pillow:
+                _warned_no_pillow = True
+                print(f"⚠️ Pillow not installed: screenshots are written as full-size PNG instead of "
+                      f"{fmt}{f' at {max_width}px' if max_width else ''} (pip install Pillow)")
+            fmt, self.max_width = "png", None
+        self.fmt = fmt
+        self.ext = ".webp" if fmt == "webp" else ".png"
+
+        self.captured = self.written = self.duplicates = self.dropped = self.bytes_written = 0
+        self._last_frame = {}  # stream -> (digest, filename) of its previous queued frame
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def wanted(self, failure=False):
+        if self.policy == ALWAYS:
+            return True
+        if self.policy == NEVER:
+            return False
+        if failure:
+            return True
+        return self.policy == SAMPLED and random.random() < self.sample_rate
+
+    def grab(self, driver, basename, stream="default"):
+        """
+        Grab a frame and queue it for writing (the caller already asked wanted()).
+        Returns the file name, or None if dropped. A frame identical to the previous frame
+        of the same `stream` is not written again; its file name is returned instead.
+        """
+        png = driver.get_screenshot_as_png()
+        filename = basename + self.ext
+        digest = hashlib.blake2b(png, digest_size=16).digest() if self.dedupe else None
+        with self._lock:
+            last = self._last_frame.get(stream)
+            if digest is not None and last is not None and last[0] == digest:
+                self.duplicates += 1
+                return last[1]
+        try:
+            self._queue.put_nowait((filename, png))
+        except queue.Full:
+            self.dropped += 1
+            print(f"⚠️ Screenshot queue full, dropped {filename}")
+            return None
+        with self._lock:
+            self._last_frame[stream] = (digest, filename)
+            self.captured += 1
+        return filename
+
+    def _encode(self, png):
+        if self.fmt == "png" and not self.max_width:
+            return png
+        img = Image.open(io.BytesIO(png))
+        if self.max_width and img.width > self.max_width:
+            img = img.resize((self.max_width, round(img.height * self.max_width / img.width)))
+        out = io.BytesIO()
+        if self.fmt == "webp":
+            img.save(out, "WEBP", quality=self.quality, method=4)
+        else:
+            img.save(out, "PNG", optimize=True)
+        return out.getvalue()
+
+    def _write(self, filename, png):
+        data = self._encode(png)
+        with open(os.path.join(self.directory, filename), "wb") as f:
+            f.write(data)
+        self.written += 1
+        self.bytes_written += len(data)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            try:
+                self._write(*item)
+            except Exception as e:
+                print(f"❌ Screenshot write failed for {item[0]}: {e}")
+
+    def close(self, timeout=None):
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def summary(self):
+        return (f"{self.written} screenshots written ({self.bytes_written / 1_000_000:.1f} MB), "
+                f"{self.duplicates} duplicate frames skipped, {self.dropped} dropped, policy: {self.policy}")
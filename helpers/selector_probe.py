@@ -0,0 +1,122 @@
+"""
+Probe a whole list of fallback selectors in one browser round trip.
+
+    hit = probe_first(driver, ["//button[@id='add-to-cart']", ".add-to-cart"], mode=CLICKABLE, timeout=5)
+    if hit:
+        hit.element.click()
+
+The candidates (XPath and CSS mixed) go to the page in a single execute_async_script, which
+re-scans them every `poll` seconds and resolves as soon as one is satisfied, so N sequential
+waits become one. Within a scan, earlier candidates win. A selector starting with "/" or "("
+is XPath, anything else CSS; (By, selector) tuples are accepted as well.
+
+`timeout` must stay below the driver's script timeout (30s by default).
+"""
+from dataclasses import dataclass
+
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import WebDriverException
+
+PRESENT, VISIBLE, CLICKABLE, TEXT = "present", "visible", "clickable", "text"
+MODES = (PRESENT, VISIBLE, CLICKABLE, TEXT)
+
+_PROBE_JS = r"""
+var candidates = arguments[0], mode = arguments[1], timeoutMs = arguments[2], pollMs = arguments[3];
+var done = arguments[arguments.length - 1];
+function nodes(c) {
+    try {
+        if (c[0]) {
+            var snap = document.evaluate(c[1], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            var out = [];
+            for (var i = 0; i < snap.snapshotLength; i++) out.push(snap.snapshotItem(i));
+            return out;
+        }
+        return Array.prototype.slice.call(document.querySelectorAll(c[1]));
+    } catch (e) { return []; }
+}
+function textOf(el) {
+    return String(el.innerText || el.textContent || '').replace(/\u00a0/g, ' ').trim();
+}
+function visible(el) {
+    if (!el.getClientRects().length) return false;
+    var st = window.getComputedStyle(el);
+    return st.visibility !== 'hidden' && st.display !== 'none' && parseFloat(st.opacity || '1') > 0;
+}
+function ok(el) {
+    if (el.nodeType !== 1) return false;
+    if (mode === 'present') return true;
+    if (mode === 'text') return textOf(el).length > 0;
+    if (!visible(el)) return false;
+    return mode !== 'clickable' || !(el.disabled || el.getAttribute('aria-disabled') === 'true');
+}
+var deadline = Date.now() + timeoutMs;
+function scan() {
+    for (var i = 0; i < candidates.length; i++) {
+        var found = nodes(candidates[i]);
+        for (var j = 0; j < found.length; j++) {
+            if (ok(found[j])) { done([i, found[j], textOf(found[j])]); return; }
+        }
+    }
+    if (Date.now() >= deadline) { done(null); return; }
+    setTimeout(scan, pollMs);
+}
+scan();
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class ProbeHit:
+    """The candidate that matched: its selector, position in the probed list, element and text."""
+    selector: str
+    index: int
+    element: object
+    text: str
+
+
+def is_xpath(selector):
+    return selector.startswith("/") or selector.startswith("(")
+
+
+def _normalize(candidate):
+    if isinstance(candidate, tuple):
+        by, sel = candidate
+        return by == By.XPATH, sel
+    return is_xpath(candidate), candidate
+
+
+def probe_first(driver, candidates, mode=CLICKABLE, timeout=5, poll=0.1):
+    """
+    First candidate satisfying `mode` within `timeout` seconds, as a ProbeHit, else None.
+    timeout=0 scans once without waiting.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown probe mode: {mode}")
+    candidates = list(candidates)
+    if not candidates:
+        return None
+    try:
+        found = driver.execute_async_script(
+            _PROBE_JS, [_normalize(c) for c in candidates], mode, int(timeout * 1000), int(poll * 1000))
+    except WebDriverException as e:
+        print(f"⚠️ Selector probe failed: {e.msg if hasattr(e, 'msg') else e}")
+        return None
+    if not found:
+        return None
+    index, element, text = found
+    candidate = candidates[index]
+    selector = candidate[1] if isinstance(candidate, tuple) else candidate
+    return ProbeHit(selector, index, element, text or "")
+
+
+def probe_ranked(driver, registry, group, candidates, **kwargs):
+    """
+    probe_first over `candidates` ordered by a SelectorRegistry, recording the outcome:
+    the candidates ranked above the hit count as misses, the hit as a hit.
+    """
+    ordered = registry.ordered(group, candidates)
+    hit = probe_first(driver, ordered, **kwargs)
+    if hit is None:
+        registry.record(group, ordered, None)
+    else:
+        registry.record(group, ordered[:hit.index + 1], hit.selector)
+    return hit
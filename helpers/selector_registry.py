@@ -0,0 +1,88 @@
+import os
+import json
+import threading
+
+DEFAULT_REGISTRY_PATH = "selector_stats.json"
+
+
+class SelectorRegistry:
+    """
+    Per-site hit statistics for fallback selector lists, persisted as JSON across runs.
+
+    ordered(group, candidates) returns the candidates best-first by smoothed hit rate
+    (hits + 1) / (tries + 2): a selector that keeps missing sinks below the rest, and
+    unseen selectors keep their listed order. record() stores which ones were tried and
+    which matched (helpers.selector_probe.probe_ranked does both).
+
+    Stats are written on save() (and every `autosave_every` records); the file is re-read
+    and merged before writing, so concurrent runs add up instead of overwriting each other.
+    """
+
+    def __init__(self, site, path=DEFAULT_REGISTRY_PATH, autosave_every=25):
+        self.site = site
+        self.path = path
+        self.autosave_every = autosave_every
+        self._lock = threading.Lock()
+        self._stats = self._load().get(site, {})  # group -> selector -> [hits, tries]
+        self._delta = {}
+        self._unsaved = 0
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Selector stats unreadable ({e}); starting fresh")
+            return {}
+
+    @staticmethod
+    def _score(entry):
+        hits, tries = entry
+        return (hits + 1) / (tries + 2)
+
+    def ordered(self, group, candidates):
+        with self._lock:
+            stats = self._stats.get(group, {})
+            ranked = sorted(enumerate(candidates),
+                            key=lambda p: (-self._score(stats.get(p[1], (0, 0))), p[0]))
+        return [sel for _, sel in ranked]
+
+    def record(self, group, tried, matched=None):
+        """`tried`: selectors probed in order; `matched`: the one that hit (None = all missed)."""
+        with self._lock:
+            for sel in tried:
+                hit = 1 if sel == matched else 0
+                for table in (self._stats, self._delta):
+                    entry = table.setdefault(group, {}).setdefault(sel, [0, 0])
+                    entry[0] += hit
+                    entry[1] += 1
+            self._unsaved += 1
+            autosave = self.autosave_every and self._unsaved >= self.autosave_every
+        if autosave:
+            self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            delta, self._delta, self._unsaved = self._delta, {}, 0
+        if not delta:
+            return
+        data = self._load()
+        site = data.setdefault(self.site, {})
+        for group, sels in delta.items():
+            for sel, (hits, tries) in sels.items():
+                entry = site.setdefault(group, {}).setdefault(sel, [0, 0])
+                entry[0] += hits
+                entry[1] += tries
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def report(self, group):
+        with self._lock:
+            stats = self._stats.get(group, {})
+            return {sel: {"hits": h, "tries": t} for sel, (h, t) in stats.items()}
@@ -0,0 +1,114 @@
+import time
+
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import (
+    NoSuchElementException, StaleElementReferenceException, JavascriptException
+)
+
+# Exceptions that just mean "not ready yet" while the page re-renders
+_TRANSIENT = (NoSuchElementException, StaleElementReferenceException, JavascriptException)
+
+
+def wait_for(driver, condition, timeout=10, poll=0.25):
+    """
+    Poll condition(driver) until it is truthy or `timeout` seconds pass.
+    Never raises on timeout — the caller carries on just like after a fixed sleep.
+    Returns (ok, waited_seconds).
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    while True:
+        try:
+            if condition(driver):
+                return True, time.monotonic() - start
+        except _TRANSIENT:
+            pass
+        now = time.monotonic()
+        if now >= deadline:
+            return False, now - start
+        time.sleep(min(poll, deadline - now))
+
+
+class WaitLog:
+    """Runs per-step waits against one driver and reports how long each actually took."""
+
+    def __init__(self, driver, default_timeout=10, poll=0.25):
+        self.driver = driver
+        self.default_timeout = default_timeout
+        self.poll = poll
+        self.steps = []  # (label, waited, cap, ok)
+
+    def until(self, condition, label, timeout=None):
+        cap = self.default_timeout if timeout is None else timeout
+        ok, waited = wait_for(self.driver, condition, timeout=cap, poll=self.poll)
+        self.steps.append((label, waited, cap, ok))
+        mark = "⏱️" if ok else "⌛"
+        state = "ready" if ok else "gave up"
+        print(f"{mark} {label}: {state} after {waited:.2f}s (cap {cap}s)")
+        return ok
+
+    def summary(self):
+        waited = sum(s[1] for s in self.steps)
+        capped = sum(s[2] for s in self.steps)
+        timeouts = sum(1 for s in self.steps if not s[3])
+        print(f"⏱️ Waited {waited:.1f}s over {len(self.steps)} steps "
+              f"(fixed sleeps: {capped:.0f}s, saved {capped - waited:.1f}s, timeouts: {timeouts})")
+        return {"waited": waited, "capped": capped, "timeouts": timeouts}
+
+
+# ---------------------- generic ready predicates ----------------------
+def document_ready(driver):
+    return driver.execute_script("return document.readyState") == "complete"
+
+
+def css_present(selector):
+    def _cond(driver):
+        return len(driver.find_elements(By.CSS_SELECTOR, selector)) > 0
+    return _cond
+
+
+def xpath_present(xpath):
+    def _cond(driver):
+        return len(driver.find_elements(By.XPATH, xpath)) > 0
+    return _cond
+
+
+def css_gone(selector):
+    """No element matching `selector` is displayed."""
+    def _cond(driver):
+        return not any(e.is_displayed() for e in driver.find_elements(By.CSS_SELECTOR, selector))
+    return _cond
+
+
+def any_of(*conditions):
+    def _cond(driver):
+        return any(c(driver) for c in conditions)
+    return _cond
+
+
+def all_of(*conditions):
+    def _cond(driver):
+        return all(c(driver) for c in conditions)
+    return _cond
+
+
+def settled(signature, before=None, quiet=1.5):
+    """
+    Ready once signature(driver) differs from `before` (a re-render was seen), or has
+    stayed the same for `quiet` seconds (the action did not change anything).
+    A signature of None means "not rendered yet".
+    """
+    state = {"last": None, "since": None}
+
+    def _cond(driver):
+        sig = signature(driver)
+        if sig is None:
+            return False
+        if before is not None and sig != before:
+            return True
+        now = time.monotonic()
+        if sig != state["last"]:
+            state["last"], state["since"] = sig, now
+            return False
+        return now - state["since"] >= quiet
+    return _cond
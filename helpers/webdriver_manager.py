@@ -1,19 +1,244 @@
+"""
+One driver factory for every scraper.
+
+    driver = create_driver(CHROME, headless=True, block_profile="anb", page_load_timeout=45)
+
+request_report=True turns on Chrome's performance log for helpers.request_blocking.page_report;
+only ask for it when every page is reported, since the log is buffered until it is read.
+
+Browsers: CHROME (selenium), FIREFOX (selenium) and UC (undetected-chromedriver, imported
+only when used). Binaries are found from environment variables first (CHROME_BIN,
+CHROMEDRIVER_PATH, FIREFOX_BIN, GECKODRIVER_PATH), then on PATH; when nothing is found
+Selenium Manager resolves the driver itself. SCRAPER_HEADLESS=1 makes headless the default.
+
+StandbyBrowsers keeps K browsers launched in the background so restarts and new workers
+get one immediately instead of waiting for a cold start.
+"""
+import os
+import queue
+import shutil
+import threading
+
 from selenium import webdriver
+from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.firefox.service import Service
 from selenium.webdriver.firefox.options import Options
 
-def get_firefox_driver(headless=False):
+from helpers.request_blocking import chrome_logging, apply_chrome, apply_firefox
+
+CHROME, FIREFOX, UC = "chrome", "firefox", "uc"
+
+WINDOW_SIZE = (1920, 1080)
+_TRUTHY = ("1", "true", "yes", "on")
+
+
+def default_headless():
+    return os.environ.get("SCRAPER_HEADLESS", "").strip().lower() in _TRUTHY
+
+
+def find_binary(env_var, *names):
+    """Path from `env_var` if set and present, else the first of `names` on PATH, else None."""
+    path = os.environ.get(env_var, "").strip()
+    if path and os.path.exists(path):
+        return path
+    for name in names:
+        found = shutil.which(name)
+        if found:
+            return found
+    return None
+
+
+def chrome_binary():
+    return find_binary("CHROME_BIN", "google-chrome", "google-chrome-stable", "chromium", "chromium-browser")
+
+
+def firefox_binary():
+    return find_binary("FIREFOX_BIN", "firefox", "firefox-esr")
+
+
+def _chrome_arguments(headless, window_size, extra_args):
+    args = [
+        f"--window-size={window_size[0]},{window_size[1]}",
+        "--disable-gpu",
+        "--no-sandbox",
+        "--disable-dev-shm-usage",
+        "--disable-blink-features=AutomationControlled",
+    ]
+    if headless:
+        args.append("--headless=new")
+    return args + list(extra_args)
+
+
+def _driver_path(explicit, env_var, name):
+    if explicit and os.path.exists(explicit):
+        return explicit
+    return find_binary(env_var, name)
 
+
+def _build_chrome(headless, window_size, extra_args, driver_path, request_report):
+    options = webdriver.ChromeOptions()
+    for arg in _chrome_arguments(headless, window_size, extra_args):
+        options.add_argument(arg)
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option("useAutomationExtension", False)
+    binary = chrome_binary()
+    if binary:
+        options.binary_location = binary
+    if request_report:
+        chrome_logging(options)
+    driver_path = _driver_path(driver_path, "CHROMEDRIVER_PATH", "chromedriver")
+    service = ChromeService(driver_path) if driver_path else ChromeService()
+    return webdriver.Chrome(service=service, options=options)
+
+
+def _build_uc(headless, window_size, extra_args, version_main, driver_path, request_report):
+    import undetected_chromedriver as uc
+    options = uc.ChromeOptions()
+    # uc sets its own automation flags and does not accept excludeSwitches
+    for arg in _chrome_arguments(False, window_size, extra_args):
+        options.add_argument(arg)
+    if request_report:
+        chrome_logging(options)
+    kwargs = {"options": options, "headless": headless}
+    if version_main:
+        kwargs["version_main"] = version_main
+    binary = chrome_binary()
+    if binary:
+        kwargs["browser_executable_path"] = binary
+    driver_path = _driver_path(driver_path, "CHROMEDRIVER_PATH", "chromedriver")
+    if driver_path:
+        kwargs["driver_executable_path"] = driver_path
+    return uc.Chrome(**kwargs)
+
+
+def _build_firefox(headless, window_size, block_profile, driver_path):
     options = Options()
-    options.headless = False  # Set to True for headless mode
-    options.binary_location = r"C:\Program Files\Mozilla Firefox\firefox.exe"
+    if headless:
+        options.add_argument("-headless")
+    options.add_argument(f"--width={window_size[0]}")
+    options.add_argument(f"--height={window_size[1]}")
+    binary = firefox_binary()
+    if binary:
+        options.binary_location = binary
+    apply_firefox(options, block_profile)
+    driver_path = _driver_path(driver_path, "GECKODRIVER_PATH", "geckodriver")
+    service = Service(driver_path) if driver_path else Service()
+    return webdriver.Firefox(service=service, options=options)
 
-    profile = webdriver.FirefoxProfile()
-    profile.set_preference("permissions.default.image", 2)  # Block all images
-    options.profile = profile
-    service = Service(r"C:\geckodriver\geckodriver.exe")
 
-    driver = webdriver.Firefox(service=service, options=options)
+def create_driver(browser=CHROME, headless=None, block_profile="default", page_load_timeout=None,
+                  implicit_wait=None, window_size=WINDOW_SIZE, extra_args=(), uc_version_main=None,
+                  driver_path=None, request_report=False):
+    """
+    Start a browser with request blocking applied. headless=None uses SCRAPER_HEADLESS;
+    driver_path is used when it exists, otherwise the driver is discovered.
+    """
+    if headless is None:
+        headless = default_headless()
+    if browser == FIREFOX:
+        driver = _build_firefox(headless, window_size, block_profile, driver_path)
+    elif browser == UC:
+        driver = _build_uc(headless, window_size, extra_args, uc_version_main, driver_path, request_report)
+    elif browser == CHROME:
+        driver = _build_chrome(headless, window_size, extra_args, driver_path, request_report)
+    else:
+        raise ValueError(f"Unknown browser: {browser}")
 
-    driver.implicitly_wait(10)
+    if browser != FIREFOX:
+        apply_chrome(driver, block_profile)
+        try:
+            driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+                "source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+            })
+        except Exception:
+            pass
+    if page_load_timeout:
+        driver.set_page_load_timeout(page_load_timeout)
+    if implicit_wait:
+        driver.implicitly_wait(implicit_wait)
     return driver
+
+
+def get_firefox_driver(headless=False, block_profile="default"):
+    return create_driver(FIREFOX, headless=headless, block_profile=block_profile, implicit_wait=10)
+
+
+# ---------------------- Standby browsers ----------------------
+def _quit(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+def _alive(driver):
+    try:
+        return len(driver.window_handles) > 0
+    except Exception:
+        return False
+
+
+class StandbyBrowsers:
+    """
+    Keeps `size` browsers launched by a background thread. take() hands one out
+    immediately (checking it is still alive) and the thread starts a replacement;
+    if none is ready, take() builds one inline. hits/misses count both cases.
+    """
+
+    def __init__(self, factory, size=1, name="standby-browsers"):
+        self.factory = factory
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.launched = 0
+        self._ready = queue.Queue()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._fill, name=name, daemon=True)
+        self._thread.start()
+
+    def _fill(self):
+        while not self._closed:
+            if self._ready.qsize() >= self.size:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            try:
+                driver = self.factory()
+            except Exception as e:
+                print(f"⚠️ Standby browser failed to start: {e}")
+                self._wake.wait(5)
+                self._wake.clear()
+                continue
+            if self._closed:
+                _quit(driver)
+                return
+            self.launched += 1
+            self._ready.put(driver)
+
+    def take(self):
+        while True:
+            try:
+                driver = self._ready.get_nowait()
+            except queue.Empty:
+                self.misses += 1
+                self._wake.set()
+                return self.factory()
+            self._wake.set()
+            if _alive(driver):
+                self.hits += 1
+                return driver
+            _quit(driver)
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=60)
+        while True:
+            try:
+                _quit(self._ready.get_nowait())
+            except queue.Empty:
+                break
+
+    def summary(self):
+        return f"standby browsers: {self.hits} warm / {self.misses} cold starts, {self.launched} pre-launched"
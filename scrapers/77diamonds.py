@@ -1,9 +1,19 @@
-from scrapers.base_scraper import BaseScraper
+from scrapers.base_scraper import BaseScraper, SNAPSHOT
+from scrapers.async_base_scraper import AsyncBaseScraper
+from helpers.waits import wait_for, css_present
+from utils import html_parsing
 from selenium.webdriver.common.by import By
 import time
 
 class SeventySevenScraper(BaseScraper):
     def scrape(self, url):
+        if self.mode == SNAPSHOT:
+            self.logger.info(f"Scraping (snapshot): {url}")
+            data = self.scrape_snapshot(url)
+            if data["price"] is None:
+                self.logger.warning(f"Price not found in snapshot: {url}")
+            return data
+
         self.logger.info(f"Scraping: {url}")
         self.driver.get(url)
         time.sleep(2)  # Better to use WebDriverWait
@@ -40,3 +50,51 @@ class SeventySevenScraper(BaseScraper):
             pass
 
         return data
+
+    def load(self, driver, url):
+        driver.get(url)
+        wait_for(driver, css_present(".js-price-value"), timeout=10)
+
+    @staticmethod
+    def parse_snapshot(snapshot, backend=None):
+        doc = html_parsing.parse(snapshot["html"], backend)
+        data = {
+            "url": snapshot["url"],
+            "title": snapshot["title"],
+            "price": None,
+            "description": None,
+            "variants": {},
+            "dom_html": snapshot["html"]
+        }
+
+        price_elem = doc.select_one(".js-price-value")
+        if price_elem:
+            data["price"] = price_elem.text(" ", strip=True)
+
+        desc = doc.select_one(".product-details__text")
+        if desc:
+            data["description"] = desc.text(" ", strip=True)
+
+        data["variants"]["shapes"] = [e.text(" ", strip=True) for e in doc.select(".shape-selector__shape")]
+        return data
+
+
+class AsyncSeventySevenScraper(AsyncBaseScraper):
+    """Many tabs per browser; parses with the same parse_snapshot as the snapshot mode."""
+
+    def __init__(self, logger, on_data=None, **kwargs):
+        super().__init__(logger, block_profile="77diamonds", **kwargs)
+        self.on_data = on_data
+
+    async def scrape(self, tab, url):
+        self.logger.info(f"Scraping ({tab.name}): {url}")
+        await tab.goto(url, timeout=self.page_load_timeout)
+        await tab.wait_for("!!document.querySelector('.js-price-value')", timeout=10)
+        snapshot = await self.snapshot(tab, url)
+        return await self.parse_in_pool(SeventySevenScraper.parse_snapshot, snapshot)
+
+    async def on_result(self, url, data):
+        if data["price"] is None:
+            self.logger.warning(f"Price not found in snapshot: {url}")
+        if self.on_data:
+            self.on_data(data)
@@ -1,18 +1,28 @@
-import pandas as pd
+import os
 import time
 from datetime import datetime
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.firefox.service import Service
 from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.action_chains import ActionChains
 from selenium.common.exceptions import NoSuchElementException
 from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException
 import psycopg2
 
+from utils.db_writer import BatchedWriter, PooledInserter
+from utils.task_reader import read_tasks
+from utils.resume_ledger import ResumeLedger, variant_key, DEFAULT_LEDGER_PATH
+from utils.rate_limiter import limiter_for, page_looks_blocked, BLOCKED
+from utils import metrics
+from helpers.js_extract import extract, text_or_empty
+from helpers.request_blocking import page_report, format_report, totals_summary
+from helpers.webdriver_manager import create_driver, StandbyBrowsers, FIREFOX
+from helpers.range_slider import set_range
+from helpers.waits import (
+    WaitLog, document_ready, css_present, xpath_present, css_gone, any_of, all_of, settled
+)
+
 # === Setup ===
-GECKODRIVER_PATH = r"C:\Users\komal.kumavat\Documents\77diamonds_data\geckodriver.exe"
+GECKODRIVER_PATH = r"C:\Users\komal.kumavat\Documents\77diamonds_data\geckodriver.exe"  # used if present, else discovered
 EXCEL_FILE_PATH = r"C:\Users\komal.kumavat\Documents\77diamonds_data\77diamonds_input-file(script).xlsx"
 
 # === PostgreSQL Setup ===
@@ -24,11 +34,37 @@ DB_CONFIG = {
     'password': 'root'
 }
 
+# Resume ledger (shared by all scrapers)
+SITE = "77diamonds.com"
+LEDGER_PATH = DEFAULT_LEDGER_PATH
+RUN_ID = None          # resume scope; None = one shared scope; a new id (e.g. a date) scrapes everything again
+VARIANT_COLUMNS = ("metal", "stone_type", "stone_shape", "stone_carat", "color", "clarity", "cut")
+
+# Upper bound for each step's ready-wait (was a fixed time.sleep(10))
+STEP_WAIT_CAP = 10
+BLOCK_PROFILE = "77diamonds"
+HEADLESS = None        # None = SCRAPER_HEADLESS env var
+STANDBY_BROWSERS = 1   # every row gets a fresh Firefox; keep the next one launched
+METRICS_PROM_PATH = "77diamonds_metrics.prom"     # per-step timings (utils.metrics)
+METRICS_JSONL_PATH = metrics.DEFAULT_JSONL_PATH
+
+def build_driver():
+    return create_driver(FIREFOX, headless=HEADLESS, block_profile=BLOCK_PROFILE, driver_path=GECKODRIVER_PATH)
+
+_standby = None
+
 def init_driver():
-    service = Service(GECKODRIVER_PATH)
-    options = webdriver.FirefoxOptions()
-    options.add_argument("--start-maximized")
-    return webdriver.Firefox(service=service, options=options)
+    global _standby
+    if _standby is None:
+        _standby = StandbyBrowsers(build_driver, size=STANDBY_BROWSERS)
+    return _standby.take()
+
+def close_standby():
+    global _standby
+    if _standby is not None:
+        _standby.close()
+        print(f"🔥 {_standby.summary()}")
+        _standby = None
 
 def wait_and_click(driver, by, value, timeout=15):
     WebDriverWait(driver, timeout).until(EC.element_to_be_clickable((by, value))).click()
@@ -42,7 +78,9 @@ def close_popup(driver):
 def change_location_to_uk(driver):
     try:
         wait_and_click(driver, By.CLASS_NAME, "lblcode")
-        time.sleep(10)
+        WebDriverWait(driver, STEP_WAIT_CAP).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, "select.headerCountriesDropdown"))
+        )
         dropdown = Select(driver.find_element(By.CSS_SELECTOR, "select.headerCountriesDropdown"))
         dropdown.select_by_visible_text("United Kingdom")
         print("✅ Location changed to UK")
@@ -55,7 +93,6 @@ def handle_ring_selection_flow(driver):
         if select_setting_btns:
             print("✅ 'Select this setting' button found.")
             wait_and_click(driver, By.XPATH, "//button[normalize-space()='Select this setting']")
-            time.sleep(2)
             wait_and_click(driver, By.CSS_SELECTOR, "button[data-cy='add-diamond-to-setting']")
             print("✅ Clicked 'Add diamond' after selecting setting.")
             return
@@ -112,89 +149,35 @@ def select_carat_range(driver, min_carat, max_carat):
     except Exception as e:
         print(f"❌ Failed to set carat range → {e}")
 
-def select_color(driver, color_value):
-    color_order = ["L", "K", "J", "I", "H", "G", "F", "E", "D"]
-    color_value = color_value.strip().upper()
-    if color_value not in color_order:
-        print(f"❌ Invalid color '{color_value}'")
+COLOR_ORDER = ["L", "K", "J", "I", "H", "G", "F", "E", "D"]
+CLARITY_ORDER = ["SI2", "SI1", "VS2", "VS1", "VVS2", "VVS1", "IF", "FL"]
+CUT_ORDER = ["GOOD", "VERY GOOD", "EXCELLENT", "CUPID'S IDEAL"]
+
+def select_slider_level(driver, section_css, order, value, label):
+    """Narrow a two-handle filter slider to the single level `value` (both handles on it)."""
+    value = value.strip().upper()
+    if value not in order:
+        print(f"❌ Invalid {label} '{value}'")
         return
-    index = color_order.index(color_value)
-    total_colors = len(color_order)
+    index = order.index(value)
     try:
-        modal = driver.find_element(By.CSS_SELECTOR, '[data-cy="colour-modal"]')
-        slider = modal.find_element(By.CSS_SELECTOR, '[data-cy="colors"] .vue-slider-rail')
-        dots = modal.find_elements(By.CSS_SELECTOR, '[data-cy="colors"] .vue-slider-dot')
-        if len(dots) != 2:
-            print("❌ Expected 2 slider handles, found:", len(dots))
-            return
-        slider_width = slider.size['width']
-        step_width = slider_width / (total_colors - 1)
-        left_dot = dots[0]
-        right_dot = dots[1]
-        actions = ActionChains(driver)
-        actions.click_and_hold(left_dot).move_by_offset(step_width * index, 0).release().perform()
-        time.sleep(0.5)
-        actions.click_and_hold(right_dot).move_by_offset(-step_width * (total_colors - 1 - index), 0).release().perform()
-        time.sleep(0.5)
-        print(f"✅ Color '{color_value}' selected.")
+        section = driver.find_element(By.CSS_SELECTOR, section_css)
+        method = set_range(driver, section, index, index, len(order) - 1)
+        if method:
+            print(f"✅ {label.capitalize()} '{value}' selected ({method}).")
+        else:
+            print(f"❌ {label.capitalize()} slider did not settle on '{value}'")
     except Exception as e:
-        print(f"❌ Error selecting color '{color_value}': {e}")
+        print(f"❌ Error selecting {label} '{value}': {e}")
+
+def select_color(driver, color_value):
+    select_slider_level(driver, '[data-cy="colour-modal"] [data-cy="colors"]', COLOR_ORDER, color_value, "color")
 
 def select_clarity(driver, clarity_value):
-    clarity_order = ["SI2", "SI1", "VS2", "VS1", "VVS2", "VVS1", "IF", "FL"]
-    clarity_value = clarity_value.strip().upper()
-    if clarity_value not in clarity_order:
-        print(f"❌ Invalid clarity '{clarity_value}'")
-        return
-    index = clarity_order.index(clarity_value)
-    total_clarity_levels = len(clarity_order)
-    try:
-        clarity_section = driver.find_element(By.CSS_SELECTOR, '[data-cy="clarity"]')
-        slider = clarity_section.find_element(By.CSS_SELECTOR, '.vue-slider-rail')
-        dots = clarity_section.find_elements(By.CSS_SELECTOR, '.vue-slider-dot')
-        if len(dots) != 2:
-            print("❌ Expected 2 clarity slider handles, found:", len(dots))
-            return
-        slider_width = slider.size['width']
-        step_width = slider_width / (total_clarity_levels - 1)
-        left_dot = dots[0]
-        right_dot = dots[1]
-        actions = ActionChains(driver)
-        actions.click_and_hold(left_dot).move_by_offset(step_width * index, 0).release().perform()
-        time.sleep(0.5)
-        actions.click_and_hold(right_dot).move_by_offset(-step_width * (total_clarity_levels - 1 - index), 0).release().perform()
-        time.sleep(0.5)
-        print(f"✅ Clarity '{clarity_value}' selected.")
-    except Exception as e:
-        print(f"❌ Error selecting clarity '{clarity_value}': {e}")
+    select_slider_level(driver, '[data-cy="clarity"]', CLARITY_ORDER, clarity_value, "clarity")
 
 def select_cut(driver, cut_value):
-    cut_order = ["GOOD", "VERY GOOD", "EXCELLENT", "CUPID'S IDEAL"]
-    cut_value = cut_value.strip().upper()
-    if cut_value not in cut_order:
-        print(f"❌ Invalid cut value '{cut_value}'")
-        return
-    index = cut_order.index(cut_value)
-    total_cuts = len(cut_order)
-    try:
-        cut_section = driver.find_element(By.CSS_SELECTOR, '[data-cy="cut"]')
-        slider = cut_section.find_element(By.CSS_SELECTOR, '.vue-slider-rail')
-        dots = cut_section.find_elements(By.CSS_SELECTOR, '.vue-slider-dot')
-        if len(dots) != 2:
-            print("❌ Expected 2 cut slider handles, found:", len(dots))
-            return
-        slider_width = slider.size['width']
-        step_width = slider_width / (total_cuts - 1)
-        left_dot = dots[0]
-        right_dot = dots[1]
-        actions = ActionChains(driver)
-        actions.click_and_hold(left_dot).move_by_offset(step_width * index, 0).release().perform()
-        time.sleep(0.5)
-        actions.click_and_hold(right_dot).move_by_offset(-step_width * (total_cuts - 1 - index), 0).release().perform()
-        time.sleep(0.5)
-        print(f"✅ Cut '{cut_value}' selected.")
-    except Exception as e:
-        print(f"❌ Error selecting cut '{cut_value}': {e}")
+    select_slider_level(driver, '[data-cy="cut"]', CUT_ORDER, cut_value, "cut")
 
 def select_first_diamond_and_add(driver):
     try:
@@ -242,66 +225,75 @@ def extract_diamond_details_on_diamond_page(driver):
         print(f"❌ Failed to extract diamond details: {e}")
     return data
 
+DIAMOND_BLOCK = {"css": '[data-cy="diamond"]'}
+
+# Everything extract_ring_and_diamond_info needs, fetched in one execute_script
+ITEM_DETAILS_SPEC = {
+    "root": {"css": "div.item-details"},
+    "fields": {
+        "setting_name": {"css": '[data-cy="setting"] h4'},
+        "metal": {"css": '[data-cy="setting"] p'},
+        "setting_price": {"css": '[data-cy="setting"] .itemPrice span:last-child'},
+        "setting_original_price": {"css": '[data-cy="setting"] .itemPrice span.product-discount'},
+        "diamond_code": {"scope": DIAMOND_BLOCK, "attr": "data-cy-code"},
+        "carat": {"scope": DIAMOND_BLOCK, "attr": "data-cy-carat"},
+        "cut_text": {"scope": DIAMOND_BLOCK, "xpath": ".//span[contains(text(),'Cut:')]"},
+        "color_text": {"scope": DIAMOND_BLOCK, "xpath": ".//span[contains(text(),'Colour:')]"},
+        "clarity_text": {"scope": DIAMOND_BLOCK, "xpath": ".//span[contains(text(),'Clarity:')]"},
+        "diamond_price": {"scope": DIAMOND_BLOCK, "css": ".itemPrice div"},
+        "total_price": {"css": ".item-total h3 span._float-right"},
+        "vat": {"xpath": "//h4[contains(text(), 'VAT')]/span"},
+        "subtotal": {"xpath": "//h4[contains(text(), 'Subtotal')]/span"},
+    },
+}
+
+PRODUCT_DETAILS_SPEC = {
+    "root": {"css": "div.product-details"},
+    "fields": {
+        "items": {"css": "li", "all": True},
+    },
+}
+
+# "<prefix>: value" list items in the product details accordion -> output key
+PRODUCT_DETAIL_PREFIXES = [
+    ("setting:", "Setting Style"),
+    ("band width:", "Band Width"),
+    ("claws:", "Claws"),
+    ("wedfit:", "WedFit"),
+    ("type", "Diamond Type"),
+    ("shape", "Diamond Shape"),
+    ("code", "Diamond Code"),
+    ("carat", "Diamond Carat"),
+    ("colour", "Diamond Colour"),
+    ("color", "Diamond Colour"),
+    ("clarity", "Diamond Clarity"),
+]
+
+def _label_value(text):
+    return text.split(":")[-1].strip() if text else ""
+
 def extract_ring_and_diamond_info(driver):
     try:
         container = driver.find_element(By.CSS_SELECTOR, "div.item-details")
         driver.execute_script("arguments[0].scrollIntoView(true);", container)
         time.sleep(2)
-        try:
-            setting_name = container.find_element(By.CSS_SELECTOR, '[data-cy="setting"] h4').text.strip()
-        except NoSuchElementException:
-            setting_name = ""
-        try:
-            metal = container.find_element(By.CSS_SELECTOR, '[data-cy="setting"] p').text.strip()
-        except NoSuchElementException:
-            metal = ""
-        try:
-            setting_final_price = container.find_element(By.CSS_SELECTOR, '[data-cy="setting"] .itemPrice span:last-child').text.strip()
-        except NoSuchElementException:
-            setting_final_price = ""
-        try:
-            setting_original_price = container.find_element(By.CSS_SELECTOR, '[data-cy="setting"] .itemPrice span.product-discount').text.strip()
-        except NoSuchElementException:
-            setting_original_price = ""
-        try:
-            diamond_block = container.find_element(By.CSS_SELECTOR, '[data-cy="diamond"]')
-            diamond_code = diamond_block.get_attribute("data-cy-code") or ""
-            carat = diamond_block.get_attribute("data-cy-carat") or ""
-            shape = diamond_block.get_attribute("data-cy-shape") or ""
-            color = diamond_block.get_attribute("data-cy-colour") or ""
-            clarity = diamond_block.get_attribute("data-cy-clarity") or ""
-            cut = diamond_block.get_attribute("data-cy-cut") or ""
-            try:
-                cut_text = diamond_block.find_element(By.XPATH, ".//span[contains(text(),'Cut:')]").text.split(":")[-1].strip()
-            except:
-                cut_text = ""
-            try:
-                color_text = diamond_block.find_element(By.XPATH, ".//span[contains(text(),'Colour:')]").text.split(":")[-1].strip()
-            except:
-                color_text = ""
-            try:
-                clarity_text = diamond_block.find_element(By.XPATH, ".//span[contains(text(),'Clarity:')]").text.split(":")[-1].strip()
-            except:
-                clarity_text = ""
-            try:
-                diamond_price = diamond_block.find_element(By.CSS_SELECTOR, '.itemPrice div').text.strip()
-            except:
-                diamond_price = ""
-        except NoSuchElementException:
-            diamond_code = carat = shape = color = clarity = cut = ""
-            cut_text = clarity_text = color_text = diamond_price = ""
-        try:
-            total_price = container.find_element(By.CSS_SELECTOR, ".item-total h3 span._float-right").text.strip()
-        except NoSuchElementException:
-            total_price = ""
-        try:
-            vat = container.find_element(By.XPATH, "//h4[contains(text(), 'VAT')]/span").text.strip()
-        except NoSuchElementException:
-            vat = ""
-        try:
-            subtotal = container.find_element(By.XPATH, "//h4[contains(text(), 'Subtotal')]/span").text.strip()
-        except NoSuchElementException:
-            subtotal = ""
+        raw = extract(driver, ITEM_DETAILS_SPEC)
+        if raw is None:
+            raise NoSuchElementException("div.item-details disappeared")
+        f = {k: text_or_empty(v) for k, v in raw.items()}
+        setting_name = f["setting_name"]
+        metal = f["metal"]
+        setting_final_price = f["setting_price"]
+        setting_original_price = f["setting_original_price"]
+        diamond_code = f["diamond_code"]
+        carat = f["carat"]
+        cut_text = _label_value(f["cut_text"])
+        color_text = _label_value(f["color_text"])
+        clarity_text = _label_value(f["clarity_text"])
+        diamond_price = f["diamond_price"]
+        total_price = f["total_price"]
+        vat = f["vat"]
+        subtotal = f["subtotal"]
         print("🔹 Setting:", setting_name)
         print("🔹 Metal:", metal)
         print("🔹 Setting Price:", setting_final_price)
@@ -334,9 +326,6 @@ def extract_ring_and_diamond_info(driver):
         print(f"❌ Failed to extract product/diamond info: {e}")
         return {}
 
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoSuchElementException
-
 def extract_additional_ring_diamond_info(driver):
     try:
         product_details = driver.find_element(By.CSS_SELECTOR, "div.product-details")
@@ -348,41 +337,15 @@ def extract_additional_ring_diamond_info(driver):
             time.sleep(1)
         except:
             print("⚠️ Could not locate accordion header to expand.")
-        result = {
-            "Setting Style": "",
-            "Band Width": "",
-            "Claws": "",
-            "WedFit": "",
-            "Diamond Type": "",
-            "Diamond Shape": "",
-            "Diamond Code": "",
-            "Diamond Carat": "",
-            "Diamond Colour": "",
-            "Diamond Clarity": ""
-        }
-        ul_items = driver.find_elements(By.CSS_SELECTOR, "div.product-details li")
-        for li in ul_items:
-            text = li.text.strip()
-            if text.lower().startswith("setting:"):
-                result["Setting Style"] = text.split(":", 1)[-1].strip()
-            elif text.lower().startswith("band width:"):
-                result["Band Width"] = text.split(":", 1)[-1].strip()
-            elif text.lower().startswith("claws:"):
-                result["Claws"] = text.split(":", 1)[-1].strip()
-            elif text.lower().startswith("wedfit:"):
-                result["WedFit"] = text.split(":", 1)[-1].strip()
-            elif text.lower().startswith("type"):
-                result["Diamond Type"] = text.split(":", 1)[-1].strip()
-            elif text.lower().startswith("shape"):
-                result["Diamond Shape"] = text.split(":", 1)[-1].strip()
-            elif text.lower().startswith("code"):
-                result["Diamond Code"] = text.split(":", 1)[-1].strip()
-            elif text.lower().startswith("carat"):
-                result["Diamond Carat"] = text.split(":", 1)[-1].strip()
-            elif text.lower().startswith("colour") or text.lower().startswith("color"):
-                result["Diamond Colour"] = text.split(":", 1)[-1].strip()
-            elif text.lower().startswith("clarity"):
-                result["Diamond Clarity"] = text.split(":", 1)[-1].strip()
+        result = {key: "" for _, key in PRODUCT_DETAIL_PREFIXES}
+        raw = extract(driver, PRODUCT_DETAILS_SPEC) or {}
+        for text in raw.get("items", []):
+            text = (text or "").strip()
+            low = text.lower()
+            for prefix, key in PRODUCT_DETAIL_PREFIXES:
+                if low.startswith(prefix):
+                    result[key] = text.split(":", 1)[-1].strip()
+                    break
         print("🔎 Extracted from Product Details Accordion:")
         for key, val in result.items():
             print(f"🔸 {key}: {val}")
@@ -500,74 +463,106 @@ def _to_timestamp(val):
     except Exception:
         return None
 
-def save_to_postgresql(data):
-    print(data)
-    try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        insert_query = """
-        INSERT INTO stg_price_77diamonds_scrape (
-            website, product_url, category, sub_category, collection_no, variant_no,
-            metal, stone_type, stone_shape, stone_carat, color, clarity, cut,
-            product_title, metal_price, stone_price, final_price, updated_date,
-            setting_title, setting_price, diamond_title, product_description,
-            additional_attributes, metal_t, stone_type_t, stone_shape_t, clarity_t,
-            cut_t, metal_price_e, stone_price_e, final_price_e, updated_date_t,
-            additional_title, final_title
-        ) VALUES (
-            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-        )
-        """
-        # Prepare data tuple in correct order and convert types
-        data_tuple = (
-            data.get('website', ''),
-            data.get('product_url', ''),
-            data.get('category', ''),
-            data.get('sub_category', ''),
-            data.get('collection_no', ''),
-            data.get('variant_no', ''),
-            data.get('metal', ''),
-            data.get('stone_type', ''),
-            data.get('stone_shape', ''),
-            _to_numeric(data.get('stone_carat', None)),
-            data.get('color', ''),
-            data.get('clarity', ''),
-            data.get('cut', ''),
-            data.get('product_title', ''),
-            _to_numeric(data.get('metal_price', None)),
-            _to_numeric(data.get('stone_price', None)),
-            _to_numeric(data.get('final_price', None)),
-            _to_timestamp(data.get('updated_date', '')),
-            data.get('setting_title', ''),
-            _to_numeric(data.get('setting_price', None)),
-            data.get('diamond_title', ''),
-            data.get('product_description', ''),
-            data.get('additional_attributes', ''),
-            data.get('metal_t', ''),
-            data.get('stone_type_t', ''),
-            data.get('stone_shape_t', ''),
-            data.get('clarity_t', ''),
-            data.get('cut_t', ''),
-            _to_numeric(data.get('metal_price_e', None)),
-            _to_numeric(data.get('stone_price_e', None)),
-            _to_numeric(data.get('final_price_e', None)),
-            _to_timestamp(data.get('updated_date_t', '')),
-            data.get('additional_title', ''),
-            data.get('final_title', '')
+DB_TABLE = "stg_price_77diamonds_scrape"
+DB_COLUMNS = [
+    "website", "product_url", "category", "sub_category", "collection_no", "variant_no",
+    "metal", "stone_type", "stone_shape", "stone_carat", "color", "clarity", "cut",
+    "product_title", "metal_price", "stone_price", "final_price", "updated_date",
+    "setting_title", "setting_price", "diamond_title", "product_description",
+    "additional_attributes", "metal_t", "stone_type_t", "stone_shape_t", "clarity_t",
+    "cut_t", "metal_price_e", "stone_price_e", "final_price_e", "updated_date_t",
+    "additional_title", "final_title",
+]
+# Raw price text is normalized per batch, right before the insert (utils.prices)
+DB_PRICE_COLUMNS = (
+    "metal_price", "stone_price", "final_price", "setting_price",
+    "metal_price_e", "stone_price_e", "final_price_e",
+)
+DB_CONVERTERS = {
+    "stone_carat": _to_numeric,
+    "updated_date": _to_timestamp,
+    "updated_date_t": _to_timestamp,
+}
+
+_db_writer = None
+
+def get_db_writer():
+    """Shared background writer: rows are batched and inserted on pooled connections."""
+    global _db_writer
+    if _db_writer is None:
+        _db_writer = BatchedWriter(
+            PooledInserter(DB_CONFIG, DB_TABLE, DB_COLUMNS, converters=DB_CONVERTERS,
+                           price_columns=DB_PRICE_COLUMNS),
+            batch_size=50, flush_interval=10.0,
+            dead_letter_path="77diamonds_failed_inserts.jsonl", site=SITE,
         )
-        cur.execute(insert_query, data_tuple)
-        conn.commit()
-        print("✅ Data inserted into PostgreSQL")
-    except Exception as e:
-        print("❌ Error saving to PostgreSQL: {}".format(e))
-    finally:
-        if 'cur' in locals():
-            cur.close()
-        if 'conn' in locals():
-            conn.close()
+    return _db_writer
+
+def close_db_writer():
+    global _db_writer
+    if _db_writer is not None:
+        _db_writer.close()
+        print(f"✅ PostgreSQL: {_db_writer.written} rows written, {_db_writer.failed} failed")
+        _db_writer = None
 
-def process_row(row, idx):
+def save_to_postgresql(data, on_written=None):
+    print(data)
+    get_db_writer().write(data, on_written)
+    print("📝 Row queued for PostgreSQL")
+
+def ledger_recorder(ledger, url, key):
+    """on_written for a queued row: the variant is only 'success' once its batch reached Postgres."""
+    return lambda ok: ledger.record(SITE, url, key, "success" if ok else "error")
+
+# ---------------------- step ready predicates ----------------------
+page_loaded = all_of(document_ready, any_of(
+    css_present("i.icon77-exit"), css_present(".lblcode"), css_present("div[data-cy='metal-filter']")
+))
+popup_closed = css_gone("i.icon77.icon77-exit")
+ring_selection_ready = any_of(
+    xpath_present("//button[normalize-space()='Select this setting']"),
+    xpath_present("//button[normalize-space()='Add diamond']"),
+)
+diamond_filters_ready = css_present("div[data-cy='stoneType-filter']")
+item_details_ready = css_present("div.item-details")
+
+
+def page_signature(driver):
+    """URL + readyState + metal filter count — stable once a location change has reloaded."""
+    return driver.execute_script(
+        "if (document.readyState !== 'complete') return null;"
+        "return location.href + '|' + document.querySelectorAll(\"div[data-cy='metal-filter'] div[data-cy]\").length;"
+    )
+
+
+def diamond_table_signature(driver):
+    """Text of the first diamond rows — changes whenever a filter re-renders the table."""
+    return driver.execute_script(
+        "var rows = document.querySelectorAll('tr.main-row');"
+        "if (!rows.length) return null;"
+        "var out = [rows.length];"
+        "for (var i = 0; i < Math.min(rows.length, 3); i++) out.push(rows[i].innerText);"
+        "return out.join('|');"
+    )
+
+
+def run_filter_step(driver, waits, label, step, *args):
+    """Apply one diamond filter, then wait for the table to re-render (or stay put)."""
+    with metrics.span(SITE, label) as sp:
+        try:
+            before = diamond_table_signature(driver)
+        except Exception:
+            before = None
+        step(driver, *args)
+        if not waits.until(settled(diamond_table_signature, before=before), label):
+            sp.outcome = metrics.TIMEOUT
+
+
+def clean_url(row):
+    return str(row.get("product_url", "")).split("&step=item-diamond")[0]
+
+
+def process_row(row, idx, on_written=None):
     # Extract and sanitize input
     print(row,'row')
     metal = row.get("metal", "")
@@ -577,39 +572,43 @@ def process_row(row, idx):
     color = row.get("color", "")
     clarity = row.get("clarity", "")
     cut = row.get("cut", "")
-    url = str(row.get("product_url", "")).split("&step=item-diamond")[0]
+    url = clean_url(row)
 
     print(f"\n===== Processing Row {idx + 1} =====")
     print(f"🌐 Navigating to: {url}")
 
-    driver = init_driver()
+    started = time.monotonic()
+    with metrics.span(SITE, "browser_start"):
+        driver = init_driver()
+    waits = WaitLog(driver, default_timeout=STEP_WAIT_CAP)
     try:
-        driver.get(url)
-        time.sleep(10)
+        with metrics.span(SITE, "navigate"), limiter_for(url).slot() as nav:
+            driver.get(url)
+            waits.until(page_loaded, "page_load")
+            if page_looks_blocked(driver):
+                nav.outcome = BLOCKED
+                raise RuntimeError("Block page served")
+        print(f"🧯 {format_report(page_report(driver))}")
         close_popup(driver)
-        time.sleep(10)
+        waits.until(popup_closed, "close_popup")
         change_location_to_uk(driver)
-        time.sleep(10)
+        waits.until(settled(page_signature), "change_location_to_uk")
         select_metal(driver, metal)
-        time.sleep(10)
+        waits.until(ring_selection_ready, "select_metal")
         handle_ring_selection_flow(driver)
-        time.sleep(10)
-        select_stone_type(driver, stone_type)
-        time.sleep(10)
-        select_shape(driver, shape)
-        time.sleep(10)
-        select_carat_range(driver, carat, carat)
-        time.sleep(10)
-        select_color(driver, color)
-        time.sleep(10)
-        select_clarity(driver, clarity)
-        time.sleep(10)
-        select_cut(driver, cut)
-        time.sleep(10)
-        select_first_diamond_and_add(driver)
-        time.sleep(10)
-        base_info = extract_ring_and_diamond_info(driver)
-        additional_info = extract_additional_ring_diamond_info(driver)
+        waits.until(diamond_filters_ready, "handle_ring_selection_flow")
+        run_filter_step(driver, waits, "select_stone_type", select_stone_type, stone_type)
+        run_filter_step(driver, waits, "select_shape", select_shape, shape)
+        run_filter_step(driver, waits, "select_carat_range", select_carat_range, carat, carat)
+        run_filter_step(driver, waits, "select_color", select_color, color)
+        run_filter_step(driver, waits, "select_clarity", select_clarity, clarity)
+        run_filter_step(driver, waits, "select_cut", select_cut, cut)
+        with metrics.span(SITE, "select_first_diamond_and_add"):
+            select_first_diamond_and_add(driver)
+            waits.until(item_details_ready, "select_first_diamond_and_add")
+        with metrics.span(SITE, "extract"):
+            base_info = extract_ring_and_diamond_info(driver)
+            additional_info = extract_additional_ring_diamond_info(driver)
         now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         scraped_data = {
             "website": "77diamonds.com",
@@ -647,17 +646,64 @@ def process_row(row, idx):
             "additional_title": "",
             "final_title": ""
         }
-        save_to_postgresql(scraped_data)
+        save_to_postgresql(scraped_data, on_written)
+        metrics.observe(SITE, "row", metrics.OK, time.monotonic() - started)
+        return True
     except Exception as e:
         print(f"❌ Error processing row {idx + 1} → {e}")
+        metrics.observe(SITE, "row", metrics.ERROR, time.monotonic() - started)
+        return False
     finally:
+        waits.summary()
         driver.quit()
 
+class ShardWorker:
+    """Per-process worker for utils.sharded_runner (one Firefox per row, as in main)."""
+    threads = 1
+
+    def __init__(self, shard, shards, run_id=None):
+        self.shard = shard
+        self.ledger = ResumeLedger(LEDGER_PATH, run_id or RUN_ID)
+        if shard == 0:
+            create_table_if_not_exists()
+
+    def handle(self, task):
+        url, key = clean_url(task), variant_key(task, VARIANT_COLUMNS)
+        if self.ledger.is_done(SITE, url, key):
+            return "success"
+        if process_row(task, task.idx, on_written=ledger_recorder(self.ledger, url, key)):
+            return "success"
+        self.ledger.record(SITE, url, key, "error")
+        return "error"
+
+    def close(self):
+        close_standby()
+        close_db_writer()
+        self.ledger.close()
+        root, ext = os.path.splitext(METRICS_PROM_PATH)
+        metrics.export(f"{root}_shard{self.shard:02d}{ext}", METRICS_JSONL_PATH, labels={"shard": self.shard})
+
 def main():
     create_table_if_not_exists()
-    df = pd.read_csv(EXCEL_FILE_PATH)
-    for idx, row in df.iterrows():
-        process_row(row, idx)
+    tasks = read_tasks(EXCEL_FILE_PATH, required=("product_url",))
+    ledger = ResumeLedger(LEDGER_PATH, RUN_ID)
+    print(f"🔁 Resume ledger {f' (run {ledger.run_id})' if ledger.run_id else ''}: {ledger.done_count(SITE)} variants already done (skipping).")
+    try:
+        for task in tasks:
+            url, key = clean_url(task), variant_key(task, VARIANT_COLUMNS)
+            if ledger.is_done(SITE, url, key):
+                continue
+            # Success is recorded by the DB writer once the row's batch is inserted
+            if not process_row(task, task.idx, on_written=ledger_recorder(ledger, url, key)):
+                ledger.record(SITE, url, key, "error")
+    finally:
+        close_standby()
+        close_db_writer()
+        ledger.close()
+        print(f"🧯 Request blocking: {totals_summary()}")
+        metrics.export(METRICS_PROM_PATH, METRICS_JSONL_PATH)
+        for line in metrics.summaries():
+            print(f"⏱️ {line}")
 
 if __name__ == "__main__":
     main()
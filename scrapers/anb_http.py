@@ -0,0 +1,322 @@
+"""
+HTTP-first fast path for A&B product pages.
+
+Fetches the PDP with a pooled keep-alive requests.Session and reads the variant grid
+(li[custom_field][namer]) and the cart analytics payload (#checkout-cart[data-ga-cart-data])
+straight from the HTML. scrape_static() returns None whenever the static page cannot
+answer for the requested variant, and the caller falls back to the browser flow.
+
+Parsing goes through utils.html_parsing (selectolax or lxml when installed, else bs4's
+html.parser); every backend gives the same output for these extractors.
+"""
+import re
+import json
+import threading
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils import html_parsing
+from utils.rate_limiter import limiter_for, looks_blocked, BLOCKED, ERROR
+from utils.prices import PRICE_RE
+from utils.change_detection import fingerprint, squash
+
+HTTP_TIMEOUT = 20  # seconds
+HTTP_POOL_SIZE = 10
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36"
+)
+MAX_VARIANT_HOPS = 3  # follow at most this many variant links per row
+RING_SIZE = "M"       # the size Scraper.choose_ring_size_M selects before pricing
+
+TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.I | re.S)
+
+# (custom_field on the page, input column, exact match) — same order/semantics as
+# Scraper.process_product's choose_generic_option calls. The input column is also the
+# output key the selection is reported under.
+OPTION_FIELDS = [
+    ("metal_purity", "metal", False),
+    ("stone_type", "stone_type", True),
+    ("stone_shape", "stone_shape", False),
+    ("stone_carat", "stone_carat", True),
+    ("stone_clarity", "clarity", False),
+    ("stone_color", "color", False),
+    ("stone_cut", "cut", False),
+]
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_SIZE,
+                pool_maxsize=HTTP_POOL_SIZE,
+                # 429/503 are left to the rate limiter (backs off the whole domain)
+                max_retries=Retry(total=2, backoff_factor=0.5, status_forcelist=(500, 502, 504)),
+            )
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            s.headers.update({
+                "User-Agent": USER_AGENT,
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                "Accept-Language": "en-GB,en;q=0.9",
+            })
+            _session = s
+        return _session
+
+
+class BlockedError(requests.HTTPError):
+    """A block page or 403/429/503 answered the fetch."""
+
+
+def fetch(url, report_blocks=True):
+    """
+    GET through the domain's rate limiter; block pages and 403/429/503 count against it.
+    report_blocks=False still raises BlockedError but records the block as a plain error,
+    for side probes whose blocks say nothing about the browser's navigations.
+    """
+    with limiter_for(url).slot() as nav:
+        r = get_session().get(url, timeout=HTTP_TIMEOUT)
+        title = TITLE_RE.search(r.text[:20000])
+        if looks_blocked(title.group(1) if title else "", r.status_code):
+            nav.outcome = BLOCKED if report_blocks else ERROR
+            raise BlockedError(f"Blocked ({r.status_code}) at {url}", response=r)
+        r.raise_for_status()
+        return r.text
+
+
+# ---------------------- HTML parsing ----------------------
+def _is_selected(li):
+    classes = " ".join(li.classes).lower()
+    if "active" in classes or "selected" in classes:
+        return True
+    if li.get("aria-selected") == "true" or li.get("aria-checked") == "true":
+        return True
+    return li.select_one("input[checked]") is not None
+
+
+def parse_variant_grid(doc):
+    """{custom_field: [{"namer", "selected", "href"}, ...]} from li[custom_field][namer]."""
+    grid = {}
+    for li in doc.select("li[custom_field][namer]"):
+        a = li.select_one("a[href]")
+        href = li.get("data-url") or li.get("href") or (a["href"] if a else None)
+        grid.setdefault(li["custom_field"], []).append({
+            "namer": li["namer"].strip(),
+            "selected": _is_selected(li),
+            "href": href if href and not href.startswith(("#", "javascript")) else None,
+        })
+    return grid
+
+
+def match_option(options, field, value, exact):
+    """
+    Same matching rules as Scraper.choose_generic_option, against parsed options.
+    Returns (needle, option or None); needle is what the browser flow reports as selected.
+    """
+    needle = str(value).strip()
+    if field == "stone_carat":
+        try:
+            needle = f"{float(needle):.2f}"
+        except Exception:
+            pass
+        return needle, next((o for o in options if o["namer"] == needle), None)
+    nlow = needle.lower()
+    for o in options:
+        namer = o["namer"].lower()
+        if (exact and namer == nlow) or (not exact and nlow in namer):
+            return needle, o
+    return needle, None
+
+
+def parse_cart_payload(doc):
+    el = doc.select_one("#checkout-cart[data-ga-cart-data]")
+    if not el:
+        return None
+    try:
+        return json.loads(el["data-ga-cart-data"])
+    except Exception:
+        return None
+
+
+def first_price(text):
+    m = PRICE_RE.search((text or "").replace("\xa0", " "))
+    return m.group(0).strip() if m else ""
+
+
+def description_from_panel(panel):
+    """Description line from the 'You have selected' panel (same rules as the browser flow)."""
+    full_desc = [p.text(" ", strip=True) for p in panel.select("p")]
+    h2 = panel.select_one("h2.product_varaint_main")
+    if h2:
+        full_desc.append(h2.text(" ", strip=True))
+    desc_line = " ".join(full_desc)
+    return re.sub(r"\s+", " ", desc_line).replace('\xa0', ' ').strip()
+
+
+def description_from_panel_html(html, backend=None):
+    return description_from_panel(html_parsing.parse(html, backend))
+
+
+def parse_pdp(html, backend=None):
+    doc = html_parsing.parse(html, backend)
+    out = {"grid": parse_variant_grid(doc), "cart": parse_cart_payload(doc)}
+
+    current = ""
+    for sel in ["#metalPrice", "[id*='metalPrice']", ".price.cartPrice"]:
+        el = doc.select_one(sel)
+        if el:
+            current = first_price(el.text(" ", strip=True))
+            if current:
+                break
+    out["pdp_current_price"] = current
+
+    for sel in [".strike-price", ".old-price", ".was-price", ".rrp"]:
+        el = doc.select_one(sel)
+        if el and first_price(el.text(" ", strip=True)):
+            out["pdp_strike_price"] = first_price(el.text(" ", strip=True))
+            break
+    for sel in [".offer-text", ".promo", ".badge-offer", ".savings"]:
+        el = doc.select_one(sel)
+        if el and el.text(strip=True):
+            out["pdp_offer_text"] = el.text(" ", strip=True)
+            break
+
+    out["description_full"] = ""
+    for panel in doc.select(".panel"):
+        if "You have selected" in panel.text(" "):
+            out["description_full"] = description_from_panel(panel)
+            break
+
+    details = doc.select_one(".pro-details-sec")
+    out["ring_diamond_details_text"] = details.text(" ", strip=True) if details else ""
+    out["ring_sizes"] = [a.text(" ", strip=True) for a in doc.select(".ring-size .dropdown-menu a")]
+    return out
+
+
+def cart_fields(payload):
+    """
+    Fields of a data-ga-cart-data payload; Scraper.scrape_cart_details uses it too. The
+    cart page's summary_* totals and visible prices are not in the payload.
+    """
+    data = {
+        "cart_currency": payload.get("currency", ""),
+        "cart_value": payload.get("value", ""),
+        "coupon_code": payload.get("coupon", ""),
+    }
+    items = payload.get("items", [])
+    if items:
+        itm = items[0]
+        data.update({
+            "item_id": itm.get("item_id", ""),
+            "item_name": itm.get("item_name", ""),
+            "item_brand": itm.get("item_brand", ""),
+            "item_category": itm.get("item_category", ""),
+            "item_variant": itm.get("item_variant", ""),
+            "cart_item_price": itm.get("price", ""),
+            "cart_item_qty": itm.get("quantity", ""),
+            "cart_id": itm.get("cart_id", ""),
+            "metal_purity_cart": itm.get("metal_purity", ""),
+            "ring_size_cart": itm.get("ring_size", ""),
+            "stone_type_cart": itm.get("stone_type", ""),
+            "stone_carat_cart": itm.get("stone_carat", ""),
+            "stone_clarity_cart": itm.get("stone_clarity", ""),
+            "stone_color_cart": itm.get("stone_color", ""),
+            "stone_cut_cart": itm.get("stone_cut", ""),
+            "stone_certificate_cart": itm.get("stone_certificate", ""),
+            "band_width_cart": itm.get("band_width", ""),
+            "stone_shape_cart": itm.get("stone_shape", ""),
+        })
+    return data
+
+
+# ---------------------- change detection ----------------------
+def price_fingerprint(url, pages=None):
+    """
+    Fingerprint of the price-bearing data of the product page: cart payload, PDP prices and
+    the variant grid. Shares `pages` with scrape_static, so the fast path reuses the fetch.
+    """
+    pages = {} if pages is None else pages
+    parsed = pages.get(url)
+    if parsed is None:
+        parsed = pages[url] = parse_pdp(fetch(url))
+    if not parsed["cart"] and not parsed["pdp_current_price"]:
+        return None  # nothing price-bearing in the static page
+    return fingerprint(
+        parsed["cart"],
+        {k: squash(v) for k, v in parsed.items() if k.startswith("pdp_")},
+        parsed["grid"],
+    )
+
+
+# ---------------------- fast path ----------------------
+def scrape_static(url, row, pages=None):
+    """
+    Resolve one input row from static HTML. Returns a dict with selections, pdp/cart
+    price data and description, or None if the row needs the browser:
+      - no variant grid on the page, or a requested option is not offered
+      - a requested option is not the selected one and has no variant link to follow
+      - the ring sizes carry prices, or the payload is for a size other than RING_SIZE
+      - no price could be read
+    No cart page is loaded, so there are no summary_* totals (final_price stays empty).
+    `pages` (url -> parsed page) lets the variants of one product share fetched pages.
+    """
+    pages = {} if pages is None else pages
+    wanted = []
+    for field, column, exact in OPTION_FIELDS:
+        value = row.get(column, "")
+        if value is not None and str(value).strip() not in ("", "nan"):
+            wanted.append((field, column, value, exact))
+
+    page_url = url
+    for _ in range(MAX_VARIANT_HOPS + 1):
+        parsed = pages.get(page_url)
+        if parsed is None:
+            parsed = pages[page_url] = parse_pdp(fetch(page_url))
+        if not parsed["grid"]:
+            return None
+
+        selections = {}
+        follow = None
+        for field, column, value, exact in wanted:
+            needle, opt = match_option(parsed["grid"].get(field, []), field, value, exact)
+            if opt is None:
+                return None
+            if not opt["selected"]:
+                follow = opt["href"]
+                if not follow:
+                    return None
+                break
+            selections[column] = needle
+
+        if follow is None:
+            break
+        page_url = urljoin(page_url, follow)
+    else:
+        return None
+
+    if any(PRICE_RE.search(size) for size in parsed["ring_sizes"]):
+        return None  # the price depends on the size; the browser selects RING_SIZE
+    cart = cart_fields(parsed["cart"]) if parsed["cart"] else {}
+    if cart.get("ring_size_cart") not in (None, "", RING_SIZE):
+        return None
+    if not parsed["pdp_current_price"] and not cart.get("cart_item_price"):
+        return None
+
+    pdp_price_data = {k: v for k, v in parsed.items() if k.startswith("pdp_") and v}
+    return {
+        "page_url": page_url,
+        "selections": selections,
+        "pdp_price_data": pdp_price_data,
+        "cart_price_data": cart,
+        "desc_data": {"description_full": parsed["description_full"]},
+        "ring_diamond_data": {"ring_diamond_details_text": parsed["ring_diamond_details_text"]},
+    }
@@ -1,16 +1,13 @@
 import os
-import re
 import time
 import json
 import random
 import threading
 import concurrent.futures
 from datetime import datetime
+from urllib.parse import urldefrag
 
-import pandas as pd
-from bs4 import BeautifulSoup
 
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver import ActionChains
@@ -21,34 +18,90 @@ from selenium.common.exceptions import (
     NoSuchElementException, WebDriverException
 )
 
+from helpers.driver_pool import DriverPool
+from helpers.browser_watchdog import BrowserWatchdog
+from helpers.js_extract import extract
+from helpers.request_blocking import page_report, reset_report, format_report, totals_summary
+from helpers.webdriver_manager import create_driver, StandbyBrowsers, CHROME
+from helpers.screenshots import ScreenshotPipeline
+from helpers.selector_registry import SelectorRegistry, DEFAULT_REGISTRY_PATH
+from helpers.selector_probe import probe_first, probe_ranked, VISIBLE, CLICKABLE, TEXT
+from scrapers import anb_http
+from utils.task_reader import read_tasks
+from utils.result_sink import CsvResultSink
+from utils.resume_ledger import ResumeLedger, variant_key, DEFAULT_LEDGER_PATH
+from utils.change_detection import FingerprintStore, DEFAULT_FINGERPRINT_PATH, UNCHANGED
+from utils.variant_planner import group_by_url
+from utils.prices import PRICE_RE, extract_prices
+from utils import rate_limiter
+from utils import metrics
+from utils.rate_limiter import limiter_for, page_looks_blocked, TIMEOUT, BLOCKED
+
 # ====================== USER CONFIG ======================
 INPUT_CSV = r"C:\Users\komal.kumavat\Downloads\A&B_InputFile - Sheet1.csv"
 OUTPUT_CSV = r"C:\Users\komal.kumavat\Downloads\output_results_5thOCT.csv"
 SCREENSHOTS_DIR = r"C:\Users\komal.kumavat\Downloads\screenshots"
+SCREENSHOT_POLICY = "on_failure"    # always | on_failure | sampled | never
+SCREENSHOT_SAMPLE_RATE = 0.05       # share of non-failure shots kept when "sampled"
+SCREENSHOT_FORMAT = "webp"          # webp | png (webp/downscale need Pillow)
+SCREENSHOT_MAX_WIDTH = 1280         # downscale wider frames; None keeps full size
+
+# Resume ledger (shared by all scrapers): one entry per (site, url, variant) attempt
+SITE = "anb"
+LEDGER_PATH = DEFAULT_LEDGER_PATH
+RUN_ID = None                       # resume scope; None = one shared scope; a new id (e.g. a date) scrapes everything again
+VARIANT_COLUMNS = ("metal", "stone_type", "stone_shape", "stone_carat", "clarity", "color", "cut", "variant_no")
+
+# Fetch mode: "http_first" tries a plain HTTP fetch + static parse before the browser,
+# "browser" always runs the full Selenium flow
+FETCH_MODE = "http_first"
+
+# Change detection: skip variants whose product page prices match the last full scrape
+# (the previous row is written again with status "unchanged"); full refresh every N days
+CHANGE_DETECTION = True
+FINGERPRINT_PATH = DEFAULT_FINGERPRINT_PATH
+FULL_REFRESH_DAYS = 7
 
 # Concurrency & politeness
-MAX_WORKERS = 2               # <-- two threads
+MAX_WORKERS = 4               # browser ceiling; the domain limiter decides how many navigate at once
 JITTER_MIN, JITTER_MAX = 0.15, 0.45 # tiny random sleep around actions
+NAV_LIMITS = {                      # per-domain token bucket + AIMD limits (utils.rate_limiter)
+    "rate": 0.5, "burst": 2,
+    "concurrency": 2, "max_concurrency": MAX_WORKERS,
+    "target_latency": 15.0, "block_cooldown": 90.0,
+}
 
 # Retry & nav tuning
 UNLIMITED_RETRY = True
 MAX_ATTEMPTS_PER_URL = 8            # used only if UNLIMITED_RETRY = False
 PAGE_LOAD_TIMEOUT = 45              # seconds
 NAV_RESTART_EVERY = 3               # restart driver after these many nav fails
+DRIVER_RECYCLE_EVERY = 25           # fresh browser after these many products per worker
+BROWSER_MAX_RSS_MB = 1500           # recycle a browser whose process tree grows past this between tasks
+BROWSER_MAX_CPU_PERCENT = 90        # ...or whose CPU stays above this (% of one core)
+WATCHDOG_CPU_STRIKES = 3            # for this many checks in a row
+BLOCK_PROFILE = "anb"               # helpers.request_blocking profile (images/fonts/media/trackers off)
+HEADLESS = None                     # None = SCRAPER_HEADLESS env var; True/False to force
+STANDBY_BROWSERS = 1                # browsers kept pre-launched for restarts / new workers
+# Cookie-name prefixes kept between variants of one URL (OneTrust consent + IAB TCF strings)
+CONSENT_COOKIES = ("Optanon", "OTAdditionalConsentString", "eupubconsent", "euconsent")
+COOKIE_BANNER_ID = "onetrust-banner-sdk"
+SELECTOR_STATS_PATH = DEFAULT_REGISTRY_PATH  # fallback-selector hit rates, reused across runs
+METRICS_PROM_PATH = "anb_metrics.prom"      # per-step timings (utils.metrics), Prometheus textfile
+METRICS_JSONL_PATH = metrics.DEFAULT_JSONL_PATH  # ...and one JSONL line per series per run
 BASE_BACKOFF = 1.0                  # seconds
 MAX_BACKOFF = 20.0                  # seconds
 
 # =========================================================
 
-# Globals for thread-safe writing
-write_lock = threading.Lock()
+# Output sink (one writer thread, file kept open)
+_result_sink = None
+_result_sink_lock = threading.Lock()
 
 def ensure_dir(path):
     if not os.path.exists(path):
         os.makedirs(path)
 
-ensure_dir(SCREENSHOTS_DIR)
-
 def rando(min_s=JITTER_MIN, max_s=JITTER_MAX):
     time.sleep(random.uniform(min_s, max_s))
 
@@ -59,70 +112,322 @@ def backoff_sleep(attempt, base=BASE_BACKOFF, cap=MAX_BACKOFF):
     delay = min(cap, base * (2 ** max(0, attempt-1)))
     time.sleep(delay)
 
+def get_result_sink():
+    global _result_sink
+    with _result_sink_lock:
+        if _result_sink is None:
+            _result_sink = CsvResultSink(OUTPUT_CSV, RESULT_FIELDS)
+        return _result_sink
+
+def close_result_sink():
+    global _result_sink
+    with _result_sink_lock:
+        if _result_sink is not None:
+            _result_sink.close()
+            print(f"📝 {_result_sink.written} result rows written")
+            _result_sink = None
+
 def append_result_row(row_dict):
-    """Thread-safe append to CSV."""
-    with write_lock:
-        mode = 'a' if os.path.exists(OUTPUT_CSV) else 'w'
-        header = not os.path.exists(OUTPUT_CSV)
-        try:
-            pd.DataFrame([row_dict]).to_csv(
-                OUTPUT_CSV, index=False, encoding="utf-8-sig",
-                mode=mode, header=header
+    """Thread-safe append to CSV: queued for the sink's writer thread."""
+    get_result_sink().write(row_dict)
+
+_screenshots = None
+_screenshots_lock = threading.Lock()
+
+def get_screenshots():
+    global _screenshots
+    with _screenshots_lock:
+        if _screenshots is None:
+            _screenshots = ScreenshotPipeline(
+                SCREENSHOTS_DIR, policy=SCREENSHOT_POLICY, sample_rate=SCREENSHOT_SAMPLE_RATE,
+                fmt=SCREENSHOT_FORMAT, max_width=SCREENSHOT_MAX_WIDTH,
             )
-        except Exception as e:
-            print(f"❌ Error appending result row: {e}")
-
-def load_resume_set(output_csv):
-    done = set()
-    if os.path.exists(output_csv):
-        try:
-            prev = pd.read_csv(output_csv)
-            if 'product_url' in prev.columns and 'status' in prev.columns:
-                done = set(prev.loc[prev['status'] == 'success', 'product_url'].astype(str))
-                print(f"🔁 Resume mode: {len(done)} URLs already done (skipping).")
-        except Exception as e:
-            print(f"⚠️ Could not read existing OUTPUT_CSV for resume: {e}")
-    return done
+        return _screenshots
+
+def close_screenshots():
+    global _screenshots
+    with _screenshots_lock:
+        if _screenshots is not None:
+            _screenshots.close()
+            print(f"📸 {_screenshots.summary()}")
+            _screenshots = None
+
+_selector_registry = None
+_selector_registry_lock = threading.Lock()
+
+def get_selector_registry():
+    global _selector_registry
+    with _selector_registry_lock:
+        if _selector_registry is None:
+            _selector_registry = SelectorRegistry(SITE, SELECTOR_STATS_PATH)
+        return _selector_registry
+
+def close_selector_registry():
+    global _selector_registry
+    with _selector_registry_lock:
+        if _selector_registry is not None:
+            _selector_registry.save()
+            _selector_registry = None
+
+_fingerprints = None
+_fingerprints_lock = threading.Lock()
+
+def get_fingerprints():
+    global _fingerprints
+    with _fingerprints_lock:
+        if _fingerprints is None:
+            _fingerprints = FingerprintStore(FINGERPRINT_PATH, refresh_days=FULL_REFRESH_DAYS)
+        return _fingerprints
+
+def close_fingerprints():
+    global _fingerprints
+    with _fingerprints_lock:
+        if _fingerprints is not None:
+            print(f"🔎 {_fingerprints.summary()}")
+            _fingerprints.close()
+            _fingerprints = None
+
+_watchdog = None
+_watchdog_lock = threading.Lock()
+
+def get_watchdog():
+    global _watchdog
+    with _watchdog_lock:
+        if _watchdog is None:
+            _watchdog = BrowserWatchdog(BROWSER_MAX_RSS_MB, BROWSER_MAX_CPU_PERCENT, WATCHDOG_CPU_STRIKES)
+        return _watchdog
+
+def task_variant_key(row):
+    return variant_key(row, VARIANT_COLUMNS)
 
 # ---------------------- Driver Builder ----------------------
 def build_driver():
-    options = webdriver.ChromeOptions()
-    # options.add_argument("--headless=new")  # uncomment for headless
-    options.add_argument("--window-size=1920,1080")
-    options.add_argument('--ignore-certificate-errors')
-    options.add_argument('--ignore-ssl-errors')
-    options.add_argument('--disable-gpu')
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--disable-blink-features=AutomationControlled')
-    options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    options.add_experimental_option('useAutomationExtension', False)
-
-    d = webdriver.Chrome(options=options)
-    d.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
-    try:
-        d.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-    except Exception:
-        pass
-    return d
+    return create_driver(
+        CHROME, headless=HEADLESS, block_profile=BLOCK_PROFILE, page_load_timeout=PAGE_LOAD_TIMEOUT,
+        extra_args=("--ignore-certificate-errors", "--ignore-ssl-errors"), request_report=True,
+    )
+
+_standby = None
+_standby_lock = threading.Lock()
+
+def new_driver():
+    """A pre-launched browser from the standby set (built inline if none is ready)."""
+    global _standby
+    with _standby_lock:
+        if _standby is None:
+            _standby = StandbyBrowsers(build_driver, size=STANDBY_BROWSERS)
+    return _standby.take()
+
+def close_standby():
+    global _standby
+    with _standby_lock:
+        if _standby is not None:
+            _standby.close()
+            print(f"🔥 {_standby.summary()}")
+            _standby = None
+
+# ---------------------- Fallback selectors ----------------------
+# Probed together in one browser call (helpers.selector_probe), best-first by hit rate
+COOKIE_SELECTORS = [
+    "//button[@id='onetrust-accept-btn-handler']",
+    "//button[contains(@class, 'accept-cookies')]",
+    "//button[contains(@class, 'cookie-accept')]",
+    "//button[contains(text(), 'Accept')]",
+    "//button[contains(text(), 'OK')]",
+    "#cookie-accept",
+    ".cookie-accept",
+    "[data-cookie-accept]"
+]
+ADD_TO_CART_SELECTORS = [
+    "//button[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'add to cart')]",
+    "//button[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'add to bag')]",
+    "//input[@type='submit' and contains(translate(@value, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'add to cart')]",
+    "//input[@type='submit' and contains(translate(@value, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'add to bag')]",
+    "//a[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'add to cart')]",
+    "//a[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'add to bag')]",
+    "//button[@id='add-to-cart']",
+    "//button[@id='add-to-bag']",
+    "//button[contains(@class, 'add-to-cart')]",
+    "//button[contains(@class, 'add-to-bag')]",
+    ".add-to-cart",
+    ".add-to-bag",
+    "#add-to-cart",
+    "#add-to-bag"
+]
+PRODUCT_SIGNAL_SELECTORS = [
+    "//button[contains(translate(text(),'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'add to cart') or contains(translate(text(),'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'add to bag')]",
+    ".panel",
+    "//span[contains(@class,'caret') or self::span[@class='caret']]"
+]
+
+# ---------------------- Extraction specs ----------------------
+# Everything scrape_cart_details reads, collected in one execute_script
+CART_DETAILS_SPEC = {
+    "fields": {
+        "ga_cart_data": {"css": "#checkout-cart", "attr": "data-ga-cart-data"},
+        "visible_prices": {
+            "css": ".cartPrice, .checkout_option.prodetailhed, .price, .cart-total, .summary_total, #total, .strike-price",
+            "all": True,
+        },
+        "summary_rows": {
+            "xpath": "//table[contains(@class,'table-price')]//tr",
+            "fields": {
+                "left": {"css": [".pull-left", "td:first-of-type"]},
+                "right": {"css": [".pull-right", "td:last-of-type"]},
+            },
+        },
+        "sticky_total": {"css": ".sticky-total-price .sticky-amount"},
+    },
+}
+
+# innerHTML of the first .panel whose text contains the marker, polled in the page until the
+# deadline (one round trip instead of find_elements + innerText per panel per poll)
+SELECTED_PANEL_MARKER = "You have selected"
+SELECTED_PANEL_TIMEOUT = 6  # seconds, must stay below the driver's script timeout
+SELECTED_PANEL_JS = r"""
+var marker = arguments[0], timeoutMs = arguments[1], pollMs = arguments[2];
+var done = arguments[arguments.length - 1];
+var deadline = Date.now() + timeoutMs;
+function scan() {
+    var panels = document.querySelectorAll('.panel');
+    for (var i = 0; i < panels.length; i++) {
+        if (String(panels[i].textContent || '').replace(/\s+/g, ' ').indexOf(marker) !== -1) {
+            done(panels[i].innerHTML);
+            return;
+        }
+    }
+    if (Date.now() >= deadline) { done(null); return; }
+    setTimeout(scan, pollMs);
+}
+scan();
+"""
+
+# ---------------------- Output schema ----------------------
+def build_result_row(row, url, selections, desc_data, ring_diamond_data, pdp_price_data, cart_price_data,
+                     status="success", error_reason=""):
+    """
+    FINAL SCHEMA shared by the browser flow and the HTTP fast path.
+    Cart summary_* lines vary per cart; the result sink packs them into its extras column.
+    """
+    summary = {k: v for k, v in cart_price_data.items() if k.startswith("summary_")}
+    return {
+        "website": row.get("website", ""),
+        "product_url": url,
+        "category": row.get("category", ""),
+        "sub_category": row.get("subcategory", ""),
+        "collection_no": row.get("collection_no", ""),
+        "variant_no": row.get("variant_no", ""),
+        "metal": selections.get("metal") or "",
+        "stone_type": selections.get("stone_type") or "",
+        "stone_shape": selections.get("stone_shape") or "",
+        "stone_carat": selections.get("stone_carat") or "",
+        "color": selections.get("color") or "",
+        "clarity": selections.get("clarity") or "",
+        "cut": selections.get("cut") or "",
+
+        "product_title": desc_data.get("description_full", ""),
+        "metal_price": pdp_price_data.get("pdp_current_price", ""),
+        "stone_price": "",  # not parsed separately
+        "updated_date": datetime.now().strftime("%Y-%m-%d"),
+
+        "setting_title": ring_diamond_data.get("ring_diamond_details_text", ""),
+        "setting_price": "",
+        "diamond_title": "",
+
+        "product_description": desc_data.get("description_full", ""),
+        "additional_attributes": json.dumps(ring_diamond_data),
+
+        "metal_price_e": cart_price_data.get("cart_item_price", ""),
+        "stone_price_e": "",
+        "final_price_e": cart_price_data.get("summary_total", ""),
+        "updated_date_t": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "metal_t": cart_price_data.get("metal_purity_cart", ""),
+        "stone_type_t": cart_price_data.get("stone_type_cart", ""),
+        "stone_shape_t": cart_price_data.get("stone_shape_cart", ""),
+        "clarity_t": cart_price_data.get("stone_clarity_cart", ""),
+        "cut_t": cart_price_data.get("stone_cut_cart", ""),
+
+        "promotion_price": cart_price_data.get("cart_prices_found", ""),
+        "rrp_price": pdp_price_data.get("pdp_strike_price", ""),
+        "you_save": pdp_price_data.get("pdp_offer_text", ""),
+        "final_price": cart_price_data.get("sticky_total", cart_price_data.get("summary_total", "")),
+
+        "product_url1": url,
+        "status": status,
+        "error_reason": error_reason,
+        **summary,
+    }
+
+# Stable CSV header: every fixed key of the schema (summary_* go to the extras column)
+RESULT_FIELDS = list(build_result_row({}, "", {}, {}, {}, {}, {}).keys())
 
 # ---------------------- Per-Thread Scraper ----------------------
 class Scraper:
     def __init__(self, thread_name="T"):
         self.thread_name = thread_name
-        self.driver = build_driver()
+        self.driver = new_driver()
         self.wait = WebDriverWait(self.driver, 20)
         self.actions = ActionChains(self.driver)
+        self.cookies_handled = False
+        self.page_url = None          # product page loaded and ready for an in-place variant
+        self.page_selected = set()    # ...and the option fields already selected on it
 
     def restart_driver(self):
+        get_watchdog().forget(self.driver)
         try:
             self.driver.quit()
         except Exception:
             pass
-        time.sleep(1.0)
-        self.driver = build_driver()
+        self.driver = new_driver()
         self.wait = WebDriverWait(self.driver, 20)
         self.actions = ActionChains(self.driver)
+        self.cookies_handled = False
+        self.page_url = None
+
+    # ---- pool lifecycle ----
+    def is_healthy(self):
+        """Liveness + memory/CPU probe run by the pool between tasks."""
+        try:
+            self.driver.execute_script("return 1")
+            if not self.driver.window_handles:
+                return False
+        except Exception:
+            return False
+        return get_watchdog().check(self.driver, self.thread_name) is None
+
+    def reset_session(self):
+        """Clear cookies/storage so a reused browser starts each product with an empty cart."""
+        self.cookies_handled = False
+        self.page_url = None
+        try:
+            self.driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        except Exception:
+            try:
+                self.driver.delete_all_cookies()
+            except Exception:
+                pass
+        try:
+            self.driver.execute_script(
+                "try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}"
+            )
+        except Exception:
+            pass
+
+    def reset_cart_state(self):
+        """Between variants of one URL: drop the cart (cookies/storage) but keep cookie consent."""
+        try:
+            for c in self.driver.get_cookies():
+                if not (c.get("name") or "").startswith(CONSENT_COOKIES):
+                    self.driver.delete_cookie(c["name"])
+        except Exception:
+            self.reset_session()
+            return
+        try:
+            self.driver.execute_script(
+                "try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}"
+            )
+        except Exception:
+            pass
 
     # ---- helpers (bound to this driver) ----
     def sleep_safely(self, seconds=0.7):
@@ -186,16 +491,19 @@ class Scraper:
             rando(0.3, 0.7)
         return False
 
-    def take_screenshot(self, filename_prefix, idx, attempt=None):
+    def take_screenshot(self, filename_prefix, idx, attempt=None, failure=False):
+        """Queue a screenshot if SCREENSHOT_POLICY wants one; encoding and writing run in the background."""
+        pipeline = get_screenshots()
+        if not pipeline.wanted(failure):
+            return None
         try:
             ts = now_ts()
             attempt_part = f"_try{attempt:02d}" if attempt is not None else ""
-            filename = f"{filename_prefix}_{self.thread_name}_{idx+1:03d}{attempt_part}_{ts}.png"
-            path = os.path.join(SCREENSHOTS_DIR, filename)
+            basename = f"{filename_prefix}_{self.thread_name}_{idx+1:03d}{attempt_part}_{ts}"
             self.driver.execute_script("window.scrollTo(0, 0);")
-            rando(0.3, 0.6)
-            self.driver.save_screenshot(path)
-            print(f"📸 [{self.thread_name}] Screenshot saved: {filename}")
+            filename = pipeline.grab(self.driver, basename, stream=self.thread_name)
+            if filename:
+                print(f"📸 [{self.thread_name}] Screenshot queued: {filename}")
             return filename
         except Exception as e:
             print(f"❌ [{self.thread_name}] Screenshot failed: {e}")
@@ -220,19 +528,8 @@ class Scraper:
         return False
 
     def page_has_product_signals(self):
-        try:
-            candidates = [
-                (By.XPATH, "//button[contains(translate(text(),'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'add to cart') or contains(translate(text(),'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'add to bag')]"),
-                (By.CSS_SELECTOR, ".panel"),
-                (By.XPATH, "//span[contains(@class,'caret') or self::span[@class='caret']]"),
-            ]
-            for by, sel in candidates:
-                elems = self.driver.find_elements(by, sel)
-                if any(e.is_displayed() for e in elems):
-                    return True
-        except Exception:
-            pass
-        return False
+        return probe_ranked(self.driver, get_selector_registry(), "product_signals",
+                            PRODUCT_SIGNAL_SELECTORS, mode=VISIBLE, timeout=0) is not None
 
     def open_url_with_retries(self, url, idx):
         attempt = 0
@@ -240,27 +537,34 @@ class Scraper:
         while True:
             attempt += 1
             try:
-                print(f"🌐 [{self.thread_name}] Navigating (attempt {attempt}): {url}")
-                try:
-                    self.driver.get(url)
-                except TimeoutException:
-                    print(f"⏱️ [{self.thread_name}] Page load timed out, stopping load and checking DOM…")
-                    try: self.driver.execute_script("window.stop();")
-                    except Exception: pass
-
-                if not self.wait_for_dom_ready(timeout=25):
-                    raise TimeoutException("DOM not ready after navigation")
-
-                time.sleep(0.8)  # settle
-                if not self.page_has_product_signals():
-                    raise TimeoutException("Product signals not found")
-
-                print(f"✅ [{self.thread_name}] Nav ok")
+                with limiter_for(url).slot() as nav:
+                    print(f"🌐 [{self.thread_name}] Navigating (attempt {attempt}): {url}")
+                    reset_report(self.driver)
+                    try:
+                        self.driver.get(url)
+                    except TimeoutException:
+                        print(f"⏱️ [{self.thread_name}] Page load timed out, stopping load and checking DOM…")
+                        nav.outcome = TIMEOUT
+                        try: self.driver.execute_script("window.stop();")
+                        except Exception: pass
+
+                    ready = self.wait_for_dom_ready(timeout=25)
+                    if page_looks_blocked(self.driver):
+                        nav.outcome = BLOCKED
+                        raise WebDriverException("Block page served")
+                    if not ready:
+                        raise TimeoutException("DOM not ready after navigation")
+
+                    time.sleep(0.8)  # settle
+                    if not self.page_has_product_signals():
+                        raise TimeoutException("Product signals not found")
+
+                print(f"✅ [{self.thread_name}] Nav ok — {format_report(page_report(self.driver))}")
                 return True, attempt, None
 
             except Exception as e:
                 print(f"⚠️ [{self.thread_name}] Nav attempt {attempt} failed: {e}")
-                self.take_screenshot("nav_fail", idx, attempt=attempt)
+                self.take_screenshot("nav_fail", idx, attempt=attempt, failure=True)
                 fails_since_restart += 1
 
                 if fails_since_restart >= NAV_RESTART_EVERY:
@@ -275,26 +579,41 @@ class Scraper:
 
     # ---- site interactions (ported) ----
     def accept_cookies(self):
-        selectors = [
-            "//button[@id='onetrust-accept-btn-handler']",
-            "//button[contains(@class, 'accept-cookies')]",
-            "//button[contains(@class, 'cookie-accept')]",
-            "//button[contains(text(), 'Accept')]",
-            "//button[contains(text(), 'OK')]",
-            "#cookie-accept",
-            ".cookie-accept",
-            "[data-cookie-accept]"
-        ]
-        for selector in selectors:
-            try:
-                by_type = By.XPATH if selector.startswith("//") or selector.startswith("(") else By.CSS_SELECTOR
-                element = WebDriverWait(self.driver, 4).until(EC.element_to_be_clickable((by_type, selector)))
-                element.click()
-                rando()
-                return True
-            except Exception:
-                continue
-        return False
+        hit = probe_ranked(self.driver, get_selector_registry(), "accept_cookies",
+                           COOKIE_SELECTORS, mode=CLICKABLE, timeout=4)
+        if not hit:
+            return False
+        try:
+            hit.element.click()
+        except Exception:
+            return False
+        rando()
+        return True
+
+    def on_page(self, url):
+        return urldefrag(self.driver.current_url)[0].rstrip("/") == urldefrag(url)[0].rstrip("/")
+
+    def return_to_product(self, url):
+        """
+        After the cart step, get back to the configurator without a fresh load: close the
+        minicart, or go back from the cart page (bfcache / HTTP cache). False = reload needed.
+        """
+        try:
+            if self.on_page(url):
+                self.actions.send_keys(Keys.ESCAPE).perform()
+            else:
+                with limiter_for(url).slot():
+                    self.driver.back()
+                    self.wait_for_dom_ready(timeout=10)
+            return self.on_page(url) and self.page_has_product_signals()
+        except Exception:
+            return False
+
+    def cookie_banner_visible(self):
+        try:
+            return any(el.is_displayed() for el in self.driver.find_elements(By.ID, COOKIE_BANNER_ID))
+        except Exception:
+            return False
 
     def open_ring_size_dropdown(self):
         opened = self.safe_click("//span[contains(@class,'caret') or self::span[@class='caret']]", timeout=8)
@@ -363,13 +682,11 @@ class Scraper:
         """Return ordered unique list of currency-like strings from elements' text."""
         prices = []
         seen = set()
-        # currency tokens like £1,234.56 / $1,234 / €1.234,56 etc. (keep simple UK/US/EU patterns)
-        price_re = re.compile(r"(?:£|\$|€)\s?\d[\d,\.]*")
+        # currency tokens like £1,234.56 / $1,234 / €1.234,56 (utils.prices.PRICE_RE)
         for el in elements:
             try:
-                txt = (el.text or el.get_attribute("innerText") or "").strip().replace("\xa0", " ")
-                for match in price_re.findall(txt):
-                    m = match.strip()
+                txt = (el.text or el.get_attribute("innerText") or "").strip()
+                for m in extract_prices(txt):
                     if m and m not in seen:
                         seen.add(m)
                         prices.append(m)
@@ -378,15 +695,8 @@ class Scraper:
         return prices
 
     def _first_text(self, css_list):
-        for sel in css_list:
-            try:
-                el = self.driver.find_element(By.CSS_SELECTOR, sel)
-                tx = (el.text or el.get_attribute("innerText") or "").strip().replace("\xa0", " ")
-                if tx:
-                    return tx
-            except Exception:
-                continue
-        return ""
+        hit = probe_first(self.driver, css_list, mode=TEXT, timeout=0)
+        return hit.text if hit else ""
 
     def scrape_pdp_prices(self):
         """
@@ -420,7 +730,7 @@ class Scraper:
             pdp_current = ""
             if curr_specific:
                 # From that block, pull first currency token
-                m = re.search(r"(?:£|\$|€)\s?\d[\d,\.]*", curr_specific)
+                m = PRICE_RE.search(curr_specific)
                 if m:
                     pdp_current = m.group(0).strip()
 
@@ -430,7 +740,7 @@ class Scraper:
 
             data["pdp_current_price"] = pdp_current
             if strike:
-                m = re.search(r"(?:£|\$|€)\s?\d[\d,\.]*", strike)
+                m = PRICE_RE.search(strike)
                 if m:
                     data["pdp_strike_price"] = m.group(0).strip()
             if offer:
@@ -445,41 +755,15 @@ class Scraper:
     def scrape_complete_description(self):
         out = {}
         try:
-            panels = []
-            for _ in range(10):
-                panels = self.driver.find_elements(By.CSS_SELECTOR, ".panel")
-                found = False
-                for panel in panels:
-                    if "You have selected" in panel.get_attribute("innerText"):
-                        found = True
-                        break
-                if found:
-                    break
-                self.sleep_safely(0.6)
-
-            target_panel = None
-            for panel in panels:
-                if "You have selected" in panel.get_attribute("innerText"):
-                    target_panel = panel
-                    break
-
-            if not target_panel:
+            html = self.driver.execute_async_script(
+                SELECTED_PANEL_JS, SELECTED_PANEL_MARKER, SELECTED_PANEL_TIMEOUT * 1000, 300
+            )
+            if html is None:
                 print(f"⚠️ [{self.thread_name}] No product description panel found")
                 out["description_full"] = ""
                 return out
 
-            html = target_panel.get_attribute("innerHTML")
-            soup = BeautifulSoup(html, "html.parser")
-
-            full_desc = []
-            for p in soup.find_all("p"):
-                full_desc.append(" ".join(p.stripped_strings))
-            h2 = soup.find("h2", {"class": "product_varaint_main"})
-            if h2:
-                full_desc.append(" ".join(h2.stripped_strings))
-
-            desc_line = " ".join(full_desc)
-            desc_line = re.sub(r"\s+", " ", desc_line).replace('\xa0', ' ').strip()
+            desc_line = anb_http.description_from_panel_html(html)
             out["description_full"] = desc_line
 
             print(f"✅ [{self.thread_name}] Description extracted ({len(desc_line)} chars)")
@@ -541,92 +825,41 @@ class Scraper:
           - cart_prices_found (visible prices fallback)
         """
         data = {}
+        try:
+            raw = extract(self.driver, CART_DETAILS_SPEC) or {}
+        except Exception as e:
+            print(f"⚠️ [{self.thread_name}] Cart extraction script failed: {e}")
+            raw = {}
 
         # Try the analytics payload
         try:
-            json_str = self.driver.execute_script(
-                "var el = document.querySelector('#checkout-cart');"
-                "return el ? el.getAttribute('data-ga-cart-data') : null;"
-            )
+            json_str = raw.get("ga_cart_data")
             if json_str:
-                j = json.loads(json_str)
-                data["cart_currency"] = j.get("currency", "")
-                data["cart_value"] = j.get("value", "")
-                data["coupon_code"] = j.get("coupon", "")
-                items = j.get("items", [])
-                if items:
-                    itm = items[0]
-                    data.update({
-                        "item_id": itm.get("item_id", ""),
-                        "item_name": itm.get("item_name", ""),
-                        "item_brand": itm.get("item_brand", ""),
-                        "item_category": itm.get("item_category", ""),
-                        "item_variant": itm.get("item_variant", ""),
-                        "cart_item_price": itm.get("price", ""),
-                        "cart_item_qty": itm.get("quantity", ""),
-                        "cart_id": itm.get("cart_id", ""),
-                        "metal_purity_cart": itm.get("metal_purity", ""),
-                        "ring_size_cart": itm.get("ring_size", ""),
-                        "stone_type_cart": itm.get("stone_type", ""),
-                        "stone_carat_cart": itm.get("stone_carat", ""),
-                        "stone_clarity_cart": itm.get("stone_clarity", ""),
-                        "stone_color_cart": itm.get("stone_color", ""),
-                        "stone_cut_cart": itm.get("stone_cut", ""),
-                        "stone_certificate_cart": itm.get("stone_certificate", ""),
-                        "band_width_cart": itm.get("band_width", ""),
-                        "stone_shape_cart": itm.get("stone_shape", ""),
-                    })
+                data.update(anb_http.cart_fields(json.loads(json_str)))
         except Exception:
             # silently ignore if the attribute or json is missing/bad
             pass
 
         # Visible cart text (fallbacks)
-        try:
-            sel = ".cartPrice, .checkout_option.prodetailhed, .price, .cart-total, .summary_total, #total, .strike-price"
-            found = self.driver.find_elements(By.CSS_SELECTOR, sel)
-            prices = []
-            for el in found:
-                tx = (el.text or "").strip().replace('\n', ' ').replace('\xa0', ' ')
-                if tx and any(c.isdigit() for c in tx):
-                    prices.append(tx)
-            if prices:
-                data["cart_prices_found"] = " | ".join(prices)
-        except Exception:
-            pass
+        prices = []
+        for tx in raw.get("visible_prices", []):
+            tx = (tx or "").strip().replace('\n', ' ').replace('\xa0', ' ')
+            if tx and any(c.isdigit() for c in tx):
+                prices.append(tx)
+        if prices:
+            data["cart_prices_found"] = " | ".join(prices)
 
         # Totals table (Subtotal / VAT / Coupon / Total)
-        try:
-            rows = self.driver.find_elements(By.XPATH, "//table[contains(@class,'table-price')]//tr")
-            for r in rows:
-                left = ""
-                right = ""
-                try:
-                    left = r.find_element(By.CSS_SELECTOR, ".pull-left").text.strip()
-                except Exception:
-                    try:
-                        left = r.find_elements(By.TAG_NAME, "td")[0].text.strip()
-                    except Exception:
-                        pass
-                try:
-                    right = r.find_element(By.CSS_SELECTOR, ".pull-right").text.strip()
-                except Exception:
-                    try:
-                        tds = r.find_elements(By.TAG_NAME, "td")
-                        right = tds[-1].text.strip() if tds else ""
-                    except Exception:
-                        pass
-                if left:
-                    key = left.lower().strip().replace(" ", "_").replace(":", "")
-                    data[f"summary_{key}"] = right
-        except Exception:
-            pass
+        for r in raw.get("summary_rows", []):
+            left = (r.get("left") or "").strip()
+            right = (r.get("right") or "").strip()
+            if left:
+                key = left.lower().strip().replace(" ", "_").replace(":", "")
+                data[f"summary_{key}"] = right
 
         # Sticky total (if available)
-        try:
-            el = self.driver.find_element(By.CSS_SELECTOR, ".sticky-total-price .sticky-amount")
-            data["sticky_total"] = el.text.strip()
-        except Exception:
-            pass
+        if raw.get("sticky_total") is not None:
+            data["sticky_total"] = raw["sticky_total"].strip()
 
         return data
 
@@ -635,30 +868,9 @@ class Scraper:
         cart_data = {}
         cart_screenshot = None
         try:
-            add_button = None
-            selectors = [
-                "//button[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'add to cart')]",
-                "//button[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'add to bag')]",
-                "//input[@type='submit' and contains(translate(@value, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'add to cart')]",
-                "//input[@type='submit' and contains(translate(@value, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'add to bag')]",
-                "//a[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'add to cart')]",
-                "//a[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'add to bag')]",
-                "//button[@id='add-to-cart']",
-                "//button[@id='add-to-bag']",
-                "//button[contains(@class, 'add-to-cart')]",
-                "//button[contains(@class, 'add-to-bag')]",
-                ".add-to-cart",
-                ".add-to-bag",
-                "#add-to-cart",
-                "#add-to-bag"
-            ]
-            for selector in selectors:
-                try:
-                    by_type = By.XPATH if selector.startswith("//") or selector.startswith("(") else By.CSS_SELECTOR
-                    add_button = WebDriverWait(self.driver, 5).until(EC.element_to_be_clickable((by_type, selector)))
-                    break
-                except TimeoutException:
-                    continue
+            hit = probe_ranked(self.driver, get_selector_registry(), "add_to_cart",
+                               ADD_TO_CART_SELECTORS, mode=CLICKABLE, timeout=5)
+            add_button = hit.element if hit else None
             if not add_button:
                 cart_data["add_to_cart_status"] = "button_not_found"
                 return cart_data, None
@@ -708,12 +920,20 @@ class Scraper:
 
     # ------------------ one product end-to-end ------------------
         # ------------------ one product end-to-end ------------------
-    def process_product(self, idx, row):
+    def process_product(self, idx, row, reload=True):
+        """
+        reload=False selects the variant on the product page left by the previous variant
+        (see return_to_product); it falls back to a fresh load when that page is gone, when
+        an option cannot be selected in place, or when the previous variant selected a
+        field this one leaves at its default.
+        """
         url = str(row["product_url"]).strip()
         attempt = 0
 
         while True:
             attempt += 1
+            in_place = not reload and attempt == 1 and self.page_url == url
+            self.page_url = None
             status = "success"
             error_reason = ""
             desc_data = {}
@@ -732,17 +952,31 @@ class Scraper:
             selected_color = None
             selected_cut = None
 
+            started = time.monotonic()
             try:
-                ok, _, nav_err = self.open_url_with_retries(url, idx)
-                if not ok:
-                    raise nav_err or Exception("Navigation failed without explicit error")
-
-                try: 
-                    self.accept_cookies()
-                except: 
-                    pass
+                if in_place:
+                    print(f"🔂 [{self.thread_name}] Product {idx+1}: selecting the variant on the loaded page")
+                else:
+                    with metrics.span(SITE, "navigate") as sp:
+                        ok, _, nav_err = self.open_url_with_retries(url, idx)
+                        if not ok:
+                            sp.outcome = metrics.ERROR
+                    if not ok:
+                        raise nav_err or Exception("Navigation failed without explicit error")
+
+                # Until a click lands, retry on every page; after that only if the banner comes back
+                if not self.cookies_handled or self.cookie_banner_visible():
+                    with metrics.span(SITE, "cookies") as sp:
+                        try:
+                            if self.accept_cookies():
+                                self.cookies_handled = True
+                            else:
+                                sp.outcome = "not_found"
+                        except:
+                            sp.outcome = metrics.ERROR
 
                 # Selections (non-fatal)
+                select_started = time.monotonic()
                 try: selected_metal = self.choose_generic_option("metal_purity", row.get("metal", ""), exact=False); rando()
                 except Exception as e: print(f"[{self.thread_name}] Metal selection error: {e}")
                 try: selected_size = self.choose_ring_size_M(); rando()
@@ -759,22 +993,47 @@ class Scraper:
                 except Exception as e: print(f"[{self.thread_name}] Color selection error: {e}")
                 try: selected_cut = self.choose_generic_option("stone_cut", row.get("cut", ""), exact=False); rando()
                 except Exception as e: print(f"[{self.thread_name}] Cut selection error: {e}")
+                metrics.observe(SITE, "select_options", metrics.OK, time.monotonic() - select_started)
+
+                selections = {
+                    "metal": selected_metal, "stone_type": selected_stone_type,
+                    "stone_shape": selected_shape, "stone_carat": selected_carat,
+                    "color": selected_color, "clarity": selected_clarity, "cut": selected_cut,
+                }
+                requested = {k for k in selections if str(row.get(k, "") or "").strip()}
+                if in_place and (self.page_selected - requested or selected_size is None
+                                 or any(selections[k] is None for k in requested)):
+                    print(f"🔄 [{self.thread_name}] Product {idx+1}: variant not selectable in place, reloading")
+                    reload = True
+                    attempt -= 1
+                    continue
 
-                self.scroll_product_page_deep()
-                self.sleep_safely(0.4)
+                with metrics.span(SITE, "extract"):
+                    self.scroll_product_page_deep()
+                    self.sleep_safely(0.4)
 
-                # Prices BEFORE add to cart
-                pdp_price_data = self.scrape_pdp_prices()
+                    # Prices BEFORE add to cart
+                    pdp_price_data = self.scrape_pdp_prices()
 
-                screenshot_filename = self.take_screenshot("product_page", idx, attempt=attempt)
-                desc_data = self.scrape_complete_description(); rando(0.05, 0.15)
-                ring_diamond_data = self.scrape_ring_and_diamond_details(); rando(0.05, 0.15)
+                    screenshot_filename = self.take_screenshot("product_page", idx, attempt=attempt)
+                    desc_data = self.scrape_complete_description(); rando(0.05, 0.15)
+                    ring_diamond_data = self.scrape_ring_and_diamond_details(); rando(0.05, 0.15)
 
                 # Add to cart and collect cart details
-                cart_data, cart_screenshot_filename = self.add_to_cart_and_screenshot(idx, attempt)
-                cart_price_data = self.scrape_cart_details()
+                with metrics.span(SITE, "add_to_cart") as sp:
+                    cart_data, cart_screenshot_filename = self.add_to_cart_and_screenshot(idx, attempt)
+                    if cart_data.get("add_to_cart_status") != "success":
+                        sp.outcome = cart_data.get("add_to_cart_status", metrics.ERROR)
+                with metrics.span(SITE, "cart_details"):
+                    cart_price_data = self.scrape_cart_details()
 
                 print(f"✅ [{self.thread_name}] Done product {idx+1} (attempt {attempt})")
+                if not reload:
+                    with metrics.span(SITE, "return_to_product") as sp:
+                        if self.return_to_product(url):
+                            self.page_url, self.page_selected = url, requested
+                        else:
+                            sp.outcome = "reload"
 
             except KeyboardInterrupt:
                 print(f"🛑 [{self.thread_name}] Stopped by user.")
@@ -784,59 +1043,26 @@ class Scraper:
                 error_reason = f"General error: {e}"
                 print(f"❌ [{self.thread_name}] Error product {idx+1} attempt {attempt}: {e}")
                 try: 
-                    screenshot_filename = self.take_screenshot("error_page", idx, attempt=attempt)
+                    screenshot_filename = self.take_screenshot("error_page", idx, attempt=attempt, failure=True)
                 except: 
                     pass
 
-            # ======================= FINAL SCHEMA =======================
-            row_out = {
-                "website": row.get("website", ""),
-                "product_url": url,
-                "category": row.get("category", ""),
-                "sub_category": row.get("subcategory", ""),
-                "collection_no": row.get("collection_no", ""),
-                "variant_no": row.get("variant_no", ""),
-                "metal": selected_metal or "",
-                "stone_type": selected_stone_type or "",
-                "stone_shape": selected_shape or "",
-                "stone_carat": selected_carat or "",
-                "color": selected_color or "",
-                "clarity": selected_clarity or "",
-                "cut": selected_cut or "",
-
-                "product_title": desc_data.get("description_full", ""),
-                "metal_price": pdp_price_data.get("pdp_current_price", ""),
-                "stone_price": "",  # not parsed separately
-                "updated_date": datetime.now().strftime("%Y-%m-%d"),
-
-                "setting_title": ring_diamond_data.get("ring_diamond_details_text", ""),
-                "setting_price": "",
-                "diamond_title": "",
-
-                "product_description": desc_data.get("description_full", ""),
-                "additional_attributes": json.dumps(ring_diamond_data),
-
-                "metal_price_e": cart_price_data.get("cart_item_price", ""),
-                "stone_price_e": "",
-                "final_price_e": cart_price_data.get("summary_total", ""),
-                "updated_date_t": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "metal_t": cart_price_data.get("metal_purity_cart", ""),
-                "stone_type_t": cart_price_data.get("stone_type_cart", ""),
-                "stone_shape_t": cart_price_data.get("stone_shape_cart", ""),
-                "clarity_t": cart_price_data.get("stone_clarity_cart", ""),
-                "cut_t": cart_price_data.get("stone_cut_cart", ""),
-
-                "promotion_price": cart_price_data.get("cart_prices_found", ""),
-                "rrp_price": pdp_price_data.get("pdp_strike_price", ""),
-                "you_save": pdp_price_data.get("pdp_offer_text", ""),
-                "final_price": cart_price_data.get("sticky_total", cart_price_data.get("summary_total", "")),
-
-                "product_url1": url
-            }
-            # =============================================================
+            row_out = build_result_row(
+                row, url,
+                selections={
+                    "metal": selected_metal, "stone_type": selected_stone_type,
+                    "stone_shape": selected_shape, "stone_carat": selected_carat,
+                    "color": selected_color, "clarity": selected_clarity, "cut": selected_cut,
+                },
+                desc_data=desc_data, ring_diamond_data=ring_diamond_data,
+                pdp_price_data=pdp_price_data, cart_price_data=cart_price_data,
+                status=status, error_reason=error_reason,
+            )
 
             # Persist this attempt
             append_result_row(row_out)
+            metrics.observe(SITE, "product_browser", "ok" if status == "success" else status,
+                            time.monotonic() - started)
 
             if status == "success":
                 return row_out  # success
@@ -854,57 +1080,247 @@ class Scraper:
 
 
     def close(self):
+        get_watchdog().forget(self.driver)
         try:
             self.driver.quit()
         except Exception:
             pass
 
 # ---------------------- Thread wrapper ----------------------
-def threaded_worker(task):
-    """task: (idx, row_dict)"""
-    idx, row = task
+def build_scraper_pool(size=MAX_WORKERS):
+    return DriverPool(
+        factory=lambda: Scraper(thread_name=threading.current_thread().name),
+        size=size,
+        max_tasks=DRIVER_RECYCLE_EVERY,
+        health_check=lambda s: s.is_healthy(),
+        closer=lambda s: s.close(),
+    )
+
+def try_http_fast_path(idx, row, pages=None):
+    """Static HTTP parse of the PDP; returns the persisted row, or None to use the browser."""
+    url = str(row["product_url"]).strip()
+    thread_name = threading.current_thread().name
+    try:
+        with metrics.span(SITE, "http_fast_path") as sp:
+            res = anb_http.scrape_static(url, row, pages=pages)
+            if not res:
+                sp.outcome = "needs_browser"
+    except Exception as e:
+        print(f"⚠️ [{thread_name}] HTTP fast path failed for row {idx+1}: {e}")
+        return None
+    if not res:
+        print(f"↪️ [{thread_name}] Row {idx+1} needs the browser (static parse could not resolve a price)")
+        return None
+    row_out = build_result_row(
+        row, url, res["selections"], res["desc_data"], res["ring_diamond_data"],
+        res["pdp_price_data"], res["cart_price_data"],
+    )
+    append_result_row(row_out)
+    print(f"⚡ [{thread_name}] Done product {idx+1} via HTTP fast path")
+    return row_out
+
+def probe_unchanged(idx, row, pages=None):
+    """
+    Change-detection probe. Returns (row_out, fingerprint): row_out is the previous row
+    re-emitted as "unchanged" when the product page still matches, else None.
+    """
+    if not CHANGE_DETECTION:
+        return None, None
+    url = str(row["product_url"]).strip()
     thread_name = threading.current_thread().name
-    scraper = Scraper(thread_name=thread_name)
     try:
-        return scraper.process_product(idx, row)
-    finally:
-        scraper.close()
+        with metrics.span(SITE, "change_probe") as sp:
+            fp = anb_http.price_fingerprint(url, pages=pages)
+            if not fp:
+                sp.outcome = "no_fingerprint"
+    except Exception as e:
+        print(f"⚠️ [{thread_name}] Change probe failed for row {idx+1}: {e}")
+        return None, None
+    previous = get_fingerprints().lookup(SITE, url, task_variant_key(row), fp)
+    if previous is None:
+        return None, fp
+    metrics.observe(SITE, "unchanged_skip", metrics.OK, 0.0)
+    row_out = {
+        **previous,
+        "status": UNCHANGED,
+        "error_reason": "",
+        "updated_date": datetime.now().strftime("%Y-%m-%d"),
+        "updated_date_t": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    append_result_row(row_out)
+    print(f"💤 [{thread_name}] Row {idx+1} unchanged since last full scrape, skipped")
+    return row_out, fp
+
+def remember_fingerprint(row, fp, row_out):
+    if fp and row_out.get("status") == "success":
+        get_fingerprints().store(SITE, str(row["product_url"]).strip(), task_variant_key(row), fp, row_out)
+
+def threaded_worker(task, pool, ledger=None):
+    """task: (idx, row_dict) — change probe, then HTTP fast path, else a pooled, long-lived Scraper."""
+    idx, row = task
+    pages = {}
+    row_out, fp = probe_unchanged(idx, row, pages)
+    if row_out is None:
+        if FETCH_MODE == "http_first":
+            row_out = try_http_fast_path(idx, row, pages=pages)
+        if row_out is None:
+            with pool.session() as scraper:
+                scraper.thread_name = threading.current_thread().name
+                scraper.reset_session()
+                row_out = scraper.process_product(idx, row)
+        remember_fingerprint(row, fp, row_out)
+    if ledger is not None:
+        ledger.record(SITE, str(row["product_url"]).strip(), task_variant_key(row), row_out.get("status", ""))
+    return row_out
+
+def threaded_group_worker(group, pool, ledger=None):
+    """
+    All variants of one product URL on one worker: the HTTP fast path shares fetched pages,
+    and the rest run back to back on one browser session. The product page is loaded once:
+    after each variant's cart step the browser returns to it (Scraper.return_to_product),
+    only the cart is cleared, and the next variant is selected in place. It is reloaded
+    only when that page cannot be restored or the selection cannot be reset.
+    """
+    thread_name = threading.current_thread().name
+    pages = {}
+    fingerprints = {}
+    rows_out = []
+    browser_tasks = []
+    for task in group.tasks:
+        row_out, fingerprints[task.idx] = probe_unchanged(task.idx, task, pages)
+        if row_out is None and FETCH_MODE == "http_first":
+            row_out = try_http_fast_path(task.idx, task, pages=pages)
+            if row_out is not None:
+                remember_fingerprint(task, fingerprints[task.idx], row_out)
+        if row_out is None:
+            browser_tasks.append(task)
+        else:
+            rows_out.append((task, row_out))
+
+    if browser_tasks:
+        print(f"🧩 [{thread_name}] {len(browser_tasks)} variant(s) of {group.product_url} on one browser")
+        with pool.session() as scraper:
+            scraper.thread_name = thread_name
+            scraper.reset_session()
+            for n, task in enumerate(browser_tasks):
+                if n:
+                    scraper.reset_cart_state()
+                row_out = scraper.process_product(task.idx, task, reload=False)
+                remember_fingerprint(task, fingerprints[task.idx], row_out)
+                rows_out.append((task, row_out))
+
+    if ledger is not None:
+        for task, row_out in rows_out:
+            ledger.record(SITE, task.product_url, task_variant_key(task), row_out.get("status", ""))
+    return [row_out for _, row_out in rows_out]
+
+# ---------------------- Sharded runner hook ----------------------
+class ShardWorker:
+    """Per-process worker for utils.sharded_runner: own browser pool, ledger and output file."""
+    def __init__(self, shard, shards, run_id=None):
+        global OUTPUT_CSV
+        root, ext = os.path.splitext(OUTPUT_CSV)
+        OUTPUT_CSV = f"{root}_shard{shard:02d}{ext}"   # one file per process, no interleaved writes
+        rate_limiter.configure(**NAV_LIMITS)
+        self.shard = shard
+        self.threads = MAX_WORKERS
+        self.pool = build_scraper_pool(MAX_WORKERS)
+        self.ledger = ResumeLedger(LEDGER_PATH, run_id or RUN_ID)
+
+    def handle(self, task):
+        if self.ledger.is_done(SITE, task.product_url, task_variant_key(task)):
+            return "success"
+        row_out = threaded_worker((task.idx, task), self.pool, self.ledger)
+        return row_out.get("status", "error")
+
+    def close(self):
+        self.pool.close()
+        close_standby()
+        close_screenshots()
+        close_selector_registry()
+        close_fingerprints()
+        close_result_sink()
+        self.ledger.close()
+        for line in rate_limiter.summaries():
+            print(f"🚦 {line}")
+        print(f"🧯 Request blocking: {totals_summary()}")
+        print(f"🐏 {get_watchdog().summary()}")
+        root, ext = os.path.splitext(METRICS_PROM_PATH)
+        metrics.export(f"{root}_shard{self.shard:02d}{ext}", METRICS_JSONL_PATH, labels={"shard": self.shard})
 
 # ============================ MAIN ============================
-def main():
-    # Load input
-    df = pd.read_csv(INPUT_CSV)
-    # Ensure column exists
-    if "product_url" not in df.columns:
-        raise ValueError("INPUT_CSV must contain a 'product_url' column.")
+MAX_IN_FLIGHT = MAX_WORKERS * 4     # URL groups queued ahead of the workers while streaming input
 
-    # Resume: skip URLs already success
-    done_urls = load_resume_set(OUTPUT_CSV)
+def main():
+    # Stream input; raises ValueError up front if 'product_url' is missing
+    tasks = read_tasks(INPUT_CSV, required=("product_url",))
+
+    # Resume: skip (url, variant) pairs this run's ledger entries already have as success
+    ledger = ResumeLedger(LEDGER_PATH, RUN_ID)
+    print(f"🔁 Resume ledger {f' (run {ledger.run_id})' if ledger.run_id else ''}: {ledger.done_count(SITE)} variants already done (skipping).")
+
+    rate_limiter.configure(**NAV_LIMITS)
+    print(f"🚀 Streaming tasks from {INPUT_CSV}. Threads: {MAX_WORKERS} (navigation paced per domain)")
+
+    # Worker threads each reuse a pooled browser; the domain limiter paces their navigations
+    pool = build_scraper_pool(MAX_WORKERS)
+    submitted = skipped = completed = 0
+
+    def pending_tasks():
+        nonlocal skipped
+        for task in tasks:
+            # Skip already successful
+            if ledger.is_done(SITE, task.product_url, task_variant_key(task)):
+                skipped += 1
+                continue
+            yield task
 
-    # Build tasks list (skip already successful)
-    tasks = [(idx, row) for idx, row in df.iterrows() if str(row["product_url"]).strip() not in done_urls]
-    total = len(tasks)
-    print(f"🚀 Starting with {total} pending URLs (of {len(df)} total). Threads: {MAX_WORKERS}")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="T") as executor:
+        future_to_group = {}
 
-    if total == 0:
-        print("✅ Nothing to do. All URLs already scraped successfully.")
-        return
+        def collect(futures):
+            nonlocal completed
+            for future in futures:
+                group = future_to_group.pop(future)
+                try:
+                    _ = future.result()  # already appended rows inside
+                    completed += len(group)
+                    print(f"📊 Progress: {completed}/{submitted} variants finished")
+                except Exception as e:
+                    print(f"❌ Worker error on {group.product_url} (rows {group.tasks[0].idx + 1}…): {e}")
 
-    # Thread pool of 2 workers (polite)
-    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="T") as executor:
-        future_to_idx = {executor.submit(threaded_worker, t): t[0] for t in tasks}
-        completed = 0
-        for future in concurrent.futures.as_completed(future_to_idx):
-            idx = future_to_idx[future]
-            try:
-                _ = future.result()  # already appended row inside
-                completed += 1
-                print(f"📊 Progress: {completed}/{total} finished")
-            except KeyboardInterrupt:
-                print("🛑 Interrupted. Exiting…")
-                break
-            except Exception as e:
-                print(f"❌ Worker error on index {idx}: {e}")
+        try:
+            # Variants of the same URL go to one worker, which loads the page once per group
+            for group in group_by_url(pending_tasks()):
+                future_to_group[executor.submit(threaded_group_worker, group, pool, ledger)] = group
+                submitted += len(group)
+                if len(future_to_group) >= MAX_IN_FLIGHT:
+                    done, _ = concurrent.futures.wait(
+                        list(future_to_group), return_when=concurrent.futures.FIRST_COMPLETED)
+                    collect(done)
+            collect(concurrent.futures.as_completed(list(future_to_group)))
+        except KeyboardInterrupt:
+            print("🛑 Interrupted. Exiting…")
+            for future in future_to_group:
+                future.cancel()
+
+    if submitted == 0:
+        print(f"✅ Nothing to do. All {skipped} URLs already scraped successfully.")
+    pool.close()
+    close_standby()
+    close_screenshots()
+    close_selector_registry()
+    close_fingerprints()
+    close_result_sink()
+    ledger.close()
+    print(f"🧹 Browsers started: {pool.created}, recycled: {pool.recycled}")
+    print(f"🐏 {get_watchdog().summary()}")
+    for line in rate_limiter.summaries():
+        print(f"🚦 {line}")
+    print(f"🧯 Request blocking: {totals_summary()}")
+    metrics.export(METRICS_PROM_PATH, METRICS_JSONL_PATH)
+    for line in metrics.summaries():
+        print(f"⏱️ {line}")
 
     print(f"\n📂 Progress saved to {OUTPUT_CSV}")
     print(f"📸 Screenshots in {SCREENSHOTS_DIR}")
@@ -0,0 +1,257 @@
+"""
+Async counterpart of BaseScraper: one trio event loop drives many tabs across a few
+browser processes over the Chrome DevTools Protocol (Selenium's trio-based CDP client).
+
+    class MyScraper(AsyncBaseScraper):
+        async def scrape(self, tab, url):
+            await tab.goto(url)
+            await tab.wait_for("!!document.querySelector('.price')")
+            return {"url": url, "price": await tab.evaluate("document.querySelector('.price').innerText")}
+
+    MyScraper(logger, browsers=2, tabs_per_browser=12).run_sync(urls)
+
+Browsers are started with helpers.webdriver_manager.create_driver (same binaries, headless
+switch and stealth flags as the sync scrapers), then every tab is a CDP target of that
+browser with its own session: request blocking and the navigator.webdriver patch are applied
+per tab. Navigations go through the shared per-domain limiter (utils.rate_limiter), so
+adding tabs raises the ceiling, not the pace. Parsing that is heavier than a few selectors
+belongs in parse_in_pool(), off the event loop.
+"""
+import json
+import time
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from functools import partial
+
+import trio
+from selenium.webdriver.common.bidi import cdp
+
+from helpers.request_blocking import network_patterns, cdp_endpoint
+from helpers.webdriver_manager import create_driver, CHROME, UC
+from scrapers.base_scraper import get_parse_executor
+from utils.rate_limiter import limiter_for, looks_blocked, OK, TIMEOUT, BLOCKED, ERROR
+
+_STEALTH_JS = "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+_BLOCK_PROBE_JS = ("(document.title || '') + ' ' + "
+                   "(document.body && document.body.innerText ? document.body.innerText.slice(0, 3000) : '')")
+
+
+class NavigationError(Exception):
+    pass
+
+
+class _Nav:
+    __slots__ = ("outcome",)
+
+    def __init__(self):
+        self.outcome = None
+
+
+@asynccontextmanager
+async def nav_slot(url):
+    """Async DomainLimiter.slot(): waits for the domain's token in a worker thread, not the loop."""
+    limiter = limiter_for(url)
+    await trio.to_thread.run_sync(limiter.acquire, abandon_on_cancel=True)
+    nav = _Nav()
+    start = time.monotonic()
+    try:
+        yield nav
+    except BaseException as e:
+        if nav.outcome is None:
+            nav.outcome = TIMEOUT if "timeout" in type(e).__name__.lower() else ERROR
+        raise
+    finally:
+        limiter.release(time.monotonic() - start, nav.outcome or OK)
+
+
+class Tab:
+    """One browser tab (CDP target) with its own session."""
+
+    def __init__(self, conn, devtools, session, name):
+        self.conn = conn
+        self.devtools = devtools
+        self.session = session
+        self.name = name
+        self.url = None
+
+    @classmethod
+    async def open(cls, conn, devtools, name, block_profile="default"):
+        target_id = await conn.execute(devtools.target.create_target("about:blank"))
+        session = await conn.connect_session(target_id)
+        tab = cls(conn, devtools, session, name)
+        await session.execute(devtools.page.enable())
+        await session.execute(devtools.page.add_script_to_evaluate_on_new_document(_STEALTH_JS))
+        # Allow-list profiles are blocked by the FetchBlocker create_driver started for the browser
+        patterns = network_patterns(block_profile)
+        if patterns:
+            await session.execute(devtools.network.enable())
+            await session.execute(devtools.network.set_blocked_ur_ls(patterns))
+        return tab
+
+    async def goto(self, url, timeout=45):
+        """Navigate and wait for the load event (stopping the load after `timeout`), paced per domain."""
+        page = self.devtools.page
+        async with nav_slot(url) as nav:
+            with trio.move_on_after(timeout) as scope:
+                async with self.session.wait_for(page.LoadEventFired):
+                    _, _, error_text = await self.session.execute(page.navigate(url))
+                    if error_text:
+                        raise NavigationError(f"{error_text} at {url}")
+            if scope.cancelled_caught:
+                nav.outcome = TIMEOUT
+                await self.session.execute(page.stop_loading())
+            if looks_blocked(await self.evaluate(_BLOCK_PROBE_JS)):
+                nav.outcome = BLOCKED
+                raise NavigationError(f"Block page served at {url}")
+        self.url = url
+        return not scope.cancelled_caught
+
+    async def evaluate(self, expression, await_promise=False):
+        """Value of a JS expression (JSON-serialisable results only)."""
+        result, exception = await self.session.execute(self.devtools.runtime.evaluate(
+            expression, return_by_value=True, await_promise=await_promise))
+        if exception is not None:
+            raise RuntimeError(f"JS error in {self.name}: {exception.text}")
+        return result.value
+
+    async def wait_for(self, expression, timeout=10, poll=0.25):
+        """Poll `expression` until it is truthy; returns its value or raises trio.TooSlowError."""
+        with trio.fail_after(timeout):
+            while True:
+                value = await self.evaluate(expression)
+                if value:
+                    return value
+                await trio.sleep(poll)
+
+    async def click(self, css):
+        return await self.evaluate(
+            f"(function (el) {{ if (!el) return false; el.scrollIntoView({{block: 'center'}}); el.click(); return true; }})"
+            f"(document.querySelector({json.dumps(css)}))")
+
+    async def html(self):
+        return await self.evaluate("document.documentElement.outerHTML")
+
+    async def title(self):
+        return await self.evaluate("document.title")
+
+    async def close(self):
+        try:
+            await self.conn.execute(self.devtools.target.close_target(self.session.target_id))
+        except Exception:
+            pass
+        self.conn.sessions.pop(self.session.session_id, None)
+
+
+class AsyncBaseScraper(ABC):
+    """
+    Subclasses implement `async scrape(tab, item) -> dict` and usually on_result() to persist.
+    run(items) spreads the items over `browsers` x `tabs_per_browser` tabs; a tab whose
+    scrape raised is closed and replaced, so one bad page cannot poison the next item.
+    """
+
+    def __init__(self, logger, browsers=2, tabs_per_browser=8, browser=CHROME, headless=None,
+                 block_profile="default", page_load_timeout=45, parse_executor=None):
+        if browser not in (CHROME, UC):
+            raise ValueError("AsyncBaseScraper needs a Chromium browser (CHROME or UC)")
+        self.logger = logger
+        self.browsers = browsers
+        self.tabs_per_browser = tabs_per_browser
+        self.browser = browser
+        self.headless = headless
+        self.block_profile = block_profile
+        self.page_load_timeout = page_load_timeout
+        self.parse_executor = parse_executor
+        self.done = 0
+        self.failed = 0
+        self.started = 0
+
+    @abstractmethod
+    async def scrape(self, tab, item) -> dict:
+        pass
+
+    async def on_result(self, item, result):
+        """Called on the event loop for every successful scrape."""
+
+    async def on_error(self, item, error):
+        self.logger.warning(f"Scrape failed for {item}: {error}")
+
+    # ---------------------- helpers for scrape() ----------------------
+    async def snapshot(self, tab, url):
+        """Same dict as BaseScraper.take_snapshot, so parse_snapshot() functions can be reused."""
+        return {"url": url, "title": await tab.title(), "html": await tab.html()}
+
+    async def parse_in_pool(self, fn, snapshot):
+        """Run a picklable parse function in the shared process pool without blocking the loop."""
+        executor = self.parse_executor or get_parse_executor()
+        future = executor.submit(fn, snapshot)
+        return await trio.to_thread.run_sync(future.result)
+
+    # ---------------------- engine ----------------------
+    def _launch(self):
+        return create_driver(self.browser, headless=self.headless, block_profile=self.block_profile,
+                             page_load_timeout=self.page_load_timeout)
+
+    async def _tab_worker(self, conn, devtools, receive, name):
+        async with receive:
+            tab = await Tab.open(conn, devtools, name, self.block_profile)
+            try:
+                async for item in receive:
+                    try:
+                        result = await self.scrape(tab, item)
+                    except cdp.CdpConnectionClosed:
+                        raise
+                    except Exception as e:
+                        self.failed += 1
+                        await self.on_error(item, e)
+                        await tab.close()
+                        tab = await Tab.open(conn, devtools, name, self.block_profile)
+                        continue
+                    self.done += 1
+                    await self.on_result(item, result)
+            finally:
+                with trio.CancelScope(shield=True):
+                    await tab.close()
+
+    async def _run_browser(self, n, receive):
+        async with receive:
+            try:
+                driver = await trio.to_thread.run_sync(self._launch)
+            except Exception as e:
+                self.logger.error(f"Browser {n} failed to start: {e}")
+                return
+            self.started += 1
+            try:
+                version, ws_url = await trio.to_thread.run_sync(cdp_endpoint, driver)
+                devtools = cdp.import_devtools(version)
+                self.logger.info(f"Browser {n}: Chrome {version}, {self.tabs_per_browser} tabs")
+                async with cdp.open_cdp(ws_url) as conn:
+                    async with trio.open_nursery() as nursery:
+                        for t in range(self.tabs_per_browser):
+                            nursery.start_soon(self._tab_worker, conn, devtools, receive.clone(), f"B{n}T{t}")
+            finally:
+                with trio.CancelScope(shield=True):
+                    await trio.to_thread.run_sync(driver.quit)
+
+    async def run(self, items):
+        """Scrape every item; returns (done, failed)."""
+        send, receive = trio.open_memory_channel(self.browsers * self.tabs_per_browser)
+        started = time.monotonic()
+        async with trio.open_nursery() as nursery:
+            for n in range(self.browsers):
+                nursery.start_soon(self._run_browser, n, receive.clone())
+            await receive.aclose()
+            async with send:
+                try:
+                    for item in items:
+                        await send.send(item)
+                except trio.BrokenResourceError:
+                    self.logger.error("Every browser has stopped; remaining items were not scraped")
+        if not self.started:
+            raise RuntimeError("No browser could be started")
+        elapsed = time.monotonic() - started
+        self.logger.info(f"Async scrape finished: {self.done} done, {self.failed} failed in {elapsed:.0f}s "
+                         f"({self.browsers} browsers x {self.tabs_per_browser} tabs)")
+        return self.done, self.failed
+
+    def run_sync(self, items):
+        return trio.run(partial(self.run, items))
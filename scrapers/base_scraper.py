@@ -1,10 +1,79 @@
+import threading
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+
+LIVE = "live"
+SNAPSHOT = "snapshot"
+
+_parse_executor = None
+_parse_executor_lock = threading.Lock()
+
+
+def get_parse_executor(max_workers=None):
+    """Process pool shared by every snapshot-mode scraper in this process."""
+    global _parse_executor
+    with _parse_executor_lock:
+        if _parse_executor is None:
+            _parse_executor = ProcessPoolExecutor(max_workers=max_workers)
+        return _parse_executor
+
+
+def shutdown_parse_executor():
+    global _parse_executor
+    with _parse_executor_lock:
+        if _parse_executor is not None:
+            _parse_executor.shutdown(wait=True)
+            _parse_executor = None
+
 
 class BaseScraper(ABC):
-    def __init__(self, driver, logger):
+    """
+    mode="live":      scrape() reads every field through the live driver.
+    mode="snapshot":  the browser only navigates/interacts. Once the page settles a single
+                      page_source snapshot is taken, the driver goes back to `pool`
+                      (a helpers.driver_pool.DriverPool, optional) and parse_snapshot()
+                      runs in a separate process, off the threads that hold browsers.
+    """
+
+    def __init__(self, driver, logger, mode=LIVE, pool=None, parse_executor=None):
         self.driver = driver
         self.logger = logger
+        self.mode = mode
+        self.pool = pool
+        self.parse_executor = parse_executor
 
     @abstractmethod
     def scrape(self, url: str) -> dict:
         pass
+
+    # ---------------------- snapshot mode ----------------------
+    def load(self, driver, url):
+        """Navigate and wait until the page is ready to snapshot. Override per site."""
+        driver.get(url)
+
+    def take_snapshot(self, driver, url) -> dict:
+        return {"url": url, "title": driver.title, "html": driver.page_source}
+
+    @staticmethod
+    @abstractmethod
+    def parse_snapshot(snapshot: dict) -> dict:
+        """Pure function of the snapshot; runs in a worker process, so no driver access."""
+
+    def submit(self, url):
+        """Load + snapshot on this thread, parse in the process pool. Returns a Future."""
+        driver = self.pool.acquire() if self.pool else self.driver
+        failed = False
+        try:
+            self.load(driver, url)
+            snapshot = self.take_snapshot(driver, url)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            if self.pool:
+                self.pool.release(driver, failed=failed)
+        executor = self.parse_executor or get_parse_executor()
+        return executor.submit(type(self).parse_snapshot, snapshot)
+
+    def scrape_snapshot(self, url) -> dict:
+        return self.submit(url).result()
@@ -1,11 +1,11 @@
 import os
+import re
 import csv
 import time
 import random
 import warnings
 from datetime import datetime
 
-import pandas as pd
 import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -13,6 +13,21 @@ from selenium.webdriver.support import expected_conditions as EC
 
 from db_insert import insert_scraped_data
 from parser import normalize_records
+from utils.db_writer import BatchedWriter, on_all_written
+from utils.task_reader import read_tasks
+from utils.resume_ledger import ResumeLedger, variant_key, DEFAULT_LEDGER_PATH
+from utils.change_detection import FingerprintStore, DEFAULT_FINGERPRINT_PATH, UNCHANGED, fingerprint, squash
+from utils.variant_planner import group_by_url
+from utils.prices import PRICE_PATTERN
+from utils import rate_limiter
+from utils import metrics
+from utils import html_parsing
+from utils.rate_limiter import limiter_for, page_looks_blocked, BLOCKED
+from helpers.waits import wait_for, document_ready
+from helpers.request_blocking import page_report, reset_report, format_report, totals_summary
+from helpers.webdriver_manager import create_driver, UC
+from helpers.browser_watchdog import BrowserWatchdog
+from scrapers.anb_http import fetch, BlockedError
 
 # =====================================================
 # CONFIG
@@ -25,8 +40,26 @@ OUTPUT_DIR = "diamondheaven_competitor_products"
 LOG_FILE = os.path.join(OUTPUT_DIR, "scraper_log.txt")
 FAIL_CSV = os.path.join(OUTPUT_DIR, "failed_rows.csv")
 
+INPUT_COLUMNS = ("product_url", "shape", "carat", "clarity", "cut")
+VARIANT_COLUMNS = ("shape", "carat", "clarity", "cut")
+LEDGER_PATH = DEFAULT_LEDGER_PATH
+RUN_ID = None  # resume scope; None = one shared scope; a new id (e.g. a date) scrapes everything again
+# Change detection: #price-block fetched over HTTP; unchanged variants re-emit their last
+# records instead of driving the configurator, with a full refresh every N days
+CHANGE_DETECTION = True
+FINGERPRINT_PATH = DEFAULT_FINGERPRINT_PATH
+FULL_REFRESH_DAYS = 7
+
 PAGE_TIMEOUT = 120
 MAX_RETRIES = 3
+BLOCK_PROFILE = "diamond_heaven"
+HEADLESS = None  # None = SCRAPER_HEADLESS env var
+INC_VAT_RE = re.compile(rf"({PRICE_PATTERN})\s*inc\.?\s*VAT", re.I)
+BROWSER_MAX_RSS_MB = 1500       # restart the browser between URLs past this (helpers.browser_watchdog)
+BROWSER_MAX_CPU_PERCENT = 90
+NAV_LIMITS = {"rate": 0.3, "burst": 1, "concurrency": 1, "max_concurrency": 1, "block_cooldown": 120.0}
+METRICS_PROM_PATH = os.path.join(OUTPUT_DIR, "metrics.prom")  # per-step timings (utils.metrics)
+METRICS_JSONL_PATH = metrics.DEFAULT_JSONL_PATH
 
 DB_CONFIG = {
     "dbname": "competitor_products",
@@ -49,6 +82,68 @@ def log(msg):
         f.write(line + "\n")
 
 
+_db_writer = None
+
+def get_db_writer():
+    """Background writer that hands insert_scraped_data a whole batch instead of one row."""
+    global _db_writer
+    if _db_writer is None:
+        _db_writer = BatchedWriter(
+            lambda rows: insert_scraped_data(rows, SOURCE_WEBSITE, DB_CONFIG),
+            batch_size=50, flush_interval=10.0,
+            dead_letter_path=os.path.join(OUTPUT_DIR, "failed_inserts.jsonl"), site=SOURCE_WEBSITE,
+        )
+    return _db_writer
+
+def close_db_writer():
+    global _db_writer
+    if _db_writer is not None:
+        _db_writer.close()
+        log(f"💾 DB rows written: {_db_writer.written}, failed: {_db_writer.failed}")
+        _db_writer = None
+
+
+_fingerprints = None
+
+def get_fingerprints():
+    global _fingerprints
+    if _fingerprints is None:
+        _fingerprints = FingerprintStore(FINGERPRINT_PATH, refresh_days=FULL_REFRESH_DAYS)
+    return _fingerprints
+
+def close_fingerprints():
+    global _fingerprints
+    if _fingerprints is not None:
+        log(f"🔎 {_fingerprints.summary()}")
+        _fingerprints.close()
+        _fingerprints = None
+
+
+_probe_blocked = False
+
+def price_fingerprint(url):
+    """
+    Fingerprint of the #price-block text as served over plain HTTP (None if absent or blocked).
+    The site challenges plain HTTP clients, so a block is not reported to the navigation
+    limiter (it would pause the browser too) and turns the probe off for the rest of the run.
+    """
+    global _probe_blocked
+    if _probe_blocked:
+        return None
+    try:
+        html = fetch(url, report_blocks=False)
+    except BlockedError as e:
+        _probe_blocked = True
+        log(f"🧱 Change probe blocked ({e}); change detection off for this run")
+        return None
+    except Exception as e:
+        log(f"⚠️ Change probe failed for {url}: {e}")
+        return None
+    block = html_parsing.parse(html).select_one("#price-block")
+    text = squash(block.text(" ")) if block else ""
+    return fingerprint(text) if text else None
+
+
 def log_fail(row, reason):
     exists = os.path.exists(FAIL_CSV)
     with open(FAIL_CSV, "a", newline="", encoding="utf-8") as f:
@@ -59,12 +154,19 @@ def log_fail(row, reason):
         writer.writerow(row)
 
 def start_driver():
-    opts = uc.ChromeOptions()
-    opts.add_argument("--disable-blink-features=AutomationControlled")
-    opts.add_argument("--window-size=1920,1080")
-    driver = uc.Chrome(options=opts, version_main=141)
-    driver.set_page_load_timeout(PAGE_TIMEOUT)
-    return driver
+    return create_driver(UC, headless=HEADLESS, block_profile=BLOCK_PROFILE,
+                         page_load_timeout=PAGE_TIMEOUT, uc_version_main=141, request_report=True)
+
+watchdog = BrowserWatchdog(BROWSER_MAX_RSS_MB, BROWSER_MAX_CPU_PERCENT)
+
+def recycle_if_needed(driver, page):
+    """Between URLs: a fresh browser when the watchdog says this one has grown too big or busy."""
+    if watchdog.check(driver, "dh") is None:
+        return driver
+    watchdog.forget(driver)
+    driver.quit()
+    page.clear()
+    return start_driver()
 
 def accept_cookies(driver):
     try:
@@ -130,9 +232,9 @@ def extract_price(driver):
 
     out["list_price"] = safe(".special_price")
 
-    raw = block.text
-    if "inc VAT" in raw:
-        out["final_price_inc_vat"] = raw.split("inc VAT")[0].split("£")[-1].strip()
+    m = INC_VAT_RE.search(block.text.replace("\xa0", " "))
+    if m:
+        out["final_price_inc_vat"] = m.group(1).lstrip("£$€").strip()
 
     try:
         out["high_street_price"] = block.find_element(
@@ -151,18 +253,36 @@ def extract_price(driver):
     return out
 
 
-def process_row(driver, row):
-    driver.get(row["product_url"])
-    time.sleep(2)
+def load_page(driver, url):
+    reset_report(driver)
+    with limiter_for(url).slot() as nav:
+        driver.get(url)
+        wait_for(driver, document_ready, timeout=10)
+        if page_looks_blocked(driver):
+            nav.outcome = BLOCKED
+            raise RuntimeError("Block page served")
+    log(f"🧯 {format_report(page_report(driver))}")
     accept_cookies(driver)
 
-    select_shape(driver, row["shape"])
-    set_carat(driver, row["carat"])
-    select_clarity(driver, row["clarity"])
-    select_cut(driver, row["cut"])
 
-    summary = extract_summary(driver)
-    price = extract_price(driver)
+def process_row(driver, row, reload=True, on_written=None):
+    """
+    reload=False re-runs the selections on the already loaded configurator page.
+    on_written(ok) runs once every record of the row is inserted (or dead-lettered).
+    """
+    if reload:
+        with metrics.span(SOURCE_WEBSITE, "navigate"):
+            load_page(driver, row["product_url"])
+
+    with metrics.span(SOURCE_WEBSITE, "select_options"):
+        select_shape(driver, row["shape"])
+        set_carat(driver, row["carat"])
+        select_clarity(driver, row["clarity"])
+        select_cut(driver, row["cut"])
+
+    with metrics.span(SOURCE_WEBSITE, "extract"):
+        summary = extract_summary(driver)
+        price = extract_price(driver)
 
     record = {
         **row,
@@ -172,29 +292,137 @@ def process_row(driver, row):
     }
 
     normalized = normalize_records([record], source_website=SOURCE_WEBSITE)
-    insert_scraped_data(normalized, SOURCE_WEBSITE, DB_CONFIG)
+    writer = get_db_writer()
+    done = on_all_written(len(normalized), on_written) if on_written else None
+    for rec in normalized:
+        writer.write(rec, done)
+    return normalized
+
+def ledger_recorder(ledger, task, key, status):
+    """on_written for a variant's records: `status` once they are all inserted, else 'error'."""
+    return lambda ok: ledger.record(SOURCE_WEBSITE, task.product_url, key, status if ok else "error")
+
+def probe_unchanged(task, key, page, on_written=None):
+    """
+    Returns (status, fingerprint): UNCHANGED when the stored records were written again,
+    else None. The fingerprint of the last probed URL is kept in `page`.
+    """
+    if not CHANGE_DETECTION:
+        return None, None
+    if page.get("probe_url") != task.product_url:
+        with metrics.span(SOURCE_WEBSITE, "change_probe"):
+            page["probe_url"], page["probe_fp"] = task.product_url, price_fingerprint(task.product_url)
+    fp = page["probe_fp"]
+    if not fp:
+        return None, None
+    previous = get_fingerprints().lookup(SOURCE_WEBSITE, task.product_url, key, fp)
+    if previous is None:
+        return None, fp
+    writer = get_db_writer()
+    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    done = on_all_written(len(previous), on_written) if on_written else None
+    for rec in previous:
+        writer.write({**rec, "updated_date": now} if "updated_date" in rec else rec, done)
+    log(f"💤 Row {task.idx+1} unchanged since last full scrape, skipped")
+    return UNCHANGED, fp
+
+def run_task(driver, task, ledger, page=None):
+    """
+    Scrape one task with retries; returns 'success', 'unchanged', 'error' or 'skipped' (ledger hit).
+    `page` remembers which URL is loaded: a variant of the same URL is selected in place,
+    and the page is only reloaded for a new URL or after a failed attempt.
+    """
+    page = {} if page is None else page
+    key = variant_key(task, VARIANT_COLUMNS)
+    if ledger.is_done(SOURCE_WEBSITE, task.product_url, key):
+        return "skipped"
+    # The DB writer records success/unchanged once the records are inserted
+    status, fp = probe_unchanged(task, key, page, ledger_recorder(ledger, task, key, UNCHANGED))
+    if status == UNCHANGED:
+        return UNCHANGED
+    payload = task.to_dict()
+    error = ""
+    started = time.monotonic()
+    for attempt in range(1, MAX_RETRIES + 1):
+        in_place = page.get("url") == task.product_url
+        try:
+            log(f"▶ Row {task.idx+1} | Attempt {attempt}{' | same page' if in_place else ''}")
+            page.pop("url", None)
+            records = process_row(driver, payload, reload=not in_place,
+                                  on_written=ledger_recorder(ledger, task, key, "success"))
+            page["url"] = task.product_url
+            if fp:  # no fingerprint without CHANGE_DETECTION (or after a blocked probe)
+                get_fingerprints().store(SOURCE_WEBSITE, task.product_url, key, fp, records)
+            metrics.observe(SOURCE_WEBSITE, "variant", metrics.OK, time.monotonic() - started)
+            return "success"
+        except Exception as e:
+            error = str(e)
+            log(f"⚠️ Retry {attempt} failed: {e}")
+    log_fail(payload, error)
+    metrics.observe(SOURCE_WEBSITE, "variant", metrics.ERROR, time.monotonic() - started)
+    ledger.record(SOURCE_WEBSITE, task.product_url, key, "error")
+    return "error"
+
+
+class ShardWorker:
+    """Per-process worker for utils.sharded_runner: one browser per process, own fail file."""
+    threads = 1
+
+    def __init__(self, shard, shards, run_id=None):
+        global FAIL_CSV, METRICS_PROM_PATH
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        FAIL_CSV = os.path.join(OUTPUT_DIR, f"failed_rows_shard{shard:02d}.csv")
+        METRICS_PROM_PATH = os.path.join(OUTPUT_DIR, f"metrics_shard{shard:02d}.prom")
+        rate_limiter.configure(**NAV_LIMITS)
+        self.shard = shard
+        self.ledger = ResumeLedger(LEDGER_PATH, run_id or RUN_ID)
+        self.driver = start_driver()
+        self.page = {}
+
+    def handle(self, task):
+        if self.page.get("url") != task.product_url:
+            self.driver = recycle_if_needed(self.driver, self.page)
+        status = run_task(self.driver, task, self.ledger, self.page)
+        return "success" if status == "skipped" else status
+
+    def close(self):
+        try:
+            self.driver.quit()
+        finally:
+            close_db_writer()
+            close_fingerprints()
+            self.ledger.close()
+            metrics.export(METRICS_PROM_PATH, METRICS_JSONL_PATH, labels={"shard": self.shard})
 
 #main
 def main():
     os.makedirs(OUTPUT_DIR, exist_ok=True)
-    df = pd.read_csv(INPUT_CSV)
+    tasks = read_tasks(INPUT_CSV, required=INPUT_COLUMNS)
+    ledger = ResumeLedger(LEDGER_PATH, RUN_ID)
+    log(f"🔁 Resume ledger {f' (run {ledger.run_id})' if ledger.run_id else ''}: {ledger.done_count(SOURCE_WEBSITE)} variants already done (skipping)")
+    rate_limiter.configure(**NAV_LIMITS)
 
     driver = start_driver()
 
+    page = {}
     try:
-        for idx, row in df.iterrows():
-            payload = row.to_dict()
-            for attempt in range(1, MAX_RETRIES + 1):
-                try:
-                    log(f"▶ Row {idx+1} | Attempt {attempt}")
-                    process_row(driver, payload)
-                    break
-                except Exception as e:
-                    log(f"⚠️ Retry {attempt} failed: {e}")
-                    if attempt == MAX_RETRIES:
-                        log_fail(payload, str(e))
+        # Variants of one URL run back to back on the loaded page
+        for group in group_by_url(tasks):
+            driver = recycle_if_needed(driver, page)
+            for task in group.tasks:
+                run_task(driver, task, ledger, page)
     finally:
         driver.quit()
+        close_db_writer()
+        close_fingerprints()
+        ledger.close()
+        for line in rate_limiter.summaries():
+            log(f"🚦 {line}")
+        log(f"🧯 Request blocking: {totals_summary()}")
+        log(f"🐏 {watchdog.summary()}")
+        metrics.export(METRICS_PROM_PATH, METRICS_JSONL_PATH)
+        for line in metrics.summaries():
+            log(f"⏱️ {line}")
 
     log("✅ Diamond Heaven scrape completed")
 
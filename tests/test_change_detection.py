@@ -0,0 +1,35 @@
+from utils.change_detection import FingerprintStore, fingerprint, squash
+
+
+def test_squash_ignores_whitespace_and_nbsp():
+    assert squash("  £1,200\n\t<b>\xa0inc VAT</b> ") == "£1,200 <b> inc VAT</b>"
+    assert squash(None) == ""
+
+
+def test_fingerprint_ignores_dict_key_order_but_not_values():
+    a = fingerprint({"price": "1200", "sku": "R1"}, "18K White Gold")
+    assert a == fingerprint({"sku": "R1", "price": "1200"}, "18K White Gold")
+    assert a != fingerprint({"sku": "R1", "price": "1250"}, "18K White Gold")
+    assert a != fingerprint({"price": "1200", "sku": "R1"}, "Platinum")
+
+
+def test_lookup_returns_stored_row_only_for_matching_fingerprint(tmp_path):
+    store = FingerprintStore(str(tmp_path / "fp.sqlite3"))
+    row = {"url": "https://a", "price": 1200}
+    store.store("anb", "https://a", "gold", "fp1", row)
+
+    assert store.lookup("anb", "https://a", "gold", "fp1") == row
+    assert store.lookup("anb", "https://a", "gold", "fp2") is None
+    assert store.lookup("anb", "https://a", "platinum", "fp1") is None
+    assert (store.unchanged, store.changed) == (1, 2)
+    store.close()
+
+
+def test_due_refresh_and_empty_fingerprint_miss(tmp_path):
+    store = FingerprintStore(str(tmp_path / "fp.sqlite3"), refresh_days=0)
+    store.store("anb", "https://a", "gold", "fp1", {"price": 1})
+    assert store.lookup("anb", "https://a", "gold", "fp1") is None
+
+    store.store("anb", "https://b", "gold", "", {"price": 1})
+    assert store.lookup("anb", "https://b", "gold", "") is None
+    store.close()
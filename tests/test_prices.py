@@ -0,0 +1,38 @@
+import math
+
+import pytest
+
+from utils.prices import normalize_prices
+
+
+def amounts(*texts):
+    return list(normalize_prices(list(texts))["amount"])
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("£1,234.56 inc VAT", 1234.56),
+    ("from €1.234,50", 1234.50),
+    ("1 234,56 €", 1234.56),        # ordinary space, decimal comma
+    ("€1\u00a0234,56", 1234.56),    # NBSP
+    ("€1\u202f234", 1234.0),        # narrow no-break space
+    ("€12 345 678,90", 12345678.90),
+    ("12,50 €", 12.50),
+    ("£1,234,567.89", 1234567.89),
+    ("Size 12 £1,200", 1200.0),
+])
+def test_separators(text, expected):
+    assert amounts(text) == [pytest.approx(expected)]
+
+
+def test_ordinary_space_without_decimal_comma_does_not_group():
+    assert amounts("£950 100 reviews") == [950.0]
+
+
+@pytest.mark.parametrize("text", ["$1,234.567", "1,234.567", "€1.234,567"])
+def test_three_trailing_decimals_are_rejected(text):
+    assert math.isnan(amounts(text)[0])
+
+
+def test_range():
+    out = normalize_prices(["£900 - £1,100"]).iloc[0]
+    assert (out["amount"], out["amount_max"], out["currency"]) == (900.0, 1100.0, "GBP")
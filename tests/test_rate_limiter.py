@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from utils import rate_limiter
+from utils.rate_limiter import BLOCKED, OK, SLOW, TIMEOUT, DomainLimiter, limiter_for
+
+
+def limiter(**limits):
+    return DomainLimiter("example.com", **{"rate": 1.0, "concurrency": 2, "burst": 4, **limits})
+
+
+def test_fast_success_grows_limit_and_rate_additively():
+    lim = limiter()
+    lim.acquire()
+    assert lim.release(1.0) == OK
+    assert lim.limit == pytest.approx(2.5)
+    assert lim.rate == pytest.approx(1.05)
+    assert lim.in_flight == 0
+
+
+def test_growth_is_capped():
+    lim = limiter(concurrency=4, max_concurrency=4, rate=2.0, max_rate=2.0)
+    lim.acquire()
+    lim.release(1.0)
+    assert (lim.limit, lim.rate) == (4, 2.0)
+
+
+def test_slow_page_shrinks_limit_only():
+    lim = limiter(concurrency=4)
+    lim.acquire()
+    assert lim.release(30.0) == SLOW
+    assert (lim.limit, lim.rate) == (3.0, 1.0)
+    assert lim.stats[SLOW] == 1
+
+
+def test_timeout_halves_limit_and_rate_down_to_the_floor():
+    lim = limiter(concurrency=4, min_rate=0.4)
+    for expected_limit, expected_rate in [(2.0, 0.5), (1.0, 0.4), (1.0, 0.4)]:
+        lim.acquire()
+        lim.release(1.0, TIMEOUT)
+        assert (lim.limit, lim.rate) == (expected_limit, expected_rate)
+
+
+def test_block_page_halves_and_pauses_the_domain():
+    lim = limiter(block_cooldown=60)
+    lim.acquire()
+    lim.release(1.0, BLOCKED)
+    assert (lim.limit, lim.rate) == (1.0, 0.5)
+    assert lim._tokens == 0
+    assert lim._paused_until > time.monotonic() + 59
+
+
+def test_slot_counts_timeout_exceptions():
+    class ReadTimeout(Exception):
+        pass
+
+    lim = limiter()
+    with pytest.raises(ReadTimeout):
+        with lim.slot():
+            raise ReadTimeout()
+    assert lim.stats[TIMEOUT] == 1
+    assert lim.in_flight == 0
+
+
+def test_configure_applies_to_new_domains(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_limiters", {})
+    monkeypatch.setattr(rate_limiter, "_defaults", dict(rate_limiter.DEFAULT_LIMITS))
+    rate_limiter.configure(concurrency=3)
+    first = limiter_for("https://www.example.com/a")
+    assert first is limiter_for("https://example.com/b")
+    assert first.limit == 3
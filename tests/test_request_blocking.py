@@ -0,0 +1,16 @@
+from helpers.request_blocking import blocked_patterns, is_blocked, network_patterns
+
+
+def test_allow_glob_wins_over_block_patterns():
+    assert is_blocked("https://shop.example.com/hero.png", "diamond_heaven")
+    assert not is_blocked("https://cdn.v12finance.com/widget/logo.png", "diamond_heaven")
+    assert not is_blocked("https://apply.v12retailfinance.com/fonts/v12.woff2", "diamond_heaven")
+
+
+def test_unlisted_urls_load():
+    assert not is_blocked("https://shop.example.com/app.js", "diamond_heaven")
+
+
+def test_allow_list_profiles_skip_set_blocked_urls():
+    assert network_patterns("diamond_heaven") == []
+    assert network_patterns("anb") == blocked_patterns("anb") != []
@@ -0,0 +1,51 @@
+import csv
+import json
+
+from utils.result_sink import CsvResultSink
+
+
+def read(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        rows = list(csv.reader(f))
+    return rows[0], rows[1:]
+
+
+def test_old_header_is_widened_and_rows_kept(tmp_path, capsys):
+    path = tmp_path / "out.csv"
+    path.write_text("url,price\nhttps://a,100\n", encoding="utf-8")
+
+    sink = CsvResultSink(str(path), ["url", "price", "status"])
+    sink.write({"url": "https://b", "price": "200", "status": "ok", "summary_vat": "40"})
+    sink.close()
+
+    assert "rewriting its header" in capsys.readouterr().out
+    header, rows = read(path)
+    assert header == ["url", "price", "status", "extra_fields"]
+    assert rows[0] == ["https://a", "100", "", ""]
+    assert rows[1][:3] == ["https://b", "200", "ok"]
+    assert json.loads(rows[1][3]) == {"summary_vat": "40"}
+    assert not (tmp_path / "out.csv.tmp").exists()
+
+
+def test_reopening_a_widened_file_appends_without_rewriting(tmp_path, capsys):
+    path = tmp_path / "out.csv"
+    path.write_text("price,url\n100,https://a\n", encoding="utf-8")
+    CsvResultSink(str(path), ["url", "price"]).close()
+    capsys.readouterr()
+
+    sink = CsvResultSink(str(path), ["url", "price"])
+    sink.write({"url": "https://b", "price": "200"})
+    sink.close()
+
+    assert "rewriting" not in capsys.readouterr().out
+    header, rows = read(path)
+    assert header == ["price", "url", "extra_fields"]
+    assert rows == [["100", "https://a", ""], ["200", "https://b", ""]]
+
+
+def test_new_file_gets_full_header(tmp_path):
+    path = tmp_path / "out.csv"
+    sink = CsvResultSink(str(path), ["url", "price"])
+    sink.write({"url": "https://a", "price": "1"})
+    sink.close()
+    assert read(path) == (["url", "price", "extra_fields"], [["https://a", "1", ""]])
@@ -0,0 +1,114 @@
+"""
+Skip variants whose price-bearing data has not changed since the last full scrape.
+
+A site-specific probe fingerprints cheap, price-bearing data (A&B: the data-ga-cart-data
+payload, PDP prices and variant grid from a plain HTTP fetch; Diamond Heaven: the
+#price-block text). FingerprintStore keeps, per (site, url, variant_key), the fingerprint
+and the row written by the last full scrape:
+
+    previous = store.lookup(site, url, key, fp)
+    if previous is not None:
+        ...re-emit `previous` with status "unchanged", skip the browser flow...
+    else:
+        row = full_scrape(...)
+        store.store(site, url, key, fp, row)
+
+lookup() only returns the stored row when the fingerprint matches *and* the last full
+scrape is less than `refresh_days` old, so every variant is fully refreshed at least
+every N days even if the probe never sees a change. Probes look at the page as served
+for the product URL, not at each configured variant, which is what the periodic
+refresh covers.
+"""
+import json
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime, timedelta
+
+DEFAULT_FINGERPRINT_PATH = "fingerprints.sqlite3"
+FULL_REFRESH_DAYS = 7
+UNCHANGED = "unchanged"
+
+_TS = "%Y-%m-%d %H:%M:%S"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    site         TEXT NOT NULL,
+    url          TEXT NOT NULL,
+    variant_key  TEXT NOT NULL,
+    fingerprint  TEXT NOT NULL,
+    payload      TEXT NOT NULL,
+    refreshed_at TEXT NOT NULL,
+    checked_at   TEXT NOT NULL,
+    PRIMARY KEY (site, url, variant_key)
+);
+"""
+
+
+def squash(text):
+    """Whitespace-insensitive form of scraped text, so re-indented markup does not count as a change."""
+    return " ".join((text or "").replace("\xa0", " ").split())
+
+
+def fingerprint(*parts):
+    """Stable digest of JSON-serialisable parts (dict key order does not matter)."""
+    blob = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(blob.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class FingerprintStore:
+    """SQLite table of last-seen fingerprints and the rows they produced; safe to share between threads."""
+
+    def __init__(self, path=DEFAULT_FINGERPRINT_PATH, refresh_days=FULL_REFRESH_DAYS):
+        self.path = path
+        self.refresh_days = refresh_days
+        self.unchanged = self.changed = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def lookup(self, site, url, key, fp):
+        """The row stored for this variant if `fp` matches and the last full scrape is recent, else None."""
+        if not fp:
+            return None
+        now = datetime.now()
+        with self._lock:
+            found = self._conn.execute(
+                "SELECT fingerprint, payload, refreshed_at FROM fingerprints "
+                "WHERE site = ? AND url = ? AND variant_key = ?",
+                (site, url, key),
+            ).fetchone()
+            fresh = (found is not None and found[0] == fp
+                     and now - datetime.strptime(found[2], _TS) < timedelta(days=self.refresh_days))
+            if not fresh:
+                self.changed += 1
+                return None
+            self.unchanged += 1
+            self._conn.execute(
+                "UPDATE fingerprints SET checked_at = ? WHERE site = ? AND url = ? AND variant_key = ?",
+                (now.strftime(_TS), site, url, key),
+            )
+        return json.loads(found[1])
+
+    def store(self, site, url, key, fp, payload):
+        """Record the fingerprint and output of a successful full scrape."""
+        if not fp:
+            return
+        now = datetime.now().strftime(_TS)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fingerprints "
+                "(site, url, variant_key, fingerprint, payload, refreshed_at, checked_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (site, url, key, fp, json.dumps(payload, ensure_ascii=False, default=str), now, now),
+            )
+
+    def summary(self):
+        return (f"change detection: {self.unchanged} unchanged (skipped), {self.changed} changed/new/due, "
+                f"full refresh every {self.refresh_days} days")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,189 @@
+import json
+import queue
+import threading
+import time
+
+from psycopg2 import pool as pg_pool
+from psycopg2.extras import execute_values
+
+from utils.prices import price_amounts
+from utils import metrics
+
+# One connection pool per DB config, shared by every writer in the process
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+_STOP = object()
+
+
+def get_pool(db_config, minconn=1, maxconn=4):
+    key = tuple(sorted(db_config.items()))
+    with _POOLS_LOCK:
+        if key not in _POOLS:
+            _POOLS[key] = pg_pool.ThreadedConnectionPool(minconn, maxconn, **db_config)
+        return _POOLS[key]
+
+
+def close_pools():
+    with _POOLS_LOCK:
+        for p in _POOLS.values():
+            try:
+                p.closeall()
+            except Exception:
+                pass
+        _POOLS.clear()
+
+
+class PooledInserter:
+    """
+    Flush callable for BatchedWriter: inserts a batch of row dicts into `table`
+    with a single execute_values round trip on a pooled connection.
+    `converters` maps column -> function applied to the raw value.
+    `price_columns` are parsed to amounts for the whole batch at once (utils.prices).
+    """
+
+    def __init__(self, db_config, table, columns, converters=None, page_size=500, price_columns=()):
+        self.db_config = db_config
+        self.columns = list(columns)
+        self.converters = converters or {}
+        self.price_columns = tuple(price_columns)
+        self.page_size = page_size
+        self.query = f"INSERT INTO {table} ({', '.join(self.columns)}) VALUES %s"
+
+    def to_tuple(self, row):
+        values = []
+        for col in self.columns:
+            val = row.get(col, "")
+            conv = self.converters.get(col)
+            values.append(conv(val) if conv else val)
+        return tuple(values)
+
+    def __call__(self, rows):
+        if self.price_columns:
+            rows = price_amounts(rows, self.price_columns)
+        pool = get_pool(self.db_config)
+        conn = pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                execute_values(cur, self.query, [self.to_tuple(r) for r in rows], page_size=self.page_size)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            pool.putconn(conn)
+
+
+class BatchedWriter:
+    """
+    Buffers rows from any number of scraper threads and hands them to `flush(rows)`
+    from its own background thread, once `batch_size` rows are queued or
+    `flush_interval` seconds have passed. write() never touches the database.
+
+    A batch that still fails after `retries` attempts is appended to
+    `dead_letter_path` (JSONL) when set, so rows are not silently lost.
+    Each flush attempt is timed as the "db_write" step of `site` (utils.metrics).
+
+    write(row, on_written) calls on_written(True) from the writer thread once the row's
+    batch is flushed, or on_written(False) once it is dead-lettered; callers record a
+    row as done there rather than when it is queued.
+    """
+
+    def __init__(self, flush, batch_size=100, flush_interval=5.0, retries=2,
+                 dead_letter_path=None, name="db-writer", site="db"):
+        self.flush = flush
+        self.site = site
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.dead_letter_path = dead_letter_path
+        self.written = 0
+        self.failed = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def write(self, row, on_written=None):
+        self._queue.put((row, on_written))
+
+    def close(self, timeout=None):
+        """Flush whatever is buffered and stop the writer thread."""
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        batch = []
+        last_flush = time.monotonic()
+        while True:
+            wait = max(0.0, self.flush_interval - (time.monotonic() - last_flush))
+            try:
+                item = self._queue.get(timeout=wait)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self._flush(batch)
+                return
+            if item is not None:
+                batch.append(item)
+            due = time.monotonic() - last_flush >= self.flush_interval
+            if len(batch) >= self.batch_size or (due and batch):
+                self._flush(batch)
+                batch = []
+            if due or not batch:
+                last_flush = time.monotonic()
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        rows = [row for row, _ in batch]
+        for attempt in range(1, self.retries + 2):
+            try:
+                with metrics.span(self.site, "db_write"):
+                    self.flush(rows)
+                self.written += len(rows)
+                print(f"✅ DB writer: flushed {len(rows)} rows (total {self.written})")
+                self._notify(batch, True)
+                return
+            except Exception as e:
+                print(f"❌ DB writer: flush of {len(rows)} rows failed (attempt {attempt}): {e}")
+                time.sleep(min(5.0, attempt))
+        self.failed += len(rows)
+        if self.dead_letter_path:
+            try:
+                with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                    for row in rows:
+                        f.write(json.dumps(row, default=str) + "\n")
+                print(f"⚠️ DB writer: {len(rows)} rows saved to {self.dead_letter_path}")
+            except Exception as e:
+                print(f"❌ DB writer: could not write dead letters: {e}")
+        self._notify(batch, False)
+
+    @staticmethod
+    def _notify(batch, ok):
+        for _, on_written in batch:
+            if on_written is not None:
+                try:
+                    on_written(ok)
+                except Exception as e:
+                    print(f"❌ DB writer: on_written callback failed: {e}")
+
+
+def on_all_written(count, callback):
+    """
+    on_written for a group of `count` rows: callback(ok) runs once, after the last of them
+    is flushed or dead-lettered, with ok only if every row was flushed.
+    """
+    state = {"left": count, "ok": True}
+    lock = threading.Lock()
+
+    def on_written(ok):
+        with lock:
+            state["ok"] = state["ok"] and ok
+            state["left"] -= 1
+            if state["left"] != 0:
+                return
+        callback(state["ok"])
+
+    if count == 0:
+        callback(True)
+    return on_written
@@ -0,0 +1,216 @@
+"""
+One small DOM interface over three HTML parsers, so the extractors do not depend on bs4.
+
+    doc = parse(html)                        # best installed backend
+    doc = parse(html, backend=LXML)          # or SCRAPER_HTML_BACKEND=lxml
+    for li in doc.select("li[custom_field][namer]"):
+        li.get("namer"), li.classes, li.text(" ", strip=True)
+
+Backends, fastest first: SELECTOLAX (lexbor), LXML (lxml.html + cssselect) and HTML_PARSER
+(BeautifulSoup's pure-Python html.parser, always available). DEFAULT_BACKEND is the first
+one installed; SCRAPER_HTML_BACKEND overrides it.
+
+Text follows BeautifulSoup's get_text() on every backend: text nodes in document order,
+without comments or <script>/<style>/<template> content; strip=True drops whitespace-only
+strings and strips the rest. select()/select_one() only match descendants of the node
+(bs4 semantics), never the node itself. Parsers may keep or drop whitespace-only text around
+<html>/<body>, so compare text with strip=True or change_detection.squash(); valueless
+attributes (<input checked>) read as "" or as their own name, so test them for presence.
+"""
+import os
+from functools import lru_cache
+
+SELECTOLAX, LXML, HTML_PARSER = "selectolax", "lxml", "html.parser"
+BACKENDS = (SELECTOLAX, LXML, HTML_PARSER)
+
+_SKIP_TEXT = ("script", "style", "template")
+
+
+def _available():
+    found = []
+    try:
+        from selectolax.lexbor import LexborHTMLParser  # noqa: F401
+        found.append(SELECTOLAX)
+    except ImportError:
+        pass
+    try:
+        import lxml.html  # noqa: F401
+        import cssselect  # noqa: F401
+        found.append(LXML)
+    except ImportError:
+        pass
+    found.append(HTML_PARSER)
+    return tuple(found)
+
+
+AVAILABLE_BACKENDS = _available()
+DEFAULT_BACKEND = os.environ.get("SCRAPER_HTML_BACKEND", "").strip().lower() or AVAILABLE_BACKENDS[0]
+
+
+def resolve_backend(backend=None):
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown HTML backend {backend!r} (choose from {', '.join(BACKENDS)})")
+    if backend not in AVAILABLE_BACKENDS:
+        raise ImportError(f"HTML backend {backend!r} is not installed")
+    return backend
+
+
+def parse(html, backend=None):
+    """Parse a document or fragment; returns the root Node."""
+    backend = resolve_backend(backend)
+    html = html or ""
+    if backend == SELECTOLAX:
+        from selectolax.lexbor import LexborHTMLParser
+        return _LexborNode(LexborHTMLParser(html).root)
+    if backend == LXML:
+        import lxml.html
+        # document_fromstring rejects empty input; an empty document selects nothing either way
+        return _LxmlNode(lxml.html.document_fromstring(html if html.strip() else "<html></html>"))
+    from bs4 import BeautifulSoup
+    return _SoupNode(BeautifulSoup(html, "html.parser"))
+
+
+def _join(strings, sep, strip):
+    if strip:
+        return sep.join(s for s in (s.strip() for s in strings) if s)
+    return sep.join(strings)
+
+
+class Node:
+    """Backend-neutral element. Subclasses wrap one parser's element type."""
+    __slots__ = ("_el",)
+
+    def __init__(self, el):
+        self._el = el
+
+    def select(self, css):
+        raise NotImplementedError
+
+    def select_one(self, css):
+        found = self.select(css)
+        return found[0] if found else None
+
+    def get(self, name, default=None):
+        raise NotImplementedError
+
+    def __getitem__(self, name):
+        value = self.get(name)
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    @property
+    def classes(self):
+        return (self.get("class") or "").split()
+
+    def strings(self):
+        """Text nodes under this element, in document order."""
+        raise NotImplementedError
+
+    def text(self, sep="", strip=False):
+        return _join(self.strings(), sep, strip)
+
+    @property
+    def html(self):
+        """Outer HTML."""
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.html[:60]!r}>"
+
+
+class _LexborNode(Node):
+    __slots__ = ()
+
+    # lexbor's css() also matches the node itself; drop it to keep descendant-only semantics
+    def select(self, css):
+        own = self._el.mem_id
+        return [_LexborNode(n) for n in self._el.css(css) if n.mem_id != own]
+
+    def select_one(self, css):
+        n = self._el.css_first(css)
+        if n is not None and n.mem_id == self._el.mem_id:
+            found = self._el.css(css)
+            n = found[1] if len(found) > 1 else None
+        return _LexborNode(n) if n is not None else None
+
+    def get(self, name, default=None):
+        attrs = self._el.attributes
+        if name not in attrs:
+            return default
+        # Valueless attributes (<input checked>) come back as None
+        value = attrs[name]
+        return "" if value is None else value
+
+    def strings(self):
+        out = []
+        for n in self._el.traverse(include_text=True):
+            if n.tag == "-text" and (n.parent is None or n.parent.tag not in _SKIP_TEXT):
+                out.append(n.text_content)
+        return out
+
+    @property
+    def html(self):
+        return self._el.html or ""
+
+
+class _LxmlNode(Node):
+    __slots__ = ()
+
+    def select(self, css):
+        return [_LxmlNode(e) for e in _lxml_xpath(css)(self._el)]
+
+    def get(self, name, default=None):
+        return self._el.get(name, default)
+
+    def strings(self):
+        out = []
+        _lxml_strings(self._el, out)
+        return out
+
+    @property
+    def html(self):
+        import lxml.html
+        return lxml.html.tostring(self._el, encoding="unicode", with_tail=False)
+
+
+@lru_cache(maxsize=256)
+def _lxml_xpath(css):
+    from lxml import etree
+    from cssselect import HTMLTranslator
+    # descendant:: keeps bs4's semantics; cssselect's default also matches the node itself
+    return etree.XPath(HTMLTranslator().css_to_xpath(css, prefix="descendant::"))
+
+
+def _lxml_strings(el, out):
+    # Comments and processing instructions have a non-string tag; only their tail is text
+    if isinstance(el.tag, str) and el.tag not in _SKIP_TEXT and el.text:
+        out.append(el.text)
+    for child in el:
+        _lxml_strings(child, out)
+        if child.tail:
+            out.append(child.tail)
+
+
+class _SoupNode(Node):
+    __slots__ = ()
+
+    def select(self, css):
+        return [_SoupNode(t) for t in self._el.select(css)]
+
+    def select_one(self, css):
+        t = self._el.select_one(css)
+        return _SoupNode(t) if t is not None else None
+
+    def get(self, name, default=None):
+        value = self._el.get(name, default)
+        # bs4 splits multi-valued attributes (class, rel, ...) into lists
+        return " ".join(value) if isinstance(value, list) else value
+
+    def strings(self):
+        return list(self._el.strings)
+
+    @property
+    def html(self):
+        return str(self._el)
@@ -0,0 +1,187 @@
+"""
+Per-step timing spans with a duration histogram per (site, step, outcome).
+
+    from utils import metrics
+
+    with metrics.span("anb", "navigate") as sp:
+        ok = open_page()
+        if not ok:
+            sp.outcome = "error"
+
+    metrics.observe("anb", "product", "ok", 41.2)        # a duration measured elsewhere
+    metrics.export()                                     # Prometheus textfile + JSONL line per series
+
+A span's outcome is "ok" unless the block sets sp.outcome or raises (a *Timeout* exception
+counts as "timeout", anything else as "error"). One registry per process, shared by all
+threads. write_prometheus() rewrites a node_exporter textfile atomically; append_jsonl()
+appends one line per series with the run id, so runs can be compared over time. Processes
+that export side by side (utils.sharded_runner shards) pass labels={"shard": n}: the
+textfile collector rejects the same series appearing in two files.
+"""
+import os
+import json
+import time
+import uuid
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+OK, ERROR, TIMEOUT = "ok", "error", "timeout"
+
+# Seconds; spans range from sub-second JS reads to multi-minute retried navigations
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+
+DEFAULT_PROM_PATH = "scraper_metrics.prom"
+DEFAULT_JSONL_PATH = "scraper_metrics.jsonl"
+METRIC_NAME = "scraper_step_duration_seconds"
+
+RUN_ID = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last slot: above the largest bucket
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (the max for the overflow bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return BUCKETS[i] if i < len(BUCKETS) else self.max
+        return self.max
+
+
+class _Span:
+    __slots__ = ("outcome",)
+
+    def __init__(self):
+        self.outcome = None
+
+
+_series = {}  # (site, step, outcome) -> Histogram
+_lock = threading.Lock()
+
+
+def observe(site, step, outcome, seconds):
+    key = (str(site), str(step), str(outcome))
+    with _lock:
+        hist = _series.get(key)
+        if hist is None:
+            hist = _series[key] = Histogram()
+        hist.observe(max(0.0, float(seconds)))
+
+
+@contextmanager
+def span(site, step):
+    sp = _Span()
+    start = time.monotonic()
+    try:
+        yield sp
+    except BaseException as e:
+        if sp.outcome is None:
+            sp.outcome = TIMEOUT if "timeout" in type(e).__name__.lower() else ERROR
+        raise
+    finally:
+        observe(site, step, sp.outcome or OK, time.monotonic() - start)
+
+
+def timed(site, step):
+    """Decorator form of span() for a whole function."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(site, step):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def snapshot():
+    """{(site, step, outcome): Histogram copy}."""
+    with _lock:
+        out = {}
+        for key, hist in _series.items():
+            copy = Histogram()
+            copy.counts, copy.count, copy.sum, copy.max = list(hist.counts), hist.count, hist.sum, hist.max
+            out[key] = copy
+        return out
+
+
+def reset():
+    with _lock:
+        _series.clear()
+
+
+def _labels(site, step, outcome, **extra):
+    pairs = {"site": site, "step": step, "outcome": outcome, **extra}
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{k}="{esc(v)}"' for k, v in pairs.items())
+
+
+def write_prometheus(path=DEFAULT_PROM_PATH, labels=None):
+    """`labels` are added to every series (e.g. {"shard": 3})."""
+    labels = labels or {}
+    lines = [
+        f"# HELP {METRIC_NAME} Duration of scraper steps.",
+        f"# TYPE {METRIC_NAME} histogram",
+    ]
+    for (site, step, outcome), hist in sorted(snapshot().items()):
+        cumulative = 0
+        for bound, n in zip(BUCKETS, hist.counts):
+            cumulative += n
+            lines.append(f"{METRIC_NAME}_bucket{{{_labels(site, step, outcome, **labels, le=bound)}}} {cumulative}")
+        lines.append(f"{METRIC_NAME}_bucket{{{_labels(site, step, outcome, **labels, le='+Inf')}}} {hist.count}")
+        lines.append(f"{METRIC_NAME}_sum{{{_labels(site, step, outcome, **labels)}}} {hist.sum:.6f}")
+        lines.append(f"{METRIC_NAME}_count{{{_labels(site, step, outcome, **labels)}}} {hist.count}")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp, path)
+
+
+def append_jsonl(path=DEFAULT_JSONL_PATH, labels=None):
+    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with open(path, "a", encoding="utf-8") as f:
+        for (site, step, outcome), hist in sorted(snapshot().items()):
+            f.write(json.dumps({
+                "run_id": RUN_ID, "ts": ts, "pid": os.getpid(), **(labels or {}),
+                "site": site, "step": step, "outcome": outcome,
+                "count": hist.count, "sum": round(hist.sum, 3), "max": round(hist.max, 3),
+                "p50": hist.quantile(0.5), "p95": hist.quantile(0.95),
+                "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], hist.counts)),
+            }) + "\n")
+
+
+def export(prom_path=DEFAULT_PROM_PATH, jsonl_path=DEFAULT_JSONL_PATH, labels=None):
+    try:
+        if prom_path:
+            write_prometheus(prom_path, labels)
+        if jsonl_path:
+            append_jsonl(jsonl_path, labels)
+    except OSError as e:
+        print(f"⚠️ Metrics export failed: {e}")
+
+
+def summaries(top=10):
+    """The `top` series by total time, hottest first."""
+    ranked = sorted(snapshot().items(), key=lambda kv: kv[1].sum, reverse=True)[:top]
+    return [f"{site} {step} [{outcome}]: {h.count}x, total {h.sum:.0f}s, "
+            f"p50 ≤{h.quantile(0.5):g}s, p95 ≤{h.quantile(0.95):g}s, max {h.max:.1f}s"
+            for (site, step, outcome), h in ranked]
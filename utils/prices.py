@@ -0,0 +1,152 @@
+"""
+Vectorized price-string normalization.
+
+    normalize_prices(["£1,234.56 inc VAT", "from €1.234,50", "£900 - £1,100", "POA"])
+
+returns one row per input with:
+    amount      float   lower/only amount (NaN when no number)
+    amount_max  float   upper end of a range ("£900 - £1,100"), else NaN
+    currency    str     GBP / EUR / USD (or `default_currency`), None when unknown
+    vat         str     "inc" / "ex" / None
+    is_from     bool    "from £…", "starting at …", "as low as …"
+
+The batch is factorized first, so each distinct string is parsed once (historical
+exports repeat the same few thousand price strings millions of times), and the parsing
+itself is pandas string operations over the distinct values — pyarrow-backed when
+pyarrow is installed — broadcast back with a NumPy take. UK (1,234.56) and EU (1.234,56 /
+1 234,56 with a non-breaking or thin space) separators are both understood: a trailing
+separator followed by one or two digits is the decimal point, every other separator is a
+thousands separator. Thousands groups use one separator throughout; an ordinary space
+groups digits only in front of a decimal comma (1 234,56), so "£950 100 reviews" is 950.
+A number with three digits after its last separator that cannot be a thousands group
+("$1,234.567") is rejected (NaN) rather than cut short.
+"""
+import re
+import argparse
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    STRING_DTYPE = "string[pyarrow]"
+except ImportError:
+    STRING_DTYPE = "string"
+
+PRICE_PATTERN = r"(?:£|\$|€)\s?\d[\d,\.]*"
+PRICE_RE = re.compile(PRICE_PATTERN)
+
+CURRENCIES = {"£": "GBP", "gbp": "GBP", "€": "EUR", "eur": "EUR", "$": "USD", "usd": "USD"}
+
+_NUMBER = (r"(?<![\d.,])"
+           r"(?:\d{1,3}(?:,\d{3})+(?:\.\d{1,2})?"                       # 1,234.56
+           r"|\d{1,3}(?:\.\d{3})+(?:,\d{1,2})?"                         # 1.234,56
+           r"|\d{1,3}(?:[\u00a0\u202f\u2009]\d{3})+(?:[.,]\d{1,2})?"      # 1 234,56 (NBSP / thin space)
+           r"|\d{1,3}(?: \d{3})+,\d{1,2}"                                # 1 234,56 (space, decimal comma)
+           r"|\d+(?:[.,]\d{1,2})?)"
+           r"(?![.,]?\d)")
+_RANGE = rf"(?:\s*(?:-|–|to)\s*(?:£|€|\$|gbp|eur|usd)?\s*(?P<high>{_NUMBER}))?"
+# Prefer the number right after a currency sign ("Size 12 £1,200" -> 1200), else the first number
+_SYMBOL_AMOUNTS_RE = rf"(?:£|€|\$)\s?(?P<low>{_NUMBER}){_RANGE}"
+_AMOUNTS_RE = rf"(?P<low>{_NUMBER}){_RANGE}"
+_CURRENCY_RE = r"(£|€|\$|\bgbp\b|\beur\b|\busd\b)"
+_INC_VAT_RE = r"\b(?:inc|incl|including)\.?\s*vat\b"
+_EX_VAT_RE = r"\b(?:ex|excl|excluding)\.?\s*vat\b"
+_FROM_RE = r"\b(?:from|starting at|as low as)\b"
+
+
+def extract_prices(text):
+    """Currency-prefixed price tokens in `text`, in order (e.g. ['£1,234', '£999'])."""
+    return [m.strip() for m in PRICE_RE.findall((text or "").replace("\xa0", " "))]
+
+
+def _to_number(tokens):
+    """Vectorized '1.234,56' / '1,234.56' / '1\u00a0234' -> float (NaN for missing)."""
+    decimals = tokens.str.extract(r"[.,](\d{1,2})$", expand=False)
+    whole = tokens.str.replace(r"[.,]\d{1,2}$", "", regex=True).str.replace(r"[.,\s]", "", regex=True)
+    text = whole.str.cat(decimals, sep=".", na_rep="").str.rstrip(".")
+    return pd.to_numeric(text, errors="coerce").astype("float64")
+
+
+def normalize_prices(values, default_currency=None):
+    """Normalize a batch (list / array / Series) of raw price strings; see the module doc."""
+    index = values.index if isinstance(values, pd.Series) else None
+    s = pd.Series(values, index=index, dtype="object")
+    codes, uniques = pd.factorize(s.where(s.notna(), "").astype(str))
+    parsed = _normalize_distinct(pd.Series(uniques, dtype=STRING_DTYPE), default_currency)
+    out = parsed.take(codes)
+    out.index = s.index
+    return out
+
+
+def _normalize_distinct(s, default_currency):
+    s = s.str.strip()
+    low = s.str.lower()
+
+    amounts = low.str.extract(_SYMBOL_AMOUNTS_RE)
+    no_symbol = amounts["low"].isna()
+    if no_symbol.any():
+        amounts.loc[no_symbol] = low[no_symbol].str.extract(_AMOUNTS_RE)
+    currency = low.str.extract(_CURRENCY_RE, expand=False).map(CURRENCIES, na_action="ignore")
+    amount = _to_number(amounts["low"])
+    if default_currency:
+        currency = currency.where(currency.notna() | amount.isna(), default_currency)
+
+    vat = np.select(
+        [low.str.contains(_INC_VAT_RE, regex=True).fillna(False).to_numpy(bool),
+         low.str.contains(_EX_VAT_RE, regex=True).fillna(False).to_numpy(bool)],
+        ["inc", "ex"], default=None,
+    )
+    return pd.DataFrame({
+        "amount": amount,
+        "amount_max": _to_number(amounts["high"]),
+        "currency": currency.astype("object").where(currency.notna(), None),
+        "vat": vat,
+        "is_from": low.str.contains(_FROM_RE, regex=True).fillna(False).astype(bool),
+    }, index=s.index)
+
+
+def normalize_price_frame(df, columns, default_currency=None):
+    """Add <col>_amount, <col>_amount_max, <col>_currency, <col>_vat, <col>_is_from for each column."""
+    for col in columns:
+        norm = normalize_prices(df[col], default_currency=default_currency)
+        for field in norm.columns:
+            df[f"{col}_{field}"] = norm[field]
+    return df
+
+
+def price_amounts(rows, columns, default_currency=None):
+    """
+    Replace the raw price strings in `columns` of a batch of row dicts with float amounts
+    (None when unparseable). Used right before a DB batch insert.
+    """
+    if not rows:
+        return rows
+    out = [dict(r) for r in rows]
+    for col in columns:
+        amounts = normalize_prices([r.get(col) for r in rows], default_currency)["amount"]
+        for r, val in zip(out, amounts.to_numpy()):
+            r[col] = None if np.isnan(val) else float(val)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add normalized price columns to a CSV, in chunks.")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--columns", nargs="+", required=True, help="raw price columns to normalize")
+    parser.add_argument("--default-currency", default=None)
+    parser.add_argument("--chunksize", type=int, default=200_000)
+    args = parser.parse_args()
+
+    first = True
+    for chunk in pd.read_csv(args.input, dtype=str, keep_default_na=False, chunksize=args.chunksize,
+                             encoding="utf-8-sig"):
+        normalize_price_frame(chunk, args.columns, args.default_currency)
+        chunk.to_csv(args.output, mode="w" if first else "a", header=first, index=False)
+        first = False
+        print(f"💷 {len(chunk)} rows normalized")
+
+
+if __name__ == "__main__":
+    main()
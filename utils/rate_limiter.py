@@ -0,0 +1,204 @@
+"""
+Adaptive per-domain politeness.
+
+Every navigation to a domain goes through that domain's DomainLimiter:
+
+    with limiter_for(url).slot() as nav:
+        driver.get(url)
+        if page_looks_blocked(driver):
+            nav.outcome = BLOCKED
+
+A token bucket decides when the next navigation may start (`rate` per second, up to
+`burst` back to back) and an AIMD limit caps how many run at once. Fast successes raise
+the limit by roughly one per window and nudge the rate up; slow pages shrink the limit a
+little; timeouts and block pages halve both, and a block page also pauses the domain for
+`block_cooldown` seconds. Limits are per process — under utils.sharded_runner each
+process paces itself.
+"""
+import time
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+OK, SLOW, TIMEOUT, BLOCKED, ERROR = "ok", "slow", "timeout", "blocked", "error"
+
+DEFAULT_LIMITS = {
+    "rate": 0.5,              # navigations per second
+    "burst": 2,
+    "concurrency": 2,         # starting limit
+    "min_concurrency": 1,
+    "max_concurrency": 4,
+    "min_rate": 0.05,
+    "max_rate": 2.0,
+    "rate_step": 0.05,        # additive rate increase per fast success
+    "target_latency": 10.0,   # seconds; slower than this counts as SLOW
+    "block_cooldown": 60.0,   # seconds the domain is paused after a block page
+}
+
+BLOCK_STATUSES = (403, 429, 503)
+BLOCK_MARKERS = (
+    "access denied", "attention required", "just a moment", "verify you are human",
+    "are you a robot", "unusual traffic", "too many requests", "request blocked",
+    "captcha", "cf-chl", "px-captcha", "incapsula",
+)
+
+_BLOCK_PROBE_JS = """
+return (document.title || '') + ' ' +
+       (document.body && document.body.innerText ? document.body.innerText.slice(0, 3000) : '');
+"""
+
+
+def domain_of(url):
+    host = (urlparse(str(url)).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def looks_blocked(text="", status=None):
+    """True for a block/challenge page: a blocking HTTP status or a known marker in the text."""
+    if status in BLOCK_STATUSES:
+        return True
+    blob = (text or "")[:5000].lower()
+    return any(m in blob for m in BLOCK_MARKERS)
+
+
+def page_looks_blocked(driver):
+    try:
+        return looks_blocked(driver.execute_script(_BLOCK_PROBE_JS))
+    except Exception:
+        return False
+
+
+class _Nav:
+    __slots__ = ("outcome",)
+
+    def __init__(self):
+        self.outcome = None
+
+
+class DomainLimiter:
+    """Token bucket + AIMD concurrency limit for one domain. Thread-safe."""
+
+    def __init__(self, domain, **limits):
+        cfg = {**DEFAULT_LIMITS, **limits}
+        self.domain = domain
+        self.rate = float(cfg["rate"])
+        self.burst = float(cfg["burst"])
+        self.limit = float(cfg["concurrency"])
+        self.min_concurrency = cfg["min_concurrency"]
+        self.max_concurrency = cfg["max_concurrency"]
+        self.min_rate = cfg["min_rate"]
+        self.max_rate = cfg["max_rate"]
+        self.rate_step = cfg["rate_step"]
+        self.target_latency = cfg["target_latency"]
+        self.block_cooldown = cfg["block_cooldown"]
+
+        self._cond = threading.Condition()
+        self._tokens = self.burst
+        self._refilled = time.monotonic()
+        self._paused_until = 0.0
+        self.in_flight = 0
+        self.stats = {OK: 0, SLOW: 0, TIMEOUT: 0, BLOCKED: 0, ERROR: 0}
+        self.waited = 0.0
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def acquire(self):
+        """Block until a navigation may start; returns the seconds spent waiting."""
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self.in_flight >= int(self.limit):
+                    self._cond.wait()  # woken by release()
+                    continue
+                delay = max(self._paused_until - now, (1 - self._tokens) / self.rate, 0)
+                if delay <= 0:
+                    self._tokens -= 1
+                    self.in_flight += 1
+                    waited = now - start
+                    self.waited += waited
+                    return waited
+                self._cond.wait(delay)
+
+    def release(self, latency, outcome=OK):
+        with self._cond:
+            self.in_flight -= 1
+            if outcome == OK and latency > self.target_latency:
+                outcome = SLOW
+            self.stats[outcome] += 1
+            before = int(self.limit), self.rate
+            if outcome == OK:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+                self.rate = min(self.max_rate, self.rate + self.rate_step)
+            elif outcome == SLOW:
+                self.limit = max(self.min_concurrency, self.limit * 0.75)
+            elif outcome in (TIMEOUT, BLOCKED):
+                self.limit = max(self.min_concurrency, self.limit * 0.5)
+                self.rate = max(self.min_rate, self.rate * 0.5)
+                if outcome == BLOCKED:
+                    self._paused_until = time.monotonic() + self.block_cooldown
+                    self._tokens = 0
+            if outcome != OK or int(self.limit) != before[0]:
+                self._report(outcome, latency, before)
+            self._cond.notify_all()
+        return outcome
+
+    def _report(self, outcome, latency, before):
+        if outcome == BLOCKED:
+            print(f"🧱 {self.domain}: block page detected — pausing {self.block_cooldown:.0f}s")
+        if int(self.limit) != before[0] or outcome in (TIMEOUT, BLOCKED):
+            print(f"🚦 {self.domain}: {outcome} after {latency:.1f}s → concurrency "
+                  f"{before[0]} → {int(self.limit)}, rate {before[1]:.2f} → {self.rate:.2f}/s")
+
+    @contextmanager
+    def slot(self):
+        """
+        Hold one navigation slot for the block. The outcome is OK (or SLOW) unless the block
+        sets nav.outcome, or raises — a *Timeout* exception counts as TIMEOUT, others as ERROR.
+        """
+        self.acquire()
+        nav = _Nav()
+        start = time.monotonic()
+        try:
+            yield nav
+        except BaseException as e:
+            if nav.outcome is None:
+                nav.outcome = TIMEOUT if "timeout" in type(e).__name__.lower() else ERROR
+            raise
+        finally:
+            self.release(time.monotonic() - start, nav.outcome or OK)
+
+    def summary(self):
+        with self._cond:
+            counts = ", ".join(f"{k}: {v}" for k, v in self.stats.items() if v)
+            return (f"{self.domain}: concurrency {int(self.limit)}, rate {self.rate:.2f}/s, "
+                    f"waited {self.waited:.1f}s ({counts or 'no navigations'})")
+
+
+_limiters = {}
+_defaults = dict(DEFAULT_LIMITS)
+_registry_lock = threading.Lock()
+
+
+def configure(**limits):
+    """Set the limits used for domains first seen after this call (one site per process)."""
+    with _registry_lock:
+        _defaults.update(limits)
+
+
+def limiter_for(url):
+    domain = domain_of(url)
+    with _registry_lock:
+        limiter = _limiters.get(domain)
+        if limiter is None:
+            limiter = _limiters[domain] = DomainLimiter(domain, **_defaults)
+        return limiter
+
+
+def summaries():
+    with _registry_lock:
+        limiters = list(_limiters.values())
+    return [l.summary() for l in limiters]
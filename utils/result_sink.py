@@ -0,0 +1,110 @@
+import os
+import csv
+import json
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+class CsvResultSink:
+    """
+    Append-only CSV output fed by a queue and written by one dedicated thread.
+
+    The file stays open and rows go through csv.DictWriter with a stable header:
+    `fieldnames` plus `extra_field`. Keys outside the header (e.g. dynamic summary_*
+    lines) are packed as JSON into `extra_field`, so the header never has to change.
+    When appending to an existing file its header is reused; if it lacks any of these
+    columns (e.g. a file from an older scraper) the file is rewritten with them added.
+    The file is flushed every `flush_every` rows or `flush_interval` seconds.
+    """
+
+    def __init__(self, path, fieldnames, extra_field="extra_fields",
+                 flush_every=25, flush_interval=2.0, name="result-sink"):
+        self.path = path
+        self.extra_field = extra_field
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.written = 0
+
+        wanted = list(fieldnames) + [extra_field]
+        existing = self._read_header(path)
+        if existing:
+            missing = [f for f in wanted if f not in existing]
+            if missing:
+                print(f"⚠️ {path} has no {', '.join(missing)} column(s); rewriting its header")
+                existing = self._widen(path, existing + missing)
+            self.fieldnames = existing
+            self._file = open(path, "a", newline="", encoding="utf-8")
+            self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction="ignore")
+        else:
+            self.fieldnames = wanted
+            self._file = open(path, "w", newline="", encoding="utf-8-sig")
+            self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction="ignore")
+            self._writer.writeheader()
+            self._file.flush()
+        self._known = set(self.fieldnames)
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _read_header(path):
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return None
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            return next(csv.reader(f), None)
+
+    @staticmethod
+    def _widen(path, fieldnames):
+        """Rewrite `path` under a wider header; existing rows get empty new columns."""
+        tmp = path + ".tmp"
+        with open(path, newline="", encoding="utf-8-sig") as src, \
+                open(tmp, "w", newline="", encoding="utf-8-sig") as dst:
+            writer = csv.DictWriter(dst, fieldnames=fieldnames, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(csv.DictReader(src))
+        os.replace(tmp, path)
+        return fieldnames
+
+    def write(self, row):
+        self._queue.put(dict(row))
+
+    def close(self, timeout=None):
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _shape(self, row):
+        extras = {k: v for k, v in row.items() if k not in self._known}
+        if extras and self.extra_field in self._known:
+            row[self.extra_field] = json.dumps(extras, default=str, ensure_ascii=False)
+        return row
+
+    def _run(self):
+        pending = 0
+        last_flush = time.monotonic()
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    item = None
+                if item is _STOP:
+                    return
+                if item is not None:
+                    try:
+                        self._writer.writerow(self._shape(item))
+                        pending += 1
+                        self.written += 1
+                    except Exception as e:
+                        print(f"❌ Error writing result row: {e}")
+                if pending and (pending >= self.flush_every
+                                or time.monotonic() - last_flush >= self.flush_interval):
+                    self._file.flush()
+                    pending = 0
+                    last_flush = time.monotonic()
+        finally:
+            self._file.flush()
+            self._file.close()
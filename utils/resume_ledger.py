@@ -0,0 +1,78 @@
+import sqlite3
+import threading
+from datetime import datetime
+
+DEFAULT_LEDGER_PATH = "resume_ledger.sqlite3"
+DONE_STATUSES = ("success", "unchanged")  # "unchanged": skipped by utils.change_detection
+DEFAULT_RUN_ID = ""  # one fixed scope: a done variant stays done until a new run id is given
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ledger (
+    id          INTEGER PRIMARY KEY,
+    site        TEXT NOT NULL,
+    url         TEXT NOT NULL,
+    variant_key TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    run_id      TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS ix_ledger_run_task ON ledger (site, run_id, url, variant_key, status);
+"""
+
+
+def variant_key(row, columns):
+    """Stable key for one variant of a URL: normalised values of the variant columns."""
+    parts = []
+    for col in columns:
+        val = row.get(col, "")
+        val = "" if val is None else str(val).strip().lower()
+        parts.append("" if val == "nan" else val)
+    return "|".join(parts)
+
+
+class ResumeLedger:
+    """
+    Append-only SQLite log of task outcomes, keyed by (site, run_id, url, variant_key).
+    Every attempt is appended; is_done() is an indexed lookup for a 'success' (or
+    'unchanged') entry of the same run, so resuming never re-reads the output files.
+    Without a run id every run shares one scope and resumes where the last one stopped;
+    pass a new run id (e.g. a date) to scrape everything again.
+    """
+
+    def __init__(self, path=DEFAULT_LEDGER_PATH, run_id=None):
+        self.path = path
+        self.run_id = run_id or DEFAULT_RUN_ID
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def record(self, site, url, key, status):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO ledger (site, url, variant_key, status, recorded_at, run_id) VALUES (?, ?, ?, ?, ?, ?)",
+                (site, url, key, status, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), self.run_id),
+            )
+
+    def is_done(self, site, url, key):
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT 1 FROM ledger WHERE site = ? AND run_id = ? AND url = ? AND variant_key = ? "
+                "AND status IN (?, ?) LIMIT 1",
+                (site, self.run_id, url, key, *DONE_STATUSES),
+            )
+            return cur.fetchone() is not None
+
+    def done_count(self, site):
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT COUNT(*) FROM (SELECT DISTINCT url, variant_key FROM ledger "
+                "WHERE site = ? AND run_id = ? AND status IN (?, ?))",
+                (site, self.run_id, *DONE_STATUSES),
+            )
+            return cur.fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
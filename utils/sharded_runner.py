@@ -0,0 +1,175 @@
+"""
+Multi-process sharded runner.
+
+    python -m utils.sharded_runner anb INPUT.csv --processes 8 [--run-id 2025-10-05]
+
+Input rows are sharded by a stable hash of product_url across N worker processes and put
+in a durable SQLite work queue. Each process builds its scraper's ShardWorker (own browser
+pool, own output) and leases tasks for its shard with a heartbeat. If a process dies, the
+supervisor restarts it and its expired leases are handed out again rather than lost; a
+process that finishes its own shard also picks up other shards' expired leases.
+
+Tasks are queued per (site, run id); the run id is also the ShardWorker's resume-ledger
+scope. Without --run-id every run shares one scope, so rerunning resumes: done tasks are
+kept, failed ones are retried, and unfinished tasks are re-sharded for the new process
+count. A new run id (e.g. a date) queues the whole input again.
+"""
+import os
+import time
+import zlib
+import argparse
+import importlib
+import threading
+import multiprocessing
+
+from utils.task_reader import read_tasks, Task
+from utils.work_queue import WorkQueue
+from utils.resume_ledger import DEFAULT_RUN_ID
+
+# site name -> module exposing a ShardWorker class
+SITES = {
+    "anb": "scrapers.anb_scraper",
+    "77diamonds": "scrapers.77diamonds_scraper",
+    "diamond_heaven": "scrapers.diamond_heaven",
+}
+
+DEFAULT_QUEUE_PATH = "work_queue.sqlite3"
+LEASE_SECONDS = 300          # a task's lease; renewed by the heartbeat while it runs
+HEARTBEAT_EVERY = 60         # seconds
+IDLE_POLL = 10               # seconds to wait for a dead worker's lease to expire
+SUPERVISE_EVERY = 5          # seconds
+MAX_RESTARTS_PER_SHARD = 5
+
+
+def shard_of(url, shards):
+    return zlib.crc32(str(url).strip().encode("utf-8")) % shards
+
+
+def enqueue_input(queue, input_path, shards, required=("product_url",)):
+    items = (
+        (f"{t.idx}|{t.product_url}", shard_of(t.product_url, shards),
+         {"idx": t.idx, "product_url": t.product_url, "fields": t.fields})
+        for t in read_tasks(input_path, required=required)
+    )
+    return queue.enqueue_many(items)
+
+
+# ---------------------- worker process ----------------------
+def _worker_thread(site_worker, queue, shard, owner, stop):
+    queue = WorkQueue(*queue)
+    try:
+        while not stop.is_set():
+            leased = queue.lease(owner, LEASE_SECONDS, shard=shard)
+            if leased is None:
+                leased = queue.lease(owner, LEASE_SECONDS, expired_only=True)
+            if leased is None:
+                if queue.remaining(shard) == 0:
+                    return
+                time.sleep(IDLE_POLL)  # own shard still has leases held by a dead process
+                continue
+            task_id, payload = leased
+            task = Task(idx=payload["idx"], product_url=payload["product_url"], fields=payload["fields"])
+            try:
+                status = site_worker.handle(task)
+                queue.complete(task_id, owner, ok=status != "error")
+            except KeyboardInterrupt:
+                queue.release(task_id, owner)
+                raise
+            except Exception as e:
+                print(f"❌ [shard {shard}] task {task.idx + 1} crashed: {e}")
+                queue.complete(task_id, owner, ok=False)
+    finally:
+        queue.close()
+
+
+def _heartbeat(queue, owner_prefix, stop):
+    queue = WorkQueue(*queue)
+    try:
+        while not stop.wait(HEARTBEAT_EVERY):
+            queue.renew(owner_prefix, LEASE_SECONDS)
+    finally:
+        queue.close()
+
+
+def shard_main(site, shard, shards, queue_path, run_id):
+    """Entry point of one worker process."""
+    module = importlib.import_module(SITES[site])
+    site_worker = module.ShardWorker(shard=shard, shards=shards, run_id=run_id)
+    threads = max(1, getattr(site_worker, "threads", 1))
+    queue = (queue_path, site, run_id)  # WorkQueue args; each thread opens its own connection
+    owner_prefix = f"{os.getpid()}:"
+    stop = threading.Event()
+    hb = threading.Thread(target=_heartbeat, args=(queue, owner_prefix, stop), daemon=True)
+    hb.start()
+    print(f"🧩 [shard {shard}] pid {os.getpid()} started with {threads} thread(s)")
+    workers = [
+        threading.Thread(target=_worker_thread, name=f"S{shard}-T{i}",
+                         args=(site_worker, queue, shard, f"{owner_prefix}{i}", stop))
+        for i in range(threads)
+    ]
+    try:
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+    finally:
+        stop.set()
+        site_worker.close()
+    print(f"🏁 [shard {shard}] done")
+
+
+# ---------------------- supervisor ----------------------
+def run(site, input_path, processes, queue_path=DEFAULT_QUEUE_PATH, run_id=None):
+    run_id = run_id or DEFAULT_RUN_ID
+    queue = WorkQueue(queue_path, site, run_id)
+    added = enqueue_input(queue, input_path, processes)
+    print(f"🚀 {site}{f' run {run_id}' if run_id else ''}: queued {added} new task(s); state: {queue.counts()}; processes: {processes}")
+
+    ctx = multiprocessing.get_context("spawn")
+
+    def start(shard):
+        p = ctx.Process(target=shard_main, args=(site, shard, processes, queue_path, run_id),
+                        name=f"shard-{shard}")
+        p.start()
+        return p
+
+    procs = {shard: start(shard) for shard in range(processes)}
+    restarts = {shard: 0 for shard in range(processes)}
+    try:
+        while True:
+            time.sleep(SUPERVISE_EVERY)
+            for shard, p in list(procs.items()):
+                if p.is_alive():
+                    continue
+                if p.exitcode != 0 and queue.remaining(shard) and restarts[shard] < MAX_RESTARTS_PER_SHARD:
+                    restarts[shard] += 1
+                    print(f"💥 shard {shard} exited with code {p.exitcode}; restarting "
+                          f"({restarts[shard]}/{MAX_RESTARTS_PER_SHARD})")
+                    procs[shard] = start(shard)
+            if not any(p.is_alive() for p in procs.values()):
+                break
+    except KeyboardInterrupt:
+        print("🛑 Interrupted; stopping workers (leased tasks will be re-leased next run)…")
+        for p in procs.values():
+            p.terminate()
+    finally:
+        for p in procs.values():
+            p.join()
+        print(f"📊 Queue state: {queue.counts()}")
+        queue.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a scraper sharded across worker processes.")
+    parser.add_argument("site", choices=sorted(SITES))
+    parser.add_argument("input", help="CSV or XLSX input file")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--queue", default=DEFAULT_QUEUE_PATH, help="SQLite work queue path")
+    parser.add_argument("--run-id", help="queue and resume-ledger scope; a new one scrapes everything again "
+                                         "(default: one shared scope, so reruns resume)")
+    args = parser.parse_args()
+    run(args.site, args.input, args.processes, args.queue, args.run_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import os
+from dataclasses import dataclass
+
+import pandas as pd
+
+CSV_CHUNK_ROWS = 5000
+EXCEL_SUFFIXES = (".xlsx", ".xlsm")
+
+
+@dataclass(frozen=True, slots=True)
+class Task:
+    """One input row. Supports row.get(...) / row[...] so scraper code can use it like a dict."""
+    idx: int
+    product_url: str
+    fields: dict
+
+    def get(self, key, default=""):
+        if key == "product_url":
+            return self.product_url
+        return self.fields.get(key, default)
+
+    def __getitem__(self, key):
+        if key == "product_url":
+            return self.product_url
+        return self.fields[key]
+
+    def __contains__(self, key):
+        return key == "product_url" or key in self.fields
+
+    def to_dict(self):
+        return {"product_url": self.product_url, **self.fields}
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def _make_task(idx, header, values):
+    fields = {h: _cell(v) for h, v in zip(header, values) if h}
+    url = fields.pop("product_url", "")
+    return Task(idx=idx, product_url=url, fields=fields)
+
+
+def _is_excel(path):
+    return os.path.splitext(path)[1].lower() in EXCEL_SUFFIXES
+
+
+def read_header(path):
+    if _is_excel(path):
+        from openpyxl import load_workbook
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            first = next(wb.active.iter_rows(max_row=1, values_only=True), ())
+        finally:
+            wb.close()
+        return [_cell(h) for h in first]
+    return [str(h).strip() for h in pd.read_csv(path, nrows=0, encoding="utf-8-sig").columns]
+
+
+def _iter_csv(path, header, chunksize):
+    idx = 0
+    for chunk in pd.read_csv(path, chunksize=chunksize, dtype=str, keep_default_na=False,
+                             encoding="utf-8-sig"):
+        for values in chunk.itertuples(index=False, name=None):
+            yield _make_task(idx, header, values)
+            idx += 1
+
+
+def _iter_excel(path, header):
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(min_row=2, values_only=True)
+        for idx, values in enumerate(rows):
+            if values is None or all(v is None for v in values):
+                continue
+            yield _make_task(idx, header, values)
+    finally:
+        wb.close()
+
+
+def read_tasks(path, required=("product_url",), chunksize=CSV_CHUNK_ROWS):
+    """
+    Stream Task objects from a CSV (read in chunks) or XLSX (openpyxl read-only) file.
+    Required columns are checked before anything is streamed; ValueError if any is missing.
+    Task.idx is the 0-based data row number, like DataFrame.iterrows() indexes.
+    """
+    header = read_header(path)
+    missing = [c for c in required if c not in header]
+    if missing:
+        raise ValueError(f"{os.path.basename(path)} is missing required column(s): {', '.join(missing)}")
+    if _is_excel(path):
+        return _iter_excel(path, header)
+    return _iter_csv(path, header, chunksize)
@@ -0,0 +1,47 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+
+MAX_BUFFERED_TASKS = 2000
+MAX_GROUP_SIZE = 50
+
+
+@dataclass(frozen=True, slots=True)
+class VariantGroup:
+    """All variants (Tasks) of one product page, in input order."""
+    product_url: str
+    tasks: tuple
+
+    def __len__(self):
+        return len(self.tasks)
+
+
+def _url_key(task):
+    return str(task.product_url).strip()
+
+
+def group_by_url(tasks, key=_url_key, max_buffered=MAX_BUFFERED_TASKS, max_group=MAX_GROUP_SIZE):
+    """
+    Stream VariantGroups from a stream of Tasks so each product page is loaded once per group.
+
+    Input is not assumed to be sorted: up to `max_buffered` tasks are held back to collect
+    variants of the same URL; beyond that the oldest group is emitted. A group is emitted
+    as soon as it reaches `max_group` tasks so one URL cannot hold a worker for a whole run.
+    A URL whose rows are further apart than the buffer may come out as several groups.
+    """
+    groups = OrderedDict()
+    buffered = 0
+    for task in tasks:
+        url = key(task)
+        bucket = groups.setdefault(url, [])
+        bucket.append(task)
+        buffered += 1
+        if len(bucket) >= max_group:
+            del groups[url]
+            buffered -= len(bucket)
+            yield VariantGroup(url, tuple(bucket))
+        while buffered > max_buffered:
+            url, bucket = groups.popitem(last=False)
+            buffered -= len(bucket)
+            yield VariantGroup(url, tuple(bucket))
+    for url, bucket in groups.items():
+        yield VariantGroup(url, tuple(bucket))
@@ -0,0 +1,157 @@
+import json
+import sqlite3
+import time
+
+PENDING, LEASED, DONE, FAILED = "pending", "leased", "done", "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id          INTEGER PRIMARY KEY,
+    task_key    TEXT NOT NULL UNIQUE,
+    site        TEXT NOT NULL,
+    run_id      TEXT NOT NULL,
+    shard       INTEGER NOT NULL,
+    payload     TEXT NOT NULL,
+    state       TEXT NOT NULL DEFAULT 'pending',
+    owner       TEXT,
+    lease_until REAL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    updated_at  REAL
+);
+CREATE INDEX IF NOT EXISTS ix_tasks_state_lease ON tasks (state, lease_until);
+CREATE INDEX IF NOT EXISTS ix_tasks_run_shard_state ON tasks (site, run_id, shard, state, id);
+"""
+
+
+class WorkQueue:
+    """
+    Durable local work queue in SQLite, safe to share between processes.
+
+    A WorkQueue only sees the tasks of its (site, run_id), so several sites and runs can
+    share one file. Workers lease a task for `lease_seconds` and must complete() or renew()
+    it before the lease runs out; a task whose lease expired (its process died) is handed
+    out again. A task leased `max_attempts` times without completing is marked failed.
+    Open one WorkQueue per process/thread — connections are not shared.
+    """
+
+    def __init__(self, path, site="", run_id="", max_attempts=5):
+        self.path = path
+        self.site = site
+        self.run_id = run_id
+        self.max_attempts = max_attempts
+        self._scope = "site = ? AND run_id = ?"
+        self._scope_args = (site, run_id)
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def enqueue_many(self, items):
+        """
+        items: iterable of (task_key, shard, payload_dict). Returns the number of new tasks.
+        Keys already queued for this site and run keep their state, except that failed
+        tasks and tasks of dead processes go back to pending (a rerun retries them), and
+        every unfinished task moves to the given shard (a rerun may use fewer processes).
+        """
+        now = time.time()
+        added = 0
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            for key, shard, payload in items:
+                key = f"{self.site}|{self.run_id}|{key}"
+                cur = self._conn.execute(
+                    "INSERT OR IGNORE INTO tasks (task_key, site, run_id, shard, payload, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, self.site, self.run_id, shard, json.dumps(payload), now),
+                )
+                if cur.rowcount:
+                    added += 1
+                    continue
+                self._conn.execute(
+                    "UPDATE tasks SET shard = ?, state = 'pending', owner = NULL, lease_until = NULL, "
+                    "attempts = CASE WHEN state = 'failed' THEN 0 ELSE attempts END, updated_at = ? "
+                    "WHERE task_key = ? AND (state IN ('pending', 'failed') "
+                    "OR (state = 'leased' AND lease_until < ?))",
+                    (shard, now, key, now),
+                )
+            self._conn.execute("COMMIT")
+            return added
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def lease(self, owner, lease_seconds, shard=None, expired_only=False):
+        """
+        Lease the next task of `shard` (any shard if None). With expired_only, only tasks
+        whose previous lease ran out are considered (used to pick up a dead shard's work).
+        Returns (task_id, payload) or None.
+        """
+        now = time.time()
+        where = [self._scope, "state = 'leased' AND lease_until < ?"]
+        args = [*self._scope_args, now]
+        if not expired_only:
+            where[1] = "(state = 'pending' OR (state = 'leased' AND lease_until < ?))"
+        if shard is not None:
+            where.append("shard = ?")
+            args.append(shard)
+
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                f"UPDATE tasks SET state = 'failed', owner = NULL, updated_at = ? "
+                f"WHERE {self._scope} AND state = 'leased' AND lease_until < ? AND attempts >= ?",
+                (now, *self._scope_args, now, self.max_attempts),
+            )
+            row = self._conn.execute(
+                f"SELECT id, payload FROM tasks WHERE {' AND '.join(where)} ORDER BY id LIMIT 1", args
+            ).fetchone()
+            if row:
+                self._conn.execute(
+                    "UPDATE tasks SET state = 'leased', owner = ?, lease_until = ?, "
+                    "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (owner, now + lease_seconds, now, row[0]),
+                )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return (row[0], json.loads(row[1])) if row else None
+
+    def renew(self, owner_prefix, lease_seconds):
+        """Extend every lease held by owners starting with `owner_prefix` (heartbeat)."""
+        now = time.time()
+        self._conn.execute(
+            f"UPDATE tasks SET lease_until = ?, updated_at = ? WHERE {self._scope} AND state = 'leased' AND owner LIKE ?",
+            (now + lease_seconds, now, *self._scope_args, owner_prefix + "%"),
+        )
+
+    def complete(self, task_id, owner, ok=True):
+        self._conn.execute(
+            "UPDATE tasks SET state = ?, lease_until = NULL, updated_at = ? WHERE id = ? AND owner = ?",
+            (DONE if ok else FAILED, time.time(), task_id, owner),
+        )
+
+    def release(self, task_id, owner):
+        """Give a leased task back without counting it as done (e.g. on shutdown)."""
+        self._conn.execute(
+            "UPDATE tasks SET state = 'pending', owner = NULL, lease_until = NULL, "
+            "attempts = MAX(attempts - 1, 0), updated_at = ? WHERE id = ? AND owner = ?",
+            (time.time(), task_id, owner),
+        )
+
+    def remaining(self, shard=None):
+        sql = f"SELECT COUNT(*) FROM tasks WHERE {self._scope} AND state IN ('pending', 'leased')"
+        args = self._scope_args
+        if shard is not None:
+            sql += " AND shard = ?"
+            args += (shard,)
+        return self._conn.execute(sql, args).fetchone()[0]
+
+    def counts(self):
+        rows = self._conn.execute(
+            f"SELECT state, COUNT(*) FROM tasks WHERE {self._scope} GROUP BY state", self._scope_args
+        ).fetchall()
+        return {state: n for state, n in rows}
+
+    def close(self):
+        self._conn.close()